@@ -0,0 +1,102 @@
+"""
+Memory taken by the AST of a generated program: bytes per node, counting each node with its attribute storage,
+and everything the tree retains once built, strings and numbers included. Then the same for the array backed
+CompactTree, parsed a chunk at a time.
+
+    python -m benchmarks.ast_memory
+    python -m benchmarks.ast_memory --nodes 100000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from collections import Counter
+
+from opal.ast import node_bytes, walk
+from opal.ast.visitor import ASTVisitor
+from opal.parser import parse_compact, parse_program
+
+from benchmarks.stream import CHUNK
+
+
+def generate_source(nodes):
+    """
+    :return: a program of at least `nodes` nodes
+    """
+    chunk_nodes = sum(1 for _ in walk(parse_program(CHUNK, ASTVisitor()).block)) - 1
+    return CHUNK * max(1, -(-nodes // chunk_nodes))
+
+
+def traced(function, *args):
+    """
+    :return: (result, bytes it retains, seconds taken)
+    """
+    # the parser tables aren't part of the tree
+    parse_program('print(1)', ASTVisitor())
+    gc.collect()
+
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - start
+        gc.collect()
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return result, retained, elapsed
+
+
+def measure(nodes):
+    """
+    :return: (number of nodes, bytes of the nodes by class, bytes retained by the tree, seconds to build it)
+    """
+    source = generate_source(nodes)
+    program, retained, elapsed = traced(parse_program, source, ASTVisitor())
+    count = sum(1 for _ in walk(program))
+
+    by_class = Counter()
+    for node in walk(program):
+        by_class[node.__class__.__name__] += node_bytes(node)
+
+    return count, by_class, retained, elapsed
+
+
+def measure_compact(nodes, min_lines=200):
+    """
+    :return: (number of nodes, bytes of the arrays, bytes retained by the tree, seconds to build it)
+    """
+    source = generate_source(nodes)
+    tree, retained, elapsed = traced(parse_compact, source.splitlines(True), min_lines)
+    return len(tree), tree.nbytes(), retained, elapsed
+
+
+def get_arg_parser():
+    arg_parser = argparse.ArgumentParser(description='AST memory')
+    arg_parser.add_argument('--nodes', type=int, default=1000000)
+    return arg_parser
+
+
+def main(argv=None):
+    args = get_arg_parser().parse_args(argv)
+    count, by_class, retained, elapsed = measure(args.nodes)
+    total = sum(by_class.values())
+
+    print(f'{count} nodes built in {elapsed:.2f}s')
+    print(f'{"nodes (MB)":>12} {"bytes/node":>11} {"retained (MB)":>14} {"retained/node":>14}')
+    print(f'{total / 2 ** 20:>12.1f} {total / count:>11.1f} {retained / 2 ** 20:>14.1f} {retained / count:>14.1f}\n')
+
+    for name, size in by_class.most_common():
+        print(f'{name:<12} {size / 2 ** 20:>8.1f} MB')
+
+    # with the lists of children and the references to other nodes
+    count, arrays, retained, elapsed = measure_compact(args.nodes)
+
+    print(f'\ncompact: {count} entries built in {elapsed:.2f}s')
+    print(f'{"arrays (MB)":>12} {"bytes/entry":>11} {"retained (MB)":>14} {"retained/entry":>15}')
+    print(f'{arrays / 2 ** 20:>12.1f} {arrays / count:>11.1f} {retained / 2 ** 20:>14.1f} {retained / count:>15.1f}')
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
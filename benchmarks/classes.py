@@ -0,0 +1,66 @@
+"""
+Times generating the code of programs defining more and more classes, to check compile time grows linearly with
+them, as long as the classes, methods and vtables of the code generator are found by name in constant time
+
+    python -m benchmarks.classes
+    python -m benchmarks.classes --classes 1000 5000 --methods 20
+
+The time per method stays about the same from the smallest program to the largest one. When a lookup scans every
+class or function of the module, it grows with the number of classes instead.
+"""
+import argparse
+import time
+
+from opal.codegen import CodeGenerator
+
+METHOD = """    def m{index}()
+        return {index}
+    end
+"""
+
+
+def generate_source(classes, methods):
+    """
+    :return: a program defining the classes, each inheriting from the previous one, with `methods` methods, then
+    creating an instance of each and calling its last method
+    """
+    body = ''.join(METHOD.format(index=index) for index in range(methods))
+    lines = ['class Object\nend\n', f'class C0 < Object\n{body}end\n']
+    lines += [f'class C{index} < C{index - 1}\n{body}end\n' for index in range(1, classes)]
+    lines += [f'c{index} = C{index}()\nn{index} = c{index}.m{methods - 1}()\n' for index in range(classes)]
+    return ''.join(lines)
+
+
+def measure(source):
+    """
+    :return: time to get the IR of the source
+    """
+    start = time.perf_counter()
+    codegen = CodeGenerator()
+    codegen.generate_code(source)
+    str(codegen.module)
+    return time.perf_counter() - start
+
+
+def get_arg_parser():
+    arg_parser = argparse.ArgumentParser(description='Code generation time as the number of classes grows')
+    arg_parser.add_argument('--classes', type=int, nargs='+', default=[500, 1000, 2500, 5000])
+    arg_parser.add_argument('--methods', type=int, default=20)
+    return arg_parser
+
+
+def main(argv=None):
+    args = get_arg_parser().parse_args(argv)
+
+    # loads the parser outside of the measures
+    measure(generate_source(1, 1))
+
+    print(f'{"classes":>8} {"methods":>8} {"time (s)":>9} {"per method (us)":>16}')
+    for classes in args.classes:
+        elapsed = measure(generate_source(classes, args.methods))
+        methods = classes * args.methods
+        print(f'{classes:>8} {methods:>8} {elapsed:>9.3f} {elapsed / methods * 1e6:>16.1f}')
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
@@ -0,0 +1,110 @@
+"""
+Compares the LALR and the Earley parsers on generated programs of growing size, then building the AST from a lark
+Tree against building it while parsing
+
+    python -m benchmarks.parser
+    python -m benchmarks.parser --lines 1000 10000 50000 --skip-earley-above 10000
+"""
+import argparse
+import time
+import tracemalloc
+
+from opal.ast.visitor import ASTVisitor
+from opal.parser import EARLEY, LALR, Parser
+
+CHUNK = """i = 0
+total = 0
+while i < 10
+    if i * 2 > 5 + total
+        total = total + i
+    else
+        total = total - 1
+    end
+    i = i + 1
+end
+l = [1, 2, 3]
+for x in l
+    print(x + l[0] * (total - 1) / 2)
+end
+print("done")
+"""
+
+
+def generate_source(lines):
+    """
+    :return: a program of about `lines` lines
+    """
+    chunk_lines = CHUNK.count('\n')
+    return CHUNK * max(1, lines // chunk_lines)
+
+
+def best_time(function, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def build_ast(parser, source):
+    if parser.inline:
+        return parser.parse(source, ASTVisitor())
+    return ASTVisitor().transform(parser.parse(source))
+
+
+def measure_ast(parser, source, repeat=3):
+    """
+    :return: (best time, peak memory in bytes) to get the Program of the source
+    """
+    elapsed = best_time(build_ast, parser, source, repeat=repeat)
+
+    tracemalloc.start()
+    try:
+        build_ast(parser, source)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return elapsed, peak
+
+
+def get_arg_parser():
+    arg_parser = argparse.ArgumentParser(description='LALR vs Earley parsing time')
+    arg_parser.add_argument('--lines', type=int, nargs='+', default=[100, 1000, 5000, 20000])
+    arg_parser.add_argument('--skip-earley-above', type=int, default=5000,
+                            help='lines above which Earley is too slow to bother (default: %(default)s)')
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    return arg_parser
+
+
+def main(argv=None):
+    args = get_arg_parser().parse_args(argv)
+    parsers = {LALR: Parser(LALR), EARLEY: Parser(EARLEY)}
+
+    print(f'{"lines":>8} {"lalr (s)":>10} {"earley (s)":>11} {"speedup":>8}')
+    for lines in args.lines:
+        source = generate_source(lines)
+        lalr = best_time(parsers[LALR].parse, source, repeat=args.repeat)
+
+        if lines > args.skip_earley_above:
+            print(f'{lines:>8} {lalr:>10.4f} {"-":>11} {"-":>8}')
+            continue
+
+        earley = best_time(parsers[EARLEY].parse, source, repeat=args.repeat)
+        print(f'{lines:>8} {lalr:>10.4f} {earley:>11.4f} {earley / lalr:>7.1f}x')
+
+    inline = Parser(LALR, inline=True)
+
+    print(f'\n{"lines":>8} {"tree (s)":>10} {"inline (s)":>11} {"tree (MB)":>10} {"inline (MB)":>12}')
+    for lines in args.lines:
+        source = generate_source(lines)
+        tree_time, tree_peak = measure_ast(parsers[LALR], source, args.repeat)
+        inline_time, inline_peak = measure_ast(inline, source, args.repeat)
+        print(f'{lines:>8} {tree_time:>10.4f} {inline_time:>11.4f} {tree_peak / 2 ** 20:>10.1f} '
+              f'{inline_peak / 2 ** 20:>12.1f}')
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
@@ -0,0 +1,125 @@
+"""
+Startup budget: times importing opal and getting a first program through it, each in a fresh interpreter, and
+fails when any of them goes over its budget
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --importtime opal.evaluator
+
+The budgets are wall clock seconds with room for slower machines, a regression usually blows them by far: the
+import of opal.evaluator went from 0.12s to 0.07s once lark and llvmlite.llvmpy were no longer imported by it.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from collections import OrderedDict
+from os import path
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+
+# name: (setup, statement timed, budget in seconds)
+CASES = OrderedDict([
+    ('import opal.client', ('', 'import opal.client', 0.05)),
+    ('import opal.evaluator', ('', 'import opal.evaluator', 0.15)),
+    ('OpalEvaluator()', ('from opal.evaluator import OpalEvaluator', 'OpalEvaluator()', 0.05)),
+    ('first evaluation', ('from opal.evaluator import OpalEvaluator', 'OpalEvaluator().evaluate("print(1)")', 0.4)),
+    ('import and evaluate', ('', 'from opal.evaluator import OpalEvaluator\n'
+                                 'OpalEvaluator().evaluate("print(1)")', 0.5)),
+])
+
+TIMER = """
+import os, sys, time
+{setup}
+start = time.perf_counter()
+{statement}
+os.write(int(sys.argv[1]), ('%f' % (time.perf_counter() - start)).encode())
+"""
+
+
+def run_python(code, *options):
+    """
+    Runs the code in a fresh interpreter from the repository root
+    :return: (what the child wrote to the pipe whose fd it gets as sys.argv[1], its stderr)
+    """
+    read_fd, write_fd = os.pipe()
+    try:
+        process = subprocess.Popen([sys.executable, *options, '-c', code, str(write_fd)], cwd=ROOT,
+                                   pass_fds=(write_fd,), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        os.close(write_fd)
+        with os.fdopen(read_fd, 'rb') as pipe:
+            result = pipe.read().decode('utf-8')
+        _, err = process.communicate()
+    except BaseException:
+        os.close(read_fd)
+        raise
+
+    if process.returncode:
+        raise RuntimeError(err.decode('utf-8', 'replace'))
+    return result, err.decode('utf-8', 'replace')
+
+
+def time_startup(setup, statement, repeat=5):
+    """
+    :return: the best time of the statement, in seconds, run after the setup in a fresh interpreter
+    """
+    code = TIMER.format(setup=setup, statement=statement)
+    return min(float(run_python(code)[0]) for _ in range(repeat))
+
+
+def imported_modules(statement):
+    """
+    :return: the modules imported by the statement in a fresh interpreter
+    """
+    code = f'import os, sys\nbefore = set(sys.modules)\n{statement}\n' \
+           'os.write(int(sys.argv[1]), " ".join(sorted(set(sys.modules) - before)).encode())'
+    return run_python(code)[0].split()
+
+
+def import_times(module, top=15):
+    """
+    :return: [(cumulative seconds, module)] of the slowest imports, from python -X importtime (3.7 and later)
+    """
+    _, err = run_python(f'import {module}', '-X', 'importtime')
+
+    times = []
+    for line in err.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(times, reverse=True)[:top]
+
+
+def get_arg_parser():
+    arg_parser = argparse.ArgumentParser(description='Opal startup time against its budget')
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('--scale', type=float, default=1.0, help='multiplies every budget (default: 1)')
+    arg_parser.add_argument('--importtime', metavar='MODULE', help='lists the slowest imports of the module')
+    return arg_parser
+
+
+def main(argv=None):
+    args = get_arg_parser().parse_args(argv)
+
+    if args.importtime:
+        if sys.version_info < (3, 7):
+            print('-X importtime needs Python 3.7', file=sys.stderr)
+            return 2
+        for cumulative, name in import_times(args.importtime):
+            print(f'{cumulative:>8.4f} {name}')
+        return 0
+
+    over_budget = 0
+    print(f'{"":<22} {"time (s)":>9} {"budget (s)":>11}')
+    for name, (setup, statement, budget) in CASES.items():
+        elapsed = time_startup(setup, statement, args.repeat)
+        budget *= args.scale
+        over = elapsed > budget
+        over_budget += over
+        print(f'{name:<22} {elapsed:>9.4f} {budget:>11.4f}{over and "  OVER BUDGET" or ""}')
+
+    return over_budget and 1 or 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Compares generating the code of a whole program against streaming it a chunk of statements at a time, in time and
+peak memory, including printing the module
+
+    python -m benchmarks.stream
+    python -m benchmarks.stream --lines 1000 20000 --chunk-lines 50
+"""
+import argparse
+import io
+import time
+import tracemalloc
+
+from opal.codegen import STREAM_CHUNK_LINES, CodeGenerator
+
+# CHUNK of benchmarks.parser doesn't compile: comparisons share the precedence of "+"
+CHUNK = """i = 0
+total = 0
+while i < 10
+    if i > 5
+        total = total + i * 2
+    end
+    i = i + 1
+end
+print(total)
+l = [1, 2, 3]
+for x in l
+    print(x)
+end
+"""
+
+
+def generate_source(lines):
+    """
+    :return: a program of about `lines` lines
+    """
+    return CHUNK * max(1, lines // CHUNK.count('\n'))
+
+
+def generate_whole(source, chunk_lines):
+    codegen = CodeGenerator()
+    codegen.generate_code(source)
+    return str(codegen.module)
+
+
+def generate_streamed(source, chunk_lines):
+    codegen = CodeGenerator()
+    codegen.generate_file(io.StringIO(source), chunk_lines=chunk_lines)
+    return str(codegen.module)
+
+
+def measure(generate, source, chunk_lines):
+    """
+    :return: (time, peak memory in bytes) to get the IR of the source
+    """
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        generate(source, chunk_lines)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return elapsed, peak
+
+
+def get_arg_parser():
+    arg_parser = argparse.ArgumentParser(description='Whole program vs streamed code generation')
+    arg_parser.add_argument('--lines', type=int, nargs='+', default=[1000, 5000, 20000])
+    arg_parser.add_argument('--chunk-lines', type=int, default=STREAM_CHUNK_LINES)
+    return arg_parser
+
+
+def main(argv=None):
+    args = get_arg_parser().parse_args(argv)
+
+    # loads the parser outside of the measures
+    generate_streamed(CHUNK, args.chunk_lines)
+
+    print(f'{"lines":>8} {"whole (s)":>10} {"stream (s)":>11} {"whole (MB)":>11} {"stream (MB)":>12}')
+    for lines in args.lines:
+        source = generate_source(lines)
+        whole_time, whole_peak = measure(generate_whole, source, args.chunk_lines)
+        stream_time, stream_peak = measure(generate_streamed, source, args.chunk_lines)
+        print(f'{lines:>8} {whole_time:>10.4f} {stream_time:>11.4f} {whole_peak / 2 ** 20:>11.1f} '
+              f'{stream_peak / 2 ** 20:>12.1f}')
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
@@ -1,19 +1,124 @@
+import io
+import pickle
+import sys
+from types import GeneratorType
+
+
 class ASTNode:
+    # see opal.inference
+    __slots__ = ('static_type',)
 
     def dump(self):
+        """
+        :return: the tree as text, built without recursing so any depth can be dumped
+        """
+        return trampoline(self, dump_node)
+
+    def _dump(self):
+        """
+        Either returns the text of the node or is a generator yielding its children and getting back their text,
+        see trampoline
+        """
         raise NotImplementedError
 
     def accept(self, visitor):
         visitor.visit(self)
 
+    def fields(self):
+        """
+        :return: generator of (name, value) of the attributes set on the node
+        """
+        for name in slot_names(self.__class__):
+            try:
+                yield name, getattr(self, name)
+            except AttributeError:
+                pass
+
+    def children(self):
+        for _, value in self.fields():
+            if isinstance(value, ASTNode):
+                yield value
+            elif isinstance(value, (list, tuple)):
+                yield from (item for item in value if isinstance(item, ASTNode))
+
+
+_slot_names = {}
+
+
+def slot_names(cls):
+    """
+    Nodes keep their attributes in slots, a __dict__ would take more memory than most of them
+    :return: the __slots__ of the class and of its bases
+    """
+    names = _slot_names.get(cls)
+    if names is None:
+        names = tuple(name for klass in reversed(cls.__mro__) for name in klass.__dict__.get('__slots__', ()))
+        _slot_names[cls] = names
+    return names
+
+
+def walk(node):
+    """
+    Yields every node of the tree, depth first, without recursing
+    """
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(list(node.children())))
+
+
+def node_bytes(node):
+    """
+    :return: the size of the node plus its __dict__, when it has one
+    """
+    size = sys.getsizeof(node)
+    if hasattr(node, '__dict__'):
+        size += sys.getsizeof(node.__dict__)
+    return size
+
+
+def trampoline(node, step):
+    """
+    Evaluates a tree bottom up with an explicit stack instead of recursion, so its depth isn't limited by the
+    recursion limit.
+    :param step: called with every node, returns either the node's result or a generator yielding the children it
+    needs. Each of them is stepped in turn and its result is sent back into the generator, whose return value is the
+    node's result.
+    """
+    result = step(node)
+    if not isinstance(result, GeneratorType):
+        return result
+
+    stack = [result]
+    result = None
+    while stack:
+        try:
+            child = stack[-1].send(result)
+        except StopIteration as e:
+            stack.pop()
+            result = e.value
+            continue
+
+        result = step(child)
+        if isinstance(result, GeneratorType):
+            stack.append(result)
+            result = None
+
+    return result
+
+
+def dump_node(node):
+    return node._dump()
+
 
 # noinspection PyAbstractClass
 class ExprAST(ASTNode):
-    pass
+    __slots__ = ()
 
 
 class Value(ExprAST):
-    val = None
+    __slots__ = ('val',)
 
     def __eq__(self, o):
         other_val = o.val if isinstance(o, Value) else o
@@ -26,9 +131,94 @@ class Value(ExprAST):
 
         return self.val == o.val
 
-    def dump(self):
+    def _dump(self):
         return f'({self.__class__.__name__} {self.val})'
 
 
 class LogicError(Exception):
     pass
+
+
+def _references(node):
+    """
+    The nodes the node holds, not only its children(): a Klass also holds its functions
+    """
+    for _, value in node.fields():
+        if isinstance(value, ASTNode):
+            yield value
+        elif isinstance(value, (list, tuple)):
+            yield from (item for item in value if isinstance(item, ASTNode))
+
+
+def _collect(roots):
+    """
+    :return: every node reachable from the roots, once
+    """
+    nodes = []
+    seen = set()
+    stack = list(roots)
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        nodes.append(node)
+        stack.extend(_references(node))
+    return nodes
+
+
+class _NodePickler(pickle.Pickler):
+    """
+    Pickles nodes as their index, see serialize
+    """
+
+    def __init__(self, file, nodes):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.indices = {id(node): index for index, node in enumerate(nodes)}
+
+    def persistent_id(self, obj):
+        if isinstance(obj, ASTNode):
+            return self.indices[id(obj)]
+        return None
+
+
+class _NodeUnpickler(pickle.Unpickler):
+
+    def __init__(self, file):
+        super().__init__(file)
+        self.nodes = []
+
+    def persistent_load(self, index):
+        return self.nodes[index]
+
+
+def serialize(*roots):
+    """
+    Pickles trees of any depth, which pickle.dumps would recurse into: the classes of the nodes are pickled first,
+    then their attributes, which refer to other nodes by index. Nodes shared by the trees, as the classes collected
+    by the ASTVisitor, are only pickled once.
+    :param roots: ASTNode or list of them
+    :return: bytes, see deserialize
+    """
+    nodes = _collect(item for root in roots for item in (root if isinstance(root, list) else [root]))
+
+    file = io.BytesIO()
+    pickler = _NodePickler(file, nodes)
+    pickler.dump([node.__class__ for node in nodes])
+    pickler.dump([dict(node.fields()) for node in nodes])
+    pickler.dump(roots)
+    return file.getvalue()
+
+
+def deserialize(data):
+    """
+    :return: the tuple of roots given to serialize, rebuilt
+    """
+    # the same unpickler throughout: the three share the memo of the pickler
+    unpickler = _NodeUnpickler(io.BytesIO(data))
+    unpickler.nodes = [cls.__new__(cls) for cls in unpickler.load()]
+
+    for node, state in zip(unpickler.nodes, unpickler.load()):
+        for name, value in state.items():
+            setattr(node, name, value)
+    return unpickler.load()
@@ -1,11 +1,13 @@
 from llvmlite import ir
 
 from opal.ast import ASTNode, LogicError, Value
-from opal.ast.types import String, List, Call, Integer
+from opal.ast.types import String
 from opal.plugin import Plugin
+from opal.static_types import INT, ClassType
 
 
 class BinaryOp(ASTNode, metaclass=Plugin):
+    __slots__ = ('lhs', 'rhs')
     op = None
     alias = None
 
@@ -20,9 +22,9 @@ class BinaryOp(ASTNode, metaclass=Plugin):
         # noinspection PyUnresolvedReferences
         return self.lhs == o.lhs and self.rhs == o.rhs
 
-    def dump(self):
-        left = self.lhs.val if isinstance(self.lhs, Value) else self.lhs.dump()
-        right = self.rhs.val if isinstance(self.rhs, Value) else self.rhs.dump()
+    def _dump(self):
+        left = self.lhs.val if isinstance(self.lhs, Value) else (yield self.lhs)
+        right = self.rhs.val if isinstance(self.rhs, Value) else (yield self.rhs)
         if isinstance(self.lhs, String):
             left = f'"{left}"'
         if isinstance(self.rhs, String):
@@ -33,95 +35,98 @@ class BinaryOp(ASTNode, metaclass=Plugin):
         lhs = self.lhs
         rhs = self.rhs
 
-        left = codegen.visit(lhs)
-        right = codegen.visit(rhs)
+        left = yield lhs
+        right = yield rhs
 
-        if left.type == Integer.as_llvm() and right.type == Integer.as_llvm():
+        if codegen.static_type(lhs, left) is INT and codegen.static_type(rhs, right) is INT:
             return int_ops(codegen.builder, left, right, self)
         return float_ops(codegen.builder, left, right, self)
 
 
 class Assign(BinaryOp):
+    __slots__ = ()
     op = '='
 
     def code(self, codegen):
-        left = codegen.visit(self.lhs)
-        rhs = self.rhs
-        value = codegen.visit(rhs)
+        left = yield self.lhs
+        value = yield self.rhs
 
         name = left.val
+        slot = codegen.slot_of(left, name, declare=True)
+        typ = codegen.static_type(self.rhs, value)
+
+        if isinstance(typ, ClassType):
+            return codegen.assign(slot, value, codegen.get_klass_by_name(typ.name), is_class=True)
 
-        if isinstance(rhs, String):
-            typ = value.type
-        elif isinstance(rhs, List):
-            typ = List.as_llvm().as_pointer()
-        elif isinstance(rhs, Call):
-            typ = codegen.get_klass_by_name(rhs.func)
-            return codegen.assign(name, value, typ, is_class=True)
-        elif not isinstance(rhs, Value):
-            value = codegen.visit(rhs)
-            typ = value.type
-        else:
-            typ = rhs.as_llvm()
-
-        var_address = codegen.assign(name, value, typ)
+        # strings are arrays of their own length, the value has the type of the variable whatever the type of rhs
+        var_address = codegen.assign(slot, value, value.type, name=name)
         return var_address
 
 
 class Comparison(BinaryOp):
-    pass
+    __slots__ = ()
 
 
 class GreaterThan(Comparison):
+    __slots__ = ()
     op = '>'
     alias = 'gt'
 
 
 class GreaterThanEqual(Comparison):
+    __slots__ = ()
     op = '>='
     alias = 'gte'
 
 
 class LessThan(Comparison):
+    __slots__ = ()
     op = '<'
     alias = 'lt'
 
 
 class LessThanEqual(Comparison):
+    __slots__ = ()
     op = '<='
     alias = 'lte'
 
 
 class Equals(Comparison):
+    __slots__ = ()
     op = '=='
     alias = 'eq'
 
 
 class Unequals(Comparison):
+    __slots__ = ()
     op = '!='
     alias = 'neq'
 
 
 class Arithmetic(BinaryOp):
-    pass
+    __slots__ = ()
 
 
 class Mul(Arithmetic):
+    __slots__ = ()
     op = '*'
     alias = 'mul'
 
 
 class Div(Arithmetic):
+    __slots__ = ()
     op = '/'
     alias = 'div'
 
 
 class Add(Arithmetic):
+    __slots__ = ()
     op = '+'
     alias = 'add'
 
 
 class Sub(Arithmetic):
+    __slots__ = ()
     op = '-'
     alias = 'sub'
 
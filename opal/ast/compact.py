@@ -0,0 +1,326 @@
+"""
+Array backed AST: the nodes of a program live in parallel typed arrays instead of a Python object each, a few bytes
+per node, and are read through views.
+
+    kinds          the class of the node, an index into CompactTree.kind_classes
+    first_child    index of its first child, -1 when it has none
+    next_sibling   index of the next child of its parent, -1 for the last one
+    consts         index into the constant pool of its attributes that aren't nodes, or of the target of a reference
+    offsets        offset in the source of the top level statement it belongs to, -1 when unknown
+
+Nodes are laid out in preorder, so walking the whole tree is walking the arrays. The attributes of a node that hold
+nodes (or lists of them) are its children in the order of its slots, the others are a tuple in the constant pool,
+which equal nodes (every `Add`, every `Integer(1)`, every `Var('i')`) share. A node held by two others, as the
+functions of a Klass also in its body, is stored once and referred to by REF_KIND children.
+
+A view is an instance of a subclass of the node's class made by view_class, whose attributes are read from the
+arrays and whose __class__ is the node's class: `code(codegen)`, `dump()`, the interpreter and isinstance checks
+work on them as on the nodes themselves. Views are made on access and are read only.
+"""
+from array import array
+
+from opal.ast import ASTNode, slot_names
+
+LIST_KIND = 0
+TUPLE_KIND = 1
+REF_KIND = 2
+VALUE_KIND = 3
+
+
+class _Marker:
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+    def __reduce__(self):
+        return self.name
+
+
+# in the constant pool, the attribute is a child, or isn't set
+CHILD = _Marker('CHILD')
+UNSET = _Marker('UNSET')
+
+
+class NodeView:
+    """
+    Mixin of the views, see view_class
+    """
+    __slots__ = ()
+    plugin = False
+
+    def fields(self):
+        for position, name in enumerate(self.node_fields):
+            value = self.tree.field(self.index, position)
+            if value is not UNSET:
+                yield name, value
+
+    def materialize(self):
+        """
+        :return: the node as an object tree of its own
+        """
+        return self.tree.materialize(self.index)
+
+    def __eq__(self, o):
+        if isinstance(o, NodeView):
+            o = o.materialize()
+        return self.materialize() == o
+
+    __hash__ = None
+
+
+def _field_property(position, name):
+    def get(self):
+        value = self.tree.field(self.index, position)
+        if value is UNSET:
+            raise AttributeError(name)
+        return value
+
+    return property(get)
+
+
+_views = {}
+
+
+def view_class(cls):
+    """
+    :return: the view subclass of the node class, made once
+    """
+    view = _views.get(cls)
+    if view is None:
+        fields = slot_names(cls)
+        namespace = {
+            '__slots__': ('tree', 'index'),
+            '__module__': __name__,
+            'node_fields': fields,
+            'plugin': False,
+            # for dump(), Value.__eq__ and the lookups by class of the code generator, type() is still the view
+            '__class__': property(lambda self: cls),
+        }
+        for position, name in enumerate(fields):
+            namespace[name] = _field_property(position, name)
+
+        view = type(cls)(f'{cls.__name__}View', (NodeView, cls), namespace)
+        _views[cls] = view
+    return view
+
+
+class CompactTree:
+
+    def __init__(self):
+        self.kinds = array('B')
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+        self.consts = array('i')
+        self.offsets = array('i')
+
+        self.kind_classes = [list, tuple, None, None]
+        self.pool = []
+        # indices of the classes defined by the program, as collected by the ASTVisitor
+        self.classes = []
+
+        self._kind_of = {}
+        self._pool_index = {}
+        self._last_child = {}
+
+    def __len__(self):
+        return len(self.kinds)
+
+    @classmethod
+    def from_ast(cls, program, classes=()):
+        """
+        :param classes: the classes defined in the program, as collected by the ASTVisitor
+        """
+        tree = cls()
+        indices = {}
+        tree.append(program, indices=indices)
+        tree.classes = [indices[id(klass)] for klass in classes]
+        return tree
+
+    def program(self):
+        """
+        :return: (Program, classes) views, for CodeGenerator.generate
+        """
+        return self.node(0), [self.node(index) for index in self.classes]
+
+    def _kind(self, node_class):
+        kind = self._kind_of.get(node_class)
+        if kind is None:
+            kind = len(self.kind_classes)
+            if kind > 255:  # pragma: no cover
+                raise OverflowError('Too many node classes')
+            self.kind_classes.append(node_class)
+            self._kind_of[node_class] = kind
+        return kind
+
+    def _const(self, value):
+        try:
+            key = tuple((item.__class__, item) for item in value) if isinstance(value, tuple) else \
+                (value.__class__, value)
+            index = self._pool_index.get(key)
+        except TypeError:  # unhashable, not shared
+            key = index = None
+
+        if index is None:
+            index = len(self.pool)
+            self.pool.append(value)
+            if key is not None:
+                self._pool_index[key] = index
+        return index
+
+    def _add(self, kind, const, parent, offset, last_child):
+        index = len(self.kinds)
+        self.kinds.append(kind)
+        self.first_child.append(-1)
+        self.next_sibling.append(-1)
+        self.consts.append(const)
+        self.offsets.append(offset)
+
+        if parent >= 0:
+            previous = last_child.get(parent, -1)
+            if previous < 0:
+                self.first_child[parent] = index
+            else:
+                self.next_sibling[previous] = index
+            last_child[parent] = index
+        return index
+
+    def append(self, value, parent=-1, offset=-1, indices=None):
+        """
+        Stores a node, with the nodes it holds, as the last child of `parent`
+        :param value: ASTNode, or list or tuple of them
+        :param parent: index of a node, -1 for a root
+        :param indices: dict to which id(node): index of the nodes stored are added, nodes already in it are stored
+        as references
+        :return: the index of the value
+        """
+        indices = {} if indices is None else indices
+        # only the parent can get more children later, the nodes stored here get all of theirs now
+        last_child = {parent: self._last_child.get(parent, -1)}
+        outer_parent = parent
+
+        root = None
+        stack = [(value, parent)]
+        while stack:
+            value, parent = stack.pop()
+
+            if isinstance(value, ASTNode):
+                target = indices.get(id(value))
+                if target is not None:
+                    index = self._add(REF_KIND, target, parent, offset, last_child)
+                else:
+                    entry = []
+                    children = []
+                    for name in slot_names(value.__class__):
+                        item = getattr(value, name, UNSET)
+                        if isinstance(item, (ASTNode, list, tuple)):
+                            entry.append(CHILD)
+                            children.append(item)
+                        else:
+                            entry.append(item)
+
+                    index = self._add(self._kind(value.__class__), self._const(tuple(entry)), parent, offset,
+                                      last_child)
+                    indices[id(value)] = index
+                    stack.extend((child, index) for child in reversed(children))
+            elif isinstance(value, (list, tuple)):
+                kind = LIST_KIND if isinstance(value, list) else TUPLE_KIND
+                index = self._add(kind, -1, parent, offset, last_child)
+                stack.extend((item, index) for item in reversed(value))
+            else:
+                index = self._add(VALUE_KIND, self._const(value), parent, offset, last_child)
+
+            if root is None:
+                root = index
+
+        if outer_parent >= 0:
+            self._last_child[outer_parent] = last_child[outer_parent]
+        return root
+
+    def children(self, index):
+        child = self.first_child[index]
+        while child >= 0:
+            yield child
+            child = self.next_sibling[child]
+
+    def node(self, index):
+        """
+        :return: the value stored at the index: a view of a node, a list of values, or a constant
+        """
+        kind = self.kinds[index]
+        if kind == REF_KIND:
+            return self.node(self.consts[index])
+        if kind == LIST_KIND:
+            return [self.node(child) for child in self.children(index)]
+        if kind == TUPLE_KIND:
+            return tuple(self.node(child) for child in self.children(index))
+        if kind == VALUE_KIND:
+            return self.pool[self.consts[index]]
+
+        view_type = view_class(self.kind_classes[kind])
+        view = view_type.__new__(view_type)
+        view.tree = self
+        view.index = index
+        return view
+
+    def field(self, index, position):
+        """
+        :return: the attribute at the position in the slots of the node, UNSET when it isn't set
+        """
+        entry = self.pool[self.consts[index]]
+        value = entry[position]
+        if value is not CHILD:
+            return value
+
+        child = self.first_child[index]
+        for _ in range(sum(1 for item in entry[:position] if item is CHILD)):
+            child = self.next_sibling[child]
+        return self.node(child)
+
+    def materialize(self, index=0):
+        """
+        :return: the value at the index rebuilt as objects, see ASTNode
+        """
+        objects = {}
+        order = []
+        stack = [index]
+        while stack:
+            current = stack.pop()
+            kind = self.kinds[current]
+            if kind > VALUE_KIND:
+                node_class = self.kind_classes[kind]
+                objects[current] = node_class.__new__(node_class)
+                order.append(current)
+            stack.extend(self.children(current))
+
+        def value_of(current):
+            kind = self.kinds[current]
+            if kind == REF_KIND:
+                target = self.consts[current]
+                return objects[target] if target in objects else self.materialize(target)
+            if kind == LIST_KIND:
+                return [value_of(child) for child in self.children(current)]
+            if kind == TUPLE_KIND:
+                return tuple(value_of(child) for child in self.children(current))
+            if kind == VALUE_KIND:
+                return self.pool[self.consts[current]]
+            return objects[current]
+
+        for current in order:
+            node = objects[current]
+            children = self.children(current)
+            for name, value in zip(slot_names(node.__class__), self.pool[self.consts[current]]):
+                if value is CHILD:
+                    setattr(node, name, value_of(next(children)))
+                elif value is not UNSET:
+                    setattr(node, name, value)
+
+        return value_of(index)
+
+    def nbytes(self):
+        """
+        :return: the size of the arrays
+        """
+        return sum(len(a) * a.itemsize for a in (self.kinds, self.first_child, self.next_sibling, self.consts,
+                                                  self.offsets))
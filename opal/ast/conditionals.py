@@ -1,17 +1,21 @@
 from opal.ast import ASTNode
 from opal.ast.types import Bool
+from opal.static_types import BOOL
 
 
 class If(ASTNode):
+    __slots__ = ('cond', 'then_', 'else_')
 
     def __init__(self, cond, then_, else_=None):
         self.cond = cond
         self.then_ = then_
         self.else_ = else_
 
-    def dump(self):
-        else_ = self.else_ and f' Else({self.else_.dump()})' or ''
-        s = f'If({self.cond.dump()}) Then({self.then_.dump()})){else_}'
+    def _dump(self):
+        cond = yield self.cond
+        then_ = yield self.then_
+        else_ = self.else_ and f' Else({(yield self.else_)})' or ''
+        s = f'If({cond}) Then({then_})){else_}'
         return s
 
     def code(self, codegen):
@@ -23,9 +27,9 @@ class If(ASTNode):
         if_true_block = codegen.add_block('if.true')
         end_block = codegen.add_block('if.end')
 
-        cond = codegen.visit(self.cond)
+        cond = yield self.cond
 
-        if cond.type != Bool.as_llvm():
+        if codegen.static_type(self.cond, cond) is not BOOL:
             cond = codegen.cast(cond, Bool)
 
         if_false_block = end_block
@@ -37,13 +41,13 @@ class If(ASTNode):
 
         codegen.position_at_end(if_true_block)
 
-        codegen.visit(self.then_)
+        yield self.then_
 
         codegen.branch(end_block)
 
         if self.else_:
             codegen.position_at_end(if_false_block)
-            codegen.visit(self.else_)
+            yield self.else_
             codegen.branch(end_block)
 
         codegen.position_at_end(end_block)
@@ -3,22 +3,24 @@ from opal.ast.types import List, Integer
 
 
 class IndexOf(ASTNode):
+    __slots__ = ('lst', 'index')
 
     def __init__(self, lst: List, index: Integer):
         self.lst = lst
         self.index = index
 
     def code(self, codegen):
-        index = codegen.visit(self.index)
-        vector = codegen.visit(self.lst)
+        index = yield self.index
+        vector = yield self.lst
         val = codegen.vector_get(vector, index)
         return val
 
-    def dump(self):
-        return f'(position {self.index.val} {self.lst.dump()})'
+    def _dump(self):
+        return f'(position {self.index.val} {(yield self.lst)})'
 
 
 class While(ASTNode):
+    __slots__ = ('cond', 'body')
 
     def __init__(self, cond, body):
         self.cond = cond
@@ -35,11 +37,11 @@ class While(ASTNode):
         codegen.branch(cond_block)
         codegen.position_at_end(cond_block)
 
-        cond = codegen.visit(self.cond)
+        cond = yield self.cond
         codegen.cbranch(cond, body_block, end_block)
         codegen.position_at_end(body_block)
 
-        codegen.visit(self.body)
+        yield self.body
 
         if not codegen.is_break:
             codegen.branch(cond_block)
@@ -50,19 +52,20 @@ class While(ASTNode):
         codegen.loop_end_blocks.pop()
         codegen.loop_cond_blocks.pop()
 
-    def dump(self):
-        return f'While({self.cond.dump()}) {self.body.dump()}'
+    def _dump(self):
+        return f'While({(yield self.cond)}) {(yield self.body)}'
 
 
 class For(ASTNode):
+    __slots__ = ('var', 'iterable', 'body')
 
     def __init__(self, var, iterable, body):
         self.var = var
         self.iterable = iterable
         self.body = body
 
-    def dump(self):
-        return f'For({self.var.dump()} in {self.iterable.dump()}) {self.body.dump()}'
+    def _dump(self):
+        return f'For({(yield self.var)} in {(yield self.iterable)}) {(yield self.body)}'
 
     def code(self, codegen):
         init_block = codegen.add_block('for.init')
@@ -75,9 +78,9 @@ class For(ASTNode):
 
         codegen.branch(init_block)
         codegen.position_at_end(init_block)
-        vector = codegen.visit(self.iterable)
+        vector = yield self.iterable
 
-        size = codegen.call('vector_size', [vector])
+        size = codegen.vector_size(vector)
 
         size = codegen.alloc_and_store(size, Integer.as_llvm(), name='size')
         index = codegen.alloc_and_store(codegen.const(0), Integer.as_llvm(), 'index')
@@ -92,11 +95,12 @@ class For(ASTNode):
         codegen.position_at_end(body_block)
 
         pos = codegen.load(index)
-        val = codegen.vector_get(vector, pos)
+        # the index is below the size
+        val = codegen.vector_get(vector, pos, checked=False)
 
-        codegen.assign(self.var.val, val, Integer.as_llvm())
+        codegen.assign(codegen.slot_of(self.var, self.var.val, declare=True), val, val.type, name=self.var.val)
 
-        codegen.visit(self.body)
+        yield self.body
 
         if not codegen.is_break:
             codegen.builder.store(codegen.builder.add(codegen.const(1), pos), index)
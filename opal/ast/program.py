@@ -5,6 +5,7 @@ from opal.ast.terminals import Continue
 
 
 class Program(ASTNode):
+    __slots__ = ('block',)
 
     def __init__(self, block=None):
         self.block = block and block or Block()
@@ -13,17 +14,16 @@ class Program(ASTNode):
         return self.block.__eq__(o.block)
 
     def code(self, codegen):
-        codegen.visit(self.block)
-        codegen.branch(codegen.exit_blocks[0])
-        codegen.position_at_end(codegen.exit_blocks[0])
-        codegen.builder.ret_void()
+        yield self.block
+        codegen.end_entry()
 
-    def dump(self):
-        s = f"({self.__class__.__name__}\n  {self.block.dump()})"
+    def _dump(self):
+        s = f"({self.__class__.__name__}\n  {(yield self.block)})"
         return s
 
 
 class Block(ASTNode):
+    __slots__ = ('_statements',)
 
     def __init__(self, body=None):
         if isinstance(body, list):
@@ -47,13 +47,16 @@ class Block(ASTNode):
             # TODO: This won't work but keeping this for now
             if isinstance(stmt, Continue):
                 return
-            temp = codegen.visit(stmt)
+            temp = yield stmt
             if temp:
                 ret = temp
         return ret
 
-    def dump(self):
-        stmts = '\n'.join([stmt.dump() for stmt in self._statements])
+    def _dump(self):
+        stmts = []
+        for stmt in self._statements:
+            stmts.append((yield stmt))
+        stmts = '\n'.join(stmts)
 
         s = f"({self.__class__.__name__}\n  {stmts})"
         return s
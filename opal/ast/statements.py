@@ -1,14 +1,14 @@
 from llvmlite import ir
-from llvmlite.ir import PointerType
 
-from opal.ast import Value
-from opal.ast.types import Int8, Any, Bool, Integer, Float, String
-from opal.ast.vars import VarValue
+from opal.ast import ASTNode, Value
+from opal.ast.types import Int8, Any, String
+from opal.static_types import BOOL, FLOAT, INT, STRING
 
 INDICES = [ir.Constant(ir.IntType(32), 0), ir.Constant(ir.IntType(32), 0)]
 
 
 class Print(Value, Any):
+    __slots__ = ()
 
     def __init__(self, expr):
         self.val = expr
@@ -16,25 +16,14 @@ class Print(Value, Any):
     def __eq__(self, o):
         return self.val == o.val
 
-    def dump(self):
-        return f'({self.__class__.__name__} {self.val.dump()})'
-    
+    def _dump(self):
+        return f'({self.__class__.__name__} {(yield self.val)})'
+
     def code(self, codegen):
-        val = codegen.visit(self.val)
-        typ = None
-        if isinstance(self.val, VarValue):
-            typ = codegen.typetab[self.val.val]
-
-        if isinstance(self.val, String) or isinstance(typ, PointerType):
-            typ = String
-        elif isinstance(self.val, Integer) or val.type is Integer.as_llvm():
-            typ = Integer
-        elif isinstance(self.val, Float) or val.type is Float.as_llvm():
-            typ = Float
-        elif isinstance(self.val, Bool) or val.type is Bool.as_llvm():
-            typ = Bool
-
-        if typ is String:
+        val = yield self.val
+        typ = codegen.static_type(self.val, val)
+
+        if typ is STRING:
             # Cast to a i8* pointer
             char_ty = val.type.pointee.element
             str_ptr = codegen.bitcast(val, char_ty.as_pointer())
@@ -42,7 +31,7 @@ class Print(Value, Any):
             codegen.call('puts', [str_ptr])
             return
 
-        if typ is Integer:
+        if typ is INT:
             number = codegen.alloc_and_store(val, val.type)
             number_ptr = codegen.load(number)
 
@@ -55,7 +44,7 @@ class Print(Value, Any):
             codegen.call('puts', [buffer_ptr])
             return
 
-        if typ is Float:
+        if typ is FLOAT:
             percent_g = String('%g\n').code(codegen)
             percent_g = codegen.gep(percent_g, INDICES)
 
@@ -65,7 +54,7 @@ class Print(Value, Any):
             codegen.call('printf', [percent_g, val])
             return
 
-        if typ is Bool:
+        if typ is BOOL:
             mod = codegen.module
             true = codegen.insert_const_string(mod, 'true')
             true = codegen.gep(true, INDICES)
@@ -84,4 +73,23 @@ class Print(Value, Any):
 
             return
 
-        raise NotImplementedError(f'can\'t print {self.val}')
\ No newline at end of file
+        raise NotImplementedError(f'can\'t print {self.val}')
+
+
+class Import(ASTNode):
+    """
+    Runs the top level statements of a module, found and compiled by opal.modules, and gives access to its classes
+    """
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __eq__(self, o):
+        return isinstance(o, Import) and self.name == o.name
+
+    def _dump(self):
+        return f'(Import {self.name})'
+
+    def code(self, codegen):
+        return codegen.import_module(self.name)
@@ -2,30 +2,36 @@ from opal.ast import ASTNode
 
 
 class Continue(ASTNode):
-    def dump(self):
+    __slots__ = ()
+
+    def _dump(self):
         return 'Continue'
 
 
 class Break(ASTNode):
+    __slots__ = ()
+
     # noinspection PyMethodMayBeStatic
     def code(self, codegen):
         codegen.is_break = True
         return codegen.branch(codegen.loop_end_blocks[-1])
 
-    def dump(self):
+    def _dump(self):
         return 'Break'
 
 
 class Return(ASTNode):
+    __slots__ = ('val',)
+
     def __init__(self, val):
         self.val = val
 
     def code(self, codegen):
         previous_block = codegen.builder.block
         codegen.position_at_end(codegen.exit_blocks[-1])
-        ret = codegen.builder.ret(codegen.visit(self.val))
+        ret = codegen.builder.ret((yield self.val))
         codegen.position_at_end(previous_block)
         return ret
 
-    def dump(self):
-        return f'(Return {self.val.dump()})'
+    def _dump(self):
+        return f'(Return {(yield self.val)})'
@@ -1,7 +1,6 @@
 from typing import Iterable
 
 import llvmlite.ir as ir
-from llvmlite.llvmpy.core import Builder
 
 from opal.ast import Value, ASTNode
 from opal.ast.program import Block
@@ -11,6 +10,7 @@ INDICES = [ir.Constant(ir.IntType(32), 0), ir.Constant(ir.IntType(32), 0)]
 
 
 class Any:
+    __slots__ = ()
     _llvm_type = ir.VoidType()
 
     @classmethod
@@ -20,6 +20,7 @@ class Any:
 
 # noinspection PyMethodMayBeStatic
 class Integer(Any, Value):
+    __slots__ = ()
     _llvm_type = ir.IntType(32)
 
     def __init__(self, val):
@@ -30,6 +31,7 @@ class Integer(Any, Value):
 
 
 class Int8(Any, Value):
+    __slots__ = ()
     _llvm_type = ir.IntType(8)
 
     def __init__(self, val):
@@ -37,12 +39,13 @@ class Int8(Any, Value):
 
 
 class Bool(Any, Value):
+    __slots__ = ()
     _llvm_type = ir.IntType(1)
 
     def __init__(self, val):
         self.val = bool(val)
 
-    def dump(self):
+    def _dump(self):
         return f'({self.__class__.__name__} {str(self.val).lower()})'
 
     def code(self, codegen):
@@ -51,6 +54,7 @@ class Bool(Any, Value):
 
 # TODO: make it decimal? https://docs.python.org/3/library/decimal.html
 class Float(Any, Value):
+    __slots__ = ()
     _llvm_type = ir.DoubleType()
 
     def __init__(self, val):
@@ -61,23 +65,47 @@ class Float(Any, Value):
 
 
 class List(Any, ASTNode):
+    """
+    Lists of ints, floats or bools are arrays of their unboxed values, the others vectors of the CLib runtime boxing
+    them into pointers. Both are {size, capacity, data}
+    """
+    __slots__ = ('_items',)
     _llvm_type = ir.LiteralStructType([Integer.as_llvm(), Integer.as_llvm(), Int8.as_llvm().as_pointer().as_pointer()])
 
     def __init__(self, items: Iterable[Value]):
         self._items = items
 
+    @classmethod
+    def as_llvm_of(cls, element=None):
+        """
+        :param element: LLVM type of the unboxed elements, None for the vector of the runtime
+        """
+        if element is None:
+            return cls.as_llvm()
+        return ir.LiteralStructType([Integer.as_llvm(), Integer.as_llvm(), element.as_pointer()])
+
     @property
     def items(self):
         return self._items
 
-    def dump(self):
-        return "[{0}]".format(', '.join([item.dump() for item in self._items]))
+    def _dump(self):
+        items = []
+        for item in self._items:
+            items.append((yield item))
+        return "[{0}]".format(', '.join(items))
 
     def code(self, codegen):
+        values = []
+        for item in self.items:
+            values.append((yield item))
+
+        element = codegen.list_element_type(self, values)
+        if element is not None:
+            return codegen.unboxed_list(values, element)
+
         vector = codegen.alloc(List.as_llvm())
         codegen.call('vector_init', [vector])
-        for item in self.items:
-            val = codegen.visit(item)
+        for val in values:
             codegen.call('vector_append', [vector, codegen.builder.inttoptr(val, Int8.as_llvm().as_pointer())])
         return vector
 
@@ -99,6 +127,7 @@ class List(Any, ASTNode):
 
 
 class String(Any, Value):
+    __slots__ = ()
     _llvm_type = ir.IntType(8).as_pointer
 
     def __init__(self, val):
@@ -109,6 +138,8 @@ class String(Any, Value):
 
 
 class Funktion(ASTNode):
+    __slots__ = ('name', 'params', 'body', 'ret_type', 'is_constructor')
+
     def __init__(self, name, params, body, ret_type=None, is_constructor=False):
         self.name = name
         self.params = params
@@ -116,22 +147,23 @@ class Funktion(ASTNode):
         self.ret_type = ret_type
         self.is_constructor = is_constructor
 
-    def dump(self):
+    def _dump(self):
         args = ','.join([arg.dump() for arg in self.params])
         ret_type = self.ret_type and f'{self.ret_type} ' or ''
         # ret_type = self.ret_type and self.ret_type.val.__class__.__name__
         # ret_type = ret_type and f'{ret_type} ' or ''
         name = '{0}{1}'.format(self.is_constructor and ':' or '', self.name)
-        return f'({ret_type}{name}({args}) {self.body.dump()})'
+        return f'({ret_type}{name}({args}) {(yield self.body)})'
 
     def code(self, codegen):
         klass = codegen.current_class
 
         method_name = f'{klass.name}::{self.name}'
 
-        func = list(filter(lambda f: f.name == method_name, codegen.module.functions))[0]
+        func = codegen.get_method(method_name)
 
         codegen.function_stack.append(func)
+        codegen.push_frame()
 
         old_func = codegen.current_function
         old_builder = codegen.builder
@@ -139,15 +171,15 @@ class Funktion(ASTNode):
         entry_block = codegen.add_block('entry')
         exit_block = codegen.add_block('exit')
         codegen.exit_blocks.append(exit_block)
-        codegen.builder = Builder(entry_block)
+        codegen.builder = ir.IRBuilder(entry_block)
 
         if self.is_constructor:
             this = codegen.gep(func.args[0], INDICES)
-            codegen.builder.store(codegen.module.get_global(f'{klass.name}_vtable'), this)
+            codegen.builder.store(codegen.get_vtable(klass.name), this)
 
         body = self.body
         if body:
-            ret = codegen.visit(body)
+            ret = yield body
         else:
             ret = None
 
@@ -160,12 +192,15 @@ class Funktion(ASTNode):
         codegen.current_function = old_func
         codegen.builder = old_builder
         codegen.exit_blocks.pop()
+        codegen.pop_frame()
         codegen.function_stack.pop()
 
         return func
 
 
 class Klass(ASTNode):
+    __slots__ = ('name', 'body', 'parent', 'functions')
+
     def __init__(self, name, body: Block, parent=None):
         self.name = name
         self.body = body
@@ -174,26 +209,32 @@ class Klass(ASTNode):
             self.parent = 'Object'
         self.functions = []
 
-    def dump(self):
-        return f'(class {self.name}{self.body.dump()})'
+    def _dump(self):
+        return f'(class {self.name}{(yield self.body)})'
 
     def add_function(self, funktion: Funktion):
         self.functions.append(funktion)
 
+    def children(self):
+        # functions are also in the body
+        yield self.body
+
     def code(self, codegen):
         codegen.current_class = self
-        body = codegen.visit(self.body)
+        body = yield self.body
 
         codegen.current_class = None
         return body
 
 
 class Param(ASTNode):
+    __slots__ = ('_name', '_type', 'slot')
+
     def __init__(self, name, type_):
         self._name = name
         self._type = type_
 
-    def dump(self):
+    def _dump(self):
         type_ = self.type and f'::{self.type}' or ''
         return f'{self.name}{type_}'
 
@@ -207,6 +248,8 @@ class Param(ASTNode):
 
 
 class Call(ASTNode):
+    __slots__ = ('func', 'args')
+
     def __init__(self, func, args):
         self.func = func
 
@@ -215,8 +258,11 @@ class Call(ASTNode):
 
         self.args = args
 
-    def dump(self):
-        args = ', '.join([arg.dump() for arg in self.args])
+    def _dump(self):
+        args = []
+        for arg in self.args:
+            args.append((yield arg))
+        args = ', '.join(args)
         return f'{self.func}({args})'
 
     def code(self, codegen):
@@ -235,6 +281,8 @@ class Call(ASTNode):
 
 
 class MethodCall(ASTNode):
+    __slots__ = ('instance', 'method', 'args', 'slot')
+
     def __init__(self, instance, method, args):
         self.instance = instance
         self.method = method
@@ -244,15 +292,18 @@ class MethodCall(ASTNode):
 
         self.args = args
 
-    def dump(self):
-        args = ', '.join([arg.dump() for arg in self.args])
+    def _dump(self):
+        args = []
+        for arg in self.args:
+            args.append((yield arg))
+        args = ', '.join(args)
         return f'({self.instance}.{self.method} {args})'
 
     def code(self, codegen):
-        var = self.instance
+        slot = codegen.slot_of(self, self.instance)
 
-        instance = codegen.get_var(var)
-        typ = codegen.get_var_type(var)
+        instance = codegen.get_var(slot)
+        typ = codegen.get_var_type(slot)
 
         func = f'{typ.name}::{self.method}'
 
@@ -2,6 +2,9 @@ from opal.ast import Value
 
 
 class Var(Value):
+    # see opal.resolver
+    __slots__ = ('slot',)
+
     def __init__(self, val):
         self.val = val
 
@@ -12,9 +15,11 @@ class Var(Value):
 
 
 class VarValue(Value):
+    __slots__ = ('slot',)
+
     def __init__(self, val):
         self.val = val
 
     def code(self, codegen):
-        name = codegen.symtab[self.val]
-        return codegen.load(name)
+        address = codegen.get_var(codegen.slot_of(self, self.val))
+        return codegen.load(address)
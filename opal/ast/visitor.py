@@ -1,14 +1,15 @@
 # AST hierarchy
 
 
-from lark import InlineTransformer
+from lark import InlineTransformer, Tree
 from lark.lexer import Token
 
+from opal.ast import trampoline
 from opal.ast.binop import Assign, Comparison, Mul, Div, Add, Sub
 from opal.ast.conditionals import If
 from opal.ast.iterators import IndexOf, While, For
 from opal.ast.program import Program, Block
-from opal.ast.statements import Print
+from opal.ast.statements import Import, Print
 from opal.ast.terminals import Continue, Break, Return
 from opal.ast.types import Bool, Integer, List, Float, String, Klass, Funktion, Param, Call, MethodCall
 from opal.ast.vars import Var, VarValue
@@ -22,6 +23,26 @@ class ASTVisitor(InlineTransformer):
         self.ret_val = None
         super().__init__()
 
+    def transform(self, tree):
+        """
+        As InlineTransformer.transform, with an explicit stack instead of recursion
+        """
+        return trampoline(tree, self._transform)
+
+    def _transform(self, tree):
+        if not isinstance(tree, Tree):
+            return tree
+
+        items = []
+        for child in tree.children:
+            items.append((yield child))
+
+        try:
+            f = self._get_func(tree.data)
+        except AttributeError:
+            return self.__default__(tree.data, items)
+        return f(items)
+
     def add_klass(self, klass):
         has_constructor = False
 
@@ -148,6 +169,9 @@ class ASTVisitor(InlineTransformer):
     def param(self, name, type_=None):
         return Param(name, type_ and type_.value)
 
+    def import_(self, *names):
+        return Import('.'.join(name.value for name in names))
+
     def ret_(self, val):
         ret_val = Return(val)
         self.ret_val = ret_val
@@ -0,0 +1,206 @@
+import fcntl
+import glob
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from hashlib import sha3_256
+from os import path
+
+# noinspection PyPackageRequirements
+from llvmlite import binding as llvm
+
+import opal
+from opal.ast import deserialize, serialize
+
+DEFAULT_CACHE_DIR = path.join(path.expanduser('~'), '.cache', 'opal')
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+OBJECT_EXTENSION = '.o'
+AST_EXTENSION = '.ast'
+BITCODE_EXTENSION = '.bc'
+
+DEFAULT_MAX_ASTS = 128
+
+_compiler_digest = None
+
+
+def get_compiler_digest():
+    """
+    Identifies the compiler build: a hash of the opal sources and grammars plus the LLVM version, computed
+    once per process. Any change to the compiler invalidates everything it has cached.
+    """
+    global _compiler_digest
+
+    if _compiler_digest is None:
+        opal_path = path.dirname(path.realpath(opal.__file__))
+        files = glob.glob(path.join(opal_path, '**', '*.py'), recursive=True)
+        files += glob.glob(path.join(opal_path, 'grammars', '*.g'))
+
+        m = sha3_256()
+        m.update('.'.join(map(str, llvm.llvm_version_info)).encode('utf-8'))
+        for file in sorted(files):
+            m.update(path.relpath(file, opal_path).encode('utf-8'))
+            with open(file, 'rb') as f:
+                m.update(f.read())
+        _compiler_digest = m.hexdigest()
+
+    return _compiler_digest
+
+
+def cache_key(*parts):
+    m = sha3_256()
+    for part in parts:
+        m.update(str(part).encode('utf-8'))
+        m.update(b'\0')
+    return m.hexdigest()
+
+
+class ObjectCache:
+    """
+    Content addressed, on disk store of compiled object code shared by every process using the same directory.
+
+    Entries are written to a temporary file and renamed into place, so readers only ever see complete objects.
+    Reading an entry touches it, and once the store grows past `max_size` the least recently used entries are
+    evicted, under a lock so concurrent writers don't race each other.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_size=DEFAULT_MAX_SIZE, extension=OBJECT_EXTENSION):
+        """
+        :param extension: of the entries, stores of different things can share the directory
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self.extension = extension
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return path.join(self.directory, f'{key}{self.extension}')
+
+    def __contains__(self, key):
+        return path.exists(self._path(key))
+
+    def load(self, key):
+        """
+        :return: the object code stored for the key, or None
+        """
+        file = self._path(key)
+        try:
+            with open(file, 'rb') as f:
+                buffer = f.read()
+            os.utime(file)
+        except FileNotFoundError:  # never stored or evicted by another process
+            return None
+
+        return buffer
+
+    def store(self, key, buffer):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(buffer)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+        self.evict()
+
+    def entries(self):
+        """
+        :return: (mtime, size, path) of every entry, least recently used first
+        """
+        entries = []
+        for file in glob.glob(path.join(self.directory, f'*{self.extension}')):
+            try:
+                stat = os.stat(file)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, file))
+        return sorted(entries)
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        with open(path.join(self.directory, '.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+            entries = self.entries()
+            total = sum(size for _, size, _ in entries)
+
+            for _, size, file in entries:
+                if total <= self.max_size:
+                    break
+                try:
+                    os.unlink(file)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def clear(self):
+        for _, _, file in self.entries():
+            try:
+                os.unlink(file)
+            except FileNotFoundError:
+                pass
+
+
+class ASTCache:
+    """
+    Parsed programs, so compiling the same source again, at another optimization level or by another evaluator,
+    skips the parser. The ASTs are kept serialized (see opal.ast.serialize), every hit gets a tree of its own that
+    it's free to change.
+
+    The last `max_entries` programs are kept in memory, and all of them on disk when given a directory, in an
+    ObjectCache of their own. Entries are keyed by the source and the compiler digest, which covers the grammar and
+    the AST classes.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ASTS, directory=None, max_size=DEFAULT_MAX_SIZE):
+        self.max_entries = max_entries
+        self.disk = directory and ObjectCache(directory, max_size, extension=AST_EXTENSION) or None
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(code):
+        return cache_key(code, get_compiler_digest())
+
+    def load(self, code):
+        """
+        :return: (Program, classes) parsed from the code, or None
+        """
+        key = self.key(code)
+        with self._lock:
+            data = self.entries.get(key)
+            if data is not None:
+                self.entries.move_to_end(key)
+
+        if data is None and self.disk:
+            data = self.disk.load(key)
+            if data is not None:
+                self._remember(key, data)
+
+        return data is not None and deserialize(data) or None
+
+    def store(self, code, program, classes):
+        key = self.key(code)
+        data = serialize(program, list(classes))
+
+        self._remember(key, data)
+        if self.disk:
+            self.disk.store(key, data)
+
+    def _remember(self, key, data):
+        with self._lock:
+            self.entries[key] = data
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+        if self.disk:
+            self.disk.clear()
@@ -0,0 +1,114 @@
+"""
+Client of the compile server (see opal.server). It only needs the standard library, so it starts in the time it
+takes Python to.
+
+    python -m opal.client program.opal
+    echo 'print(42)' | python -m opal.client -
+
+Messages are JSON, prefixed by their length as a 4 bytes big endian integer. A request is
+`{"code": ..., "opt_level": 0, "size_level": 0}` (or `{"command": "ping"}`), its response
+`{"status": ..., "stdout": ..., "stderr": ..., "report": ..., "time": ...}` where `report` is the
+opal.report.CompileReport of the program, as a dict, and `time` the seconds the server spent on it. Invalid
+requests get a status of 1 and what's wrong with them in `stderr`.
+"""
+import argparse
+import json
+import os
+import socket
+import struct
+import sys
+from os import path
+
+SOCKET_ENV = 'OPAL_SOCKET'
+# opal.cache.DEFAULT_CACHE_DIR, not imported to keep the client light
+DEFAULT_SOCKET = path.join(path.expanduser('~'), '.cache', 'opal', 'opal.sock')
+
+HEADER = struct.Struct('!I')
+
+
+def get_socket_path(socket_path=None):
+    return socket_path or os.environ.get(SOCKET_ENV, DEFAULT_SOCKET)
+
+
+def send_message(sock, message):
+    data = json.dumps(message).encode('utf-8')
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+
+def _receive_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 16))
+        if not chunk:
+            raise ConnectionError('connection closed before the end of the message')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def receive_message(sock):
+    size, = HEADER.unpack(_receive_exactly(sock, HEADER.size))
+    return json.loads(_receive_exactly(sock, size).decode('utf-8'))
+
+
+class Client:
+    """
+        result = Client().evaluate('print(42)')
+        result['stdout']  # '42\\n'
+    """
+
+    def __init__(self, socket_path=None, timeout=None):
+        self.socket_path = get_socket_path(socket_path)
+        self.timeout = timeout
+
+    def request(self, message):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            send_message(sock, message)
+            return receive_message(sock)
+
+    def ping(self):
+        """
+        :return: whether a server answers on the socket
+        """
+        try:
+            return self.request({'command': 'ping'})['status'] == 0
+        except (OSError, ValueError):
+            return False
+
+    def evaluate(self, code, opt_level=0, size_level=0):
+        return self.request({'code': code, 'opt_level': opt_level, 'size_level': size_level})
+
+
+def get_arg_parser():
+    arg_parser = argparse.ArgumentParser(prog='opal', description='Runs Opal programs on the compile server')
+    arg_parser.add_argument('source', help='Opal source file, - for stdin')
+    arg_parser.add_argument('--socket', help=f'Unix socket (default: ${SOCKET_ENV} or {DEFAULT_SOCKET})')
+    arg_parser.add_argument('-O', dest='opt', type=int, choices=range(4), default=0, help='optimization level')
+    arg_parser.add_argument('--timings', action='store_true', help='prints the time spent in each phase to stderr')
+    return arg_parser
+
+
+def main(argv=None):
+    args = get_arg_parser().parse_args(argv)
+
+    if args.source == '-':
+        code = sys.stdin.read()
+    else:
+        with open(args.source, 'r') as f:
+            code = f.read()
+
+    result = Client(args.socket).evaluate(code, opt_level=args.opt)
+
+    sys.stdout.write(result['stdout'])
+    sys.stderr.write(result['stderr'])
+
+    if args.timings:
+        print(json.dumps({'report': result['report'], 'time': result['time']}, indent=2), file=sys.stderr)
+
+    return result['status']
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
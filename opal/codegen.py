@@ -3,57 +3,182 @@ from hashlib import sha3_256
 
 # noinspection PyPackageRequirements
 from llvmlite import ir as ir
-from llvmlite.llvmpy.core import Constant, Module, Function, Builder
 
-from opal.ast import ASTNode
-from opal.ast.visitor import ASTVisitor
+from opal.ast import ASTNode, trampoline, walk
 from opal.ast.program import Program
+from opal.ast.terminals import Continue
 from opal.ast.types import Int8, Any, Bool, Integer, List, Float, Klass, get_param_type
-from opal.parser import parser
-from resources.llvmex import CodegenError
+from opal.folding import ConstantFolder, fold_constants
+from opal.inference import TypeInference, common_type
+from opal.report import NULL_REPORT
+from opal.resolver import Resolver, resolve_names
+from opal.static_types import UNBOXED_TYPES, UNKNOWN, ListType, type_of_value
 
 INDICES = [ir.Constant(ir.IntType(32), 0), ir.Constant(ir.IntType(32), 0)]
 
 PRIVATE_LINKAGE = 'private'
 
+# reports an out of bounds index of an unboxed list, as vector_get of the runtime does
+INDEX_ERROR = 'opal.index_error'
+INDEX_ERROR_MESSAGE = 'Index %d out of bounds for vector of size %d\n'
+
+# parsing and spooling a statement at a time costs more than the few lines of AST and IR kept by grouping them
+STREAM_CHUNK_LINES = 200
+
+
+class CodegenError(Exception):
+    pass
+
+
+def module_entry(name):
+    """
+    :return: name of the function running the top level statements of an imported module
+    """
+    return f'{name}.init'
+
+
+def stringz(string):
+    """
+    :return: constant array with the UTF-8 bytes of the string, null terminated
+    """
+    data = bytearray(string.encode('utf-8') + b'\0')
+    return ir.Constant(ir.ArrayType(ir.IntType(8), len(data)), data)
+
 
 class Printable(object):
     pass
 
 
-class CodeGenerator(Printable):
+class Frame:
+    """
+    The variables of the function being generated, by the slots opal.resolver gave them: their address, or the
+    instance itself for class instances, and their type
+    """
+    __slots__ = ('addresses', 'types', 'names')
+
     def __init__(self):
-        # TODO: come up with a less naive way of handling the symtab and types
+        self.addresses = []
+        self.types = []
+        # slots of the variables of trees the resolver couldn't annotate, as read only views of opal.ast.compact
+        self.names = {}
+
+    def set(self, slot, address, typ):
+        missing = slot + 1 - len(self.addresses)
+        if missing > 0:
+            self.addresses += [None] * missing
+            self.types += [None] * missing
+        self.addresses[slot] = address
+        self.types[slot] = typ
+
+    def get(self, slot):
+        return slot < len(self.addresses) and self.addresses[slot] or None
+
+
+class StreamedFunction(ir.Function):
+    """
+    Function whose finished blocks are turned into text as soon as the code generator leaves them, freeing their
+    instructions, which take many times the memory of their text. The streaming front end spools the entry function
+    after every top level statement.
+
+    Its first block, where the code generator allocates the variables, is never spooled: it stays the entry block
+    and gets allocas for as long as code is generated.
+    """
+
+    def __init__(self, module, ftype, name):
+        super().__init__(module, ftype, name)
+        self.spooled = []
+        self.spooled_blocks = 0
+        self.spooled_instructions = 0
+
+    def spool(self, keep):
+        """
+        :param keep: the blocks code can still be added to, besides the first one
+        """
+        text = []
+        blocks = self.blocks[:1]
+        for block in self.blocks[1:]:
+            if block in keep:
+                blocks.append(block)
+                continue
+
+            block.descr(text)
+            self.spooled_blocks += 1
+            self.spooled_instructions += len(block.instructions)
+            # the variables still refer to their allocas, and through them to this block: the branches it ends
+            # with would keep every block after it alive
+            block.instructions = []
+
+        self.spooled.append(''.join(text))
+        self.blocks = blocks
+
+    def descr_body(self, buf):
+        self.blocks[0].descr(buf)
+        buf += self.spooled
+        for block in self.blocks[1:]:
+            block.descr(buf)
+
+
+class CodeGenerator(Printable):
+    def __init__(self, entry='main', shared_classes=None, once=False):
+        """
+        :param entry: name of the function wrapping the top level statements
+        :param shared_classes: classes already compiled into another module of the same JIT session.
+        They are declared instead of defined, and the vtables of new classes get exported so later
+        modules can link against them.
+        :param once: the entry function only runs the statements the first time it's called, as the one of a module
+        imported by several others
+        """
         self.classes = None
-        self.symtab = {}
-        self.typetab = {}
+        self.shared_classes = shared_classes
+        # registries of the classes by name, and of the LLVM functions of their methods and their vtables
+        self.classes_by_name = {}
+        # set by add_classes: shared_classes can be set after the code generator is built, see OpalEvaluator
+        self.shared_class_names = set()
+        self.methods = {}
+        self.vtables = {}
+        self.entry = entry
+        self.frames = [Frame()]
         self.is_break = False
         self.current_class = None
 
         self.loop_end_blocks = []
         self.loop_cond_blocks = []
         context = ir.Context()
-        self.module = Module(name='opal-lang', context=context)
+        self.module = ir.Module(name='opal-lang', context=context)
         self.blocks = []
-        self.scope = {}
 
         self._add_builtins()
 
         func_ty = ir.FunctionType(ir.VoidType(), [])
-        func = Function(self.module, func_ty, 'main')
+        func = StreamedFunction(self.module, func_ty, entry)
 
         self.current_function = func
+        # where alloc_variable allocates the variables of the top level statements, see end_entry
+        self.add_block('allocas')
         entry_block = self.add_block('entry')
         exit_block = self.add_block('exit')
 
         self.function_stack = [func]
-        self.builder = Builder(entry_block)
+        self.builder = ir.IRBuilder(entry_block)
         self.exit_blocks = [exit_block]
         self.block_stack = [entry_block]
 
+        if once:
+            self._run_once(exit_block)
+
     def __str__(self):
         return str(self.module)
 
+    def _run_once(self, exit_block):
+        done = ir.GlobalVariable(self.module, Bool.as_llvm(), f'{self.entry}.done')
+        done.linkage = PRIVATE_LINKAGE
+        done.initializer = ir.Constant(Bool.as_llvm(), 0)
+
+        body = self.add_block('body')
+        self.cbranch(self.load(done), exit_block, body)
+        self.position_at_end(body)
+        self.builder.store(ir.Constant(Bool.as_llvm(), 1), done)
+
     def _add_builtins(self):
         malloc_ty = ir.FunctionType(Int8.as_llvm().as_pointer(), [Integer.as_llvm()])
         ir.Function(self.module, malloc_ty, 'malloc')
@@ -84,6 +209,9 @@ class CodeGenerator(Printable):
         vector_size_ty = ir.FunctionType(Integer.as_llvm(), [List.as_llvm().as_pointer()])
         ir.Function(self.module, vector_size_ty, 'vector_size')
 
+        exit_ty = ir.FunctionType(Any.as_llvm(), [Integer.as_llvm()])
+        ir.Function(self.module, exit_ty, 'exit')
+
     def alloc(self, typ, name=''):
         return self.builder.alloca(typ, name=name)
 
@@ -95,29 +223,63 @@ class CodeGenerator(Printable):
     def add_block(self, name):
         return self.current_function.append_basic_block(name)
 
-    def assign(self, name, value, typ, is_class=False):
+    def alloc_variable(self, typ, name=''):
+        """
+        Allocates a variable in the entry block of the function, whichever block assigns it first, so it's allocated
+        once, dominates its uses and LLVM can keep it in a register
+        """
+        func = self.current_function
+        # code is only ever appended to the end of blocks
+        block = self.builder.block
+        self.builder.position_at_start(func.blocks[0])
+        var_address = self.alloc(typ, name)
+        self.position_at_end(block)
+        return var_address
+
+    def push_frame(self):
+        self.frames.append(Frame())
+
+    def pop_frame(self):
+        self.frames.pop()
+
+    def slot_of(self, node, name, declare=False):
+        """
+        :param node: the node naming the variable, annotated by opal.resolver
+        :param declare: whether the variable is being assigned, a slot is given to the ones of trees the resolver
+        couldn't annotate on their first assignment
+        :return: the slot of the variable in the frame of the function
+        """
+        slot = getattr(node, 'slot', None)
+        if slot is not None:
+            return slot
+
+        names = self.frames[-1].names
+        if declare and name not in names:
+            names[name] = len(self.frames[-1].addresses)
+            self.frames[-1].set(names[name], None, None)
+        return names[name]
+
+    def assign(self, slot, value, typ, is_class=False, name=''):
+        frame = self.frames[-1]
         if is_class:
-            self.symtab[name] = value
-            self.typetab[name] = typ
+            frame.set(slot, value, typ)
             return value
 
-        old_val = self.symtab.get(name)
-        if old_val:
-            new_val = self.builder.store(value, old_val)
-            self.symtab[name] = new_val.operands[1]
-            return new_val
+        var_address = frame.get(slot)
+        if var_address:
+            return self.builder.store(value, var_address)
 
-        var_address = self.alloc_and_store(value, typ, name=name)
+        var_address = self.alloc_variable(typ, name)
+        self.builder.store(value, var_address)
 
-        self.symtab[name] = var_address
-        self.typetab[name] = typ
+        frame.set(slot, var_address, typ)
         return var_address
 
-    def get_var(self, name):
-        return self.symtab[name]
+    def get_var(self, slot):
+        return self.frames[-1].addresses[slot]
 
-    def get_var_type(self, name):
-        return self.typetab[name]
+    def get_var_type(self, slot):
+        return self.frames[-1].types[slot]
 
     # noinspection SpellCheckingInspection
     def bitcast(self, value, type_):
@@ -133,16 +295,162 @@ class CodeGenerator(Printable):
     def gep(self, ptr, indices, inbounds=False, name=''):
         return self.builder.gep(ptr, indices, inbounds, name)
 
-    def generate_code(self, code):
+    def generate_code(self, code, report=NULL_REPORT, ast_cache=None):
+        """
+        :param ast_cache: opal.cache.ASTCache, programs found in it aren't parsed again and the others are stored
+        """
+        if ast_cache:
+            with report.phase('ast_cache_lookup'):
+                cached = ast_cache.load(code)
+            if cached:
+                return self.generate(*cached, report)
+
+        # they import lark, which programs loaded from the object cache never need
+        from opal.ast.visitor import ASTVisitor
+        from opal.parser import parse_program
+
         visitor = ASTVisitor()
-        ast = visitor.transform(parser.parse(f"{code}\n"))
-        self.classes = visitor.classes
 
+        with report.phase('parse'):
+            ast = parse_program(code, visitor)
+
+        if ast_cache:
+            with report.phase('ast_cache_store'):
+                ast_cache.store(code, ast, visitor.classes)
+
+        return self.generate(ast, visitor.classes, report)
+
+    def generate_stream(self, statements, report=NULL_REPORT):
+        """
+        Streaming front end: parses and lowers one top level statement or class at a time into the entry function,
+        then spools the blocks it's done with, so only the AST of the current statement is kept in memory and the
+        IR of the others is kept as text. Classes have to be defined before they're used, which generate_code
+        doesn't require.
+        :param statements: iterable of the source of each top level statement, see opal.parser.iter_statements
+        """
+        from opal.ast.visitor import ASTVisitor
+        from opal.parser import parse_program
+
+        self.classes = []
+        self.add_classes(self.shared_classes or [], shared=True)
+        inference = TypeInference(self.classes)
+        # variables can't be propagated without seeing the whole program
+        folder = ConstantFolder()
+        resolver = Resolver(self.entry)
         for klass in self.classes:
-            self.generate_classes_metadata(klass)
+            self.declare_class(klass)
+
+        chunks = 0
+        source_bytes = 0
+        ast_nodes = 0
+
+        # a phase for each statement would grow with the program
+        with report.phase('stream'):
+            for statement in statements:
+                chunks += 1
+                source_bytes += len(statement)
+
+                visitor = ASTVisitor()
+                block = parse_program(statement, visitor).block
+                ast_nodes += sum(1 for _ in walk(block))
+
+                for klass in visitor.classes:
+                    self.add_classes([klass])
+                    inference.add_class(klass)
+                    self.generate_classes_metadata(klass)
+
+                folder.fold(block)
+                resolver.resolve(block)
+                inference.infer(block)
+                self.visit(block)
+                self.function_stack[0].spool(keep=(self.builder.block, self.exit_blocks[0]))
+
+                # as Block.code, a top level continue ends the program
+                if any(isinstance(stmt, Continue) for stmt in block.statements):
+                    break
+
+            self.end_entry()
+
+        report.count('chunks', chunks)
+        report.count('source_bytes', source_bytes)
+        report.count('ast_nodes', ast_nodes)
+        report.count('constants_folded', folder.folded)
+        report.count_ir(self.module)
+
+    def generate_file(self, file, report=NULL_REPORT, chunk_lines=STREAM_CHUNK_LINES):
+        """
+        Streams the program from a file open for reading, see generate_stream
+        :param chunk_lines: lines of top level statements parsed and lowered together
+        """
+        from opal.parser import iter_statements
+
+        return self.generate_stream(iter_statements(file, chunk_lines), report)
+
+    def import_module(self, name):
+        """
+        Calls the entry function of the module, compiled apart and linked with this one, see opal.modules
+        """
+        entry = module_entry(name)
+        func = self.module.globals.get(entry)
+        if func is None:
+            func = ir.Function(self.module, ir.FunctionType(ir.VoidType(), []), entry)
+        return self.builder.call(func, [])
+
+    def end_entry(self):
+        """
+        Returns from the entry function once its statements have been generated
+        """
+        # the block of the allocas goes on to the statements, branching last keeps the numbering of the values
+        ir.IRBuilder(self.function_stack[0].blocks[0]).branch(self.block_stack[0])
+        self.branch(self.exit_blocks[0])
+        self.position_at_end(self.exit_blocks[0])
+        self.builder.ret_void()
+
+    def generate(self, ast, classes, report=NULL_REPORT):
+        """
+        Generates the code of an already built AST
+        :param ast: Program
+        :param classes: the classes defined in it, as collected by the ASTVisitor
+        """
+        report.count_ast(ast)
+
+        shared_classes = self.shared_classes or []
+        self.classes = []
+        self.add_classes(shared_classes, shared=True)
+        self.add_classes(classes)
+
+        with report.phase('fold_constants'):
+            report.count('constants_folded', fold_constants(ast))
+
+        with report.phase('resolve_names'):
+            resolve_names(ast, self.entry)
+
+        with report.phase('infer_types'):
+            TypeInference(self.classes).infer(ast)
+
+        with report.phase('classes_metadata'):
+            for klass in shared_classes:
+                self.declare_class(klass)
+
+            for klass in classes:
+                self.generate_classes_metadata(klass)
 
         assert isinstance(ast, Program)
-        return ast.accept(self)
+
+        with report.phase('codegen'):
+            ret = ast.accept(self)
+
+        report.count_ir(self.module)
+        return ret
+
+    @staticmethod
+    def static_type(node, value):
+        """
+        :param value: the LLVM value generated for the node
+        :return: the type inferred for the node (see opal.inference), or the one of its value if it wasn't
+        """
+        typ = getattr(node, 'static_type', UNKNOWN)
+        return typ is UNKNOWN and type_of_value(value) or typ
 
     def load(self, ptr, name=''):
         return self.builder.load(ptr, name)
@@ -155,11 +463,11 @@ class CodeGenerator(Printable):
 
     @staticmethod
     def insert_const_string(module, string):
-        text = Constant.stringz(string)
+        text = stringz(string)
         name = CodeGenerator.get_string_name(string)
         gv = module.globals.get(name)
         if gv is None:
-            gv = module.add_global_variable(text.type, name=name)
+            gv = ir.GlobalVariable(module, text.type, name=name)
             gv.linkage = PRIVATE_LINKAGE
             gv.unnamed_addr = True
             gv.global_constant = True
@@ -195,6 +503,14 @@ class CodeGenerator(Printable):
         raise NotImplementedError('No visit_{} method'.format(type(node).__name__.lower()))
 
     def visit(self, node: ASTNode):
+        """
+        Generates the code of the node and its children. The `code` of nodes with children is a generator yielding
+        them, which opal.ast.trampoline drives with an explicit stack, so deeply nested programs don't recurse.
+        :param node: ASTNode
+        """
+        return trampoline(node, self.code)
+
+    def code(self, node: ASTNode):
         """
         Dynamically invoke the code generator for each specific node
         :param node: ASTNode
@@ -212,58 +528,103 @@ class CodeGenerator(Printable):
 
         return getattr(self, method, self.generic_codegen)(node) # pragma: no cover
 
-    # TODO: refactor to create smaller, specific functions
-    def generate_classes_metadata(self, klass: Klass):
-        name = klass.name
-        parent = klass.parent
+    def add_classes(self, classes, shared=False):
+        """
+        :param shared: whether they're classes compiled into another module, see shared_classes
+        """
+        for klass in classes:
+            self.classes.append(klass)
+            self.classes_by_name.setdefault(klass.name, klass)
+            if shared:
+                self.shared_class_names.add(klass.name)
 
-        undefined_parent_class = name != 'Object' and parent not in [c.name for c in self.classes]
+    def get_method(self, name):
+        """
+        :param name: qualified name of the method, as `Class::method`
+        :return: its LLVM function, declared by declare_functions
+        """
+        return self.methods[name]
 
-        if undefined_parent_class:
-            raise CodegenError(f'Parent class {parent} not defined')
+    def get_vtable(self, name):
+        """
+        :return: the vtable of the class of the name, as a global variable of the module
+        """
+        return self.vtables[name]
 
-        vtable_typ_name = f"{name}_vtable_type"
-        vtable_typ = self.module.context.get_identified_type(vtable_typ_name)
+    def declare_functions(self, klass: Klass):
+        name = klass.name
         type_ = self.module.context.get_identified_type(name)
+        object_type = self.module.context.get_identified_type('Object')
 
-        funk_types = OrderedDict()
         funktions = OrderedDict()
 
-        object_type = self.module.context.get_identified_type('Object')
-
         for func in klass.functions:
             funk_name = f'{name}::{func.name}'
 
             signature = [get_param_type(param.type, object_type) for param in func.params]
-            if func.ret_type:
-                ret = get_param_type(func.ret_type, object_type)
-            else:
-                ret = ir.VoidType()
+            ret_type = getattr(func, 'static_type', UNKNOWN)
+            ret = ret_type.as_llvm(self.module.context)
+            if ret is None:
+                ret = func.ret_type and get_param_type(func.ret_type, object_type) or ir.VoidType()
 
             func_ty = ir.FunctionType(ret, [type_.as_pointer()] + signature)
-            funk_types[funk_name] = func_ty
-            funk = Function(self.module, func_ty, funk_name)
+            funk = ir.Function(self.module, func_ty, funk_name)
             funktions[funk_name] = funk
+            self.methods[funk_name] = funk
 
-        vtable_name = f"{name}_vtable"
+        return funktions
 
+    def set_vtable_body(self, klass: Klass, vtable_typ, funktions):
         vtable_elements = [el.type for el in funktions.values()]
 
-        vtable_type_name = f"{parent}_vtable_type"
-
         parent_type = \
-            parent and self.module.context.get_identified_type(vtable_type_name) or vtable_typ
+            klass.parent and self.module.context.get_identified_type(f"{klass.parent}_vtable_type") or vtable_typ
 
         vtable_elements.insert(0, parent_type.as_pointer())
         vtable_elements.insert(1, ir.IntType(8).as_pointer())
         vtable_typ.set_body(*vtable_elements)
 
+        type_ = self.module.context.get_identified_type(klass.name)
+        type_.set_body(vtable_typ.as_pointer())
+
+    def declare_class(self, klass: Klass):
+        """
+        Declares a class compiled into another module: its type, methods and vtable are referenced
+        but not defined, so they get resolved when the modules are linked or added to the same engine
+        """
+        vtable_typ = self.module.context.get_identified_type(f"{klass.name}_vtable_type")
+        funktions = self.declare_functions(klass)
+        self.set_vtable_body(klass, vtable_typ, funktions)
+
+        vtable = ir.GlobalVariable(self.module, vtable_typ, name=f"{klass.name}_vtable")
+        vtable.global_constant = True
+        self.vtables[klass.name] = vtable
+
+    # TODO: refactor to create smaller, specific functions
+    def generate_classes_metadata(self, klass: Klass):
+        name = klass.name
+        parent = klass.parent
+
+        undefined_parent_class = name != 'Object' and parent not in self.classes_by_name
+
+        if undefined_parent_class:
+            raise CodegenError(f'Parent class {parent} not defined')
+
+        if name in self.shared_class_names:
+            raise CodegenError(f'Class {name} already defined')
+
+        vtable_typ = self.module.context.get_identified_type(f"{name}_vtable_type")
+        funktions = self.declare_functions(klass)
+        self.set_vtable_body(klass, vtable_typ, funktions)
+
+        vtable_name = f"{name}_vtable"
+
         # --
         class_string = CodeGenerator.insert_const_string(self.module, name)
         if klass.parent:
             parent_table_typ = self.module.context.get_identified_type(f"{parent}_vtable_type")
             vtable_constant = ir.Constant(parent_table_typ.as_pointer(),
-                                          self.module.get_global(f'{parent}_vtable').get_reference())
+                                          self.get_vtable(parent).get_reference())
         else:
             vtable_constant = ir.Constant(vtable_typ.as_pointer(), None)
 
@@ -271,22 +632,101 @@ class CodeGenerator(Printable):
 
         fields += [ir.Constant(item.type, item.get_reference()) for item in funktions.values()]
 
-        vtable = self.module.add_global_variable(vtable_typ, name=vtable_name)
-        vtable.linkage = PRIVATE_LINKAGE
+        vtable = ir.GlobalVariable(self.module, vtable_typ, name=vtable_name)
+        if self.shared_classes is None:
+            vtable.linkage = PRIVATE_LINKAGE
         vtable.unnamed_addr = False
         vtable.global_constant = True
         vtable.initializer = vtable_typ(fields)
+        self.vtables[name] = vtable
 
-        type_ = self.module.context.get_identified_type(name)
+    @staticmethod
+    def list_element_type(node, values):
+        """
+        :param values: the LLVM values of the items of the List
+        :return: the LLVM type of its elements when they're stored unboxed, None when they're boxed into a vector
+        """
+        typ = getattr(node, 'static_type', UNKNOWN)
+        element = isinstance(typ, ListType) and typ.element or common_type(type_of_value(val) for val in values)
+        return element in UNBOXED_TYPES and element.as_llvm() or None
 
-        elements = []
-        elements.insert(0, vtable_typ.as_pointer())
-        type_.set_body(*elements)
+    @staticmethod
+    def unboxed_element_type(vector):
+        """
+        :return: the LLVM type of the elements of the list, None for a vector of the runtime
+        """
+        data = vector.type.pointee.elements[2]
+        return data != List.as_llvm().elements[2] and data.pointee or None
+
+    def field(self, vector, index):
+        return self.gep(vector, [self.const(0), self.const(index)], inbounds=True)
+
+    def unboxed_list(self, values, element):
+        """
+        :return: pointer to the {size, capacity, data} of an array holding the values, allocated at once
+        """
+        vector = self.alloc(List.as_llvm_of(element))
+        size = self.const(len(values))
+
+        # the offset of the element past the last one of an array at null is its size
+        end = self.gep(ir.Constant(element.as_pointer(), None), [size])
+        data = self.call('malloc', [self.builder.ptrtoint(end, Integer.as_llvm())])
+        data = self.bitcast(data, element.as_pointer())
+
+        self.builder.store(size, self.field(vector, 0))
+        self.builder.store(size, self.field(vector, 1))
+        self.builder.store(data, self.field(vector, 2))
+
+        for i, val in enumerate(values):
+            self.builder.store(val, self.gep(data, [self.const(i)], inbounds=True))
 
-    def vector_get(self, vector, index):
-        val = self.call('vector_get', [vector, index])
-        val = self.builder.ptrtoint(val, Integer.as_llvm())
-        return val
+        return vector
+
+    def vector_size(self, vector):
+        if self.unboxed_element_type(vector) is None:
+            return self.call('vector_size', [vector])
+        return self.load(self.field(vector, 0))
+
+    def vector_get(self, vector, index, checked=True):
+        """
+        :param checked: whether the index has to be checked against the size of the list, the runtime vectors always
+        check them
+        """
+        if self.unboxed_element_type(vector) is None:
+            val = self.call('vector_get', [vector, index])
+            val = self.builder.ptrtoint(val, Integer.as_llvm())
+            return val
+
+        if checked:
+            size = self.vector_size(vector)
+            # negative indices are huge unsigned ones
+            out_of_bounds = self.builder.icmp_unsigned('>=', index, size)
+            with self.builder.if_then(out_of_bounds, likely=False):
+                self.builder.call(self.index_error(), [index, size])
+
+        data = self.load(self.field(vector, 2))
+        return self.load(self.gep(data, [index], inbounds=True))
+
+    def index_error(self):
+        """
+        :return: the function printing the index out of bounds and exiting, defined in the module on first use
+        """
+        func = self.module.globals.get(INDEX_ERROR)
+        if func is not None:
+            return func
+
+        func_ty = ir.FunctionType(Any.as_llvm(), [Integer.as_llvm(), Integer.as_llvm()])
+        func = ir.Function(self.module, func_ty, INDEX_ERROR)
+        func.linkage = PRIVATE_LINKAGE
+        func.attributes.add('noreturn')
+        func.attributes.add('cold')
+
+        builder = ir.IRBuilder(func.append_basic_block('entry'))
+        message = self.insert_const_string(self.module, INDEX_ERROR_MESSAGE)
+        builder.call(self.module.get_global('printf'), [message.gep(INDICES), *func.args])
+        builder.call(self.module.get_global('exit'), [self.const(1)])
+        builder.unreachable()
+        return func
 
     def cast(self, from_, to):
         if from_.type == Integer.as_llvm() and to is Bool:
@@ -301,6 +741,4 @@ class CodeGenerator(Printable):
         raise NotImplementedError('Unsupported cast')
 
     def get_klass_by_name(self, name):
-        for klass in self.classes:
-            if klass.name == name:
-                return klass
+        return self.classes_by_name.get(name)
@@ -1,13 +1,22 @@
-# noinspection PyPackageRequirements
-import glob
-from ctypes import CFUNCTYPE, c_void_p
+import os
+import sys
+from collections import OrderedDict
+from ctypes import CDLL, CFUNCTYPE, c_void_p
 
 # noinspection PyPackageRequirements
 from llvmlite import binding as llvm
-from os import path
 
-import opal
+from opal.cache import cache_key, get_compiler_digest
 from opal.codegen import CodeGenerator
+from opal.interpreter import Interpreter, Uninterpretable, check
+from opal.modules import ModuleCompiler, classes_of, find_imports, link_modules
+from opal.optimizer import optimize
+from opal.report import CompileReport, NULL_REPORT
+from opal.runtime import get_runtime, runtime_cache
+from opal.target import create_target_machine, get_target_machine, get_target_options, initialize_llvm, \
+    set_target
+
+_libc = CDLL(None)
 
 
 # noinspection PyMethodMayBeStatic
@@ -15,54 +24,360 @@ from opal.codegen import CodeGenerator
 
 class OpalEvaluator:
 
-    def __init__(self):
+    def __init__(self, opt_level=0, size_level=0, cache=None, cpu=None, features=None, ast_cache=None,
+                 modules=None):
+        """
+        :param opt_level: 0 to 3, as in -O0 to -O3
+        :param size_level: 0 to 2, with opt_level 2 they are -Os and -Oz
+        :param cache: opal.cache.ObjectCache. Programs found in it skip parsing, codegen and machine code
+        generation, the ones that aren't get stored once compiled
+        :param ast_cache: opal.cache.ASTCache. Programs found in it skip parsing, as when compiling them at another
+        optimization level
+        :param cpu: CPU name to generate code for, the host's by default (see opal.target)
+        :param features: CPU features string, the host's by default
+        :param modules: opal.modules.ModuleCompiler compiling the modules programs import, one searching the current
+        directory and $OPAL_PATH by default
+        """
         self.codegen = CodeGenerator()
-        llvm.initialize()
-        llvm.initialize_native_target()
-        llvm.initialize_native_asmprinter()
+        self.opt_level = opt_level
+        self.size_level = size_level
+        self.cache = cache
+        self.ast_cache = ast_cache
+        self.cpu = cpu
+        self.features = features
+        self.modules = modules
+        initialize_llvm()
+
+        self.llvm_mod = None
+
+    def cache_key(self, code, target_machine, modules=()):
+        cpu, features = get_target_options(self.cpu, self.features)
+        return cache_key(code, get_compiler_digest(), runtime_cache.digest(), self.opt_level, self.size_level,
+                         target_machine.triple, cpu, features, *(module.key for module in modules))
+
+    def compile_modules(self, code, report=NULL_REPORT):
+        """
+        :return: the modules the code imports, compiled
+        """
+        imports = find_imports(code.splitlines())
+        if not imports:
+            return []
+
+        if self.modules is None:
+            self.modules = ModuleCompiler([os.getcwd()], opt_level=self.opt_level, size_level=self.size_level,
+                                          cpu=self.cpu, features=self.features)
+        return self.modules.compile(imports, report)
+
+    def evaluate(self, code, print_ir=False, run=True, report=False):
+        """
+        :param report: when true, returns an opal.report.CompileReport with the time spent in each phase
+        """
+        compile_report = report and CompileReport() or NULL_REPORT
+        compile_report.count('source_bytes', len(code))
+
+        target_machine = get_target_machine(self.cpu, self.features)
+
+        key = None
+        cached_object = None
+
+        modules = self.compile_modules(code, compile_report)
+
+        if self.cache:
+            with compile_report.phase('cache_lookup'):
+                key = self.cache_key(code, target_machine, modules)
+                cached_object = self.cache.load(key)
+
+        if cached_object:
+            # the module is only a handle for the engine to ask the cache for the object code
+            self.llvm_mod = llvm.parse_assembly('')
+            self.llvm_mod.name = key
+        else:
+            if modules:
+                self.codegen.shared_classes = classes_of(modules)
+            self.codegen.generate_code(code, compile_report, self.ast_cache)
+
+            module = self.codegen.module
+
+            with compile_report.phase('print_module'):
+                llvm_ir = str(module)
+
+            compile_report.count('ir_bytes', len(llvm_ir))
+
+            with compile_report.phase('parse_assembly'):
+                self.llvm_mod = llvm.parse_assembly(llvm_ir)
+                set_target(self.llvm_mod, target_machine)
+
+            with compile_report.phase('link_runtime'):
+                self.llvm_mod.link_in(get_runtime())
+
+            if modules:
+                with compile_report.phase('link_modules'):
+                    link_modules(self.llvm_mod, modules)
+
+            with compile_report.phase('verify'):
+                self.llvm_mod.verify()
+
+            with compile_report.phase('optimize'):
+                optimize(self.llvm_mod, self.opt_level, self.size_level, target_machine)
+
+            if key:
+                self.llvm_mod.name = key
+
+            if print_ir:  # pragma: no cover
+                print(self.llvm_mod)  # pragma: no cover
+
+        if not run:
+            return report and compile_report or None
+
+        with compile_report.phase('create_engine'):
+            engine_target_machine = create_target_machine(self.cpu, self.features)
+            ee = llvm.create_mcjit_compiler(self.llvm_mod, engine_target_machine)
+
+        with ee:
+
+            if key or report:
+                def notify(mod, buffer):
+                    compile_report.count('object_bytes', len(buffer))
+                    if key and mod.name == key:
+                        self.cache.store(key, buffer)
+
+                def get_buffer(mod):
+                    if key and mod.name == key:
+                        return cached_object
+
+                ee.set_object_cache(notify, get_buffer)
+
+            with compile_report.phase('emit_machine_code'):
+                ee.finalize_object()
+                ee.run_static_constructors()
+
+            fptr = CFUNCTYPE(c_void_p)(ee.get_function_address('main'))
+
+            with compile_report.phase('execute'):
+                fptr()
+
+        return report and compile_report or None
+
+
+class OpalSession:
+    """
+    Long lived JIT: a single execution engine, holding the CLib runtime, to which every evaluated
+    program is added as a new module. Classes defined by a program can be used by the ones evaluated
+    after it without being compiled again.
+
+        with OpalSession() as session:
+            session.evaluate(classes_source, run=False)
+            session.evaluate(program_source)
+    """
 
+    def __init__(self, opt_level=0, size_level=0, cpu=None, features=None, ast_cache=None):
+        """
+        :param ast_cache: opal.cache.ASTCache, see OpalEvaluator
+        """
+        initialize_llvm()
+
+        self.opt_level = opt_level
+        self.size_level = size_level
+        self.ast_cache = ast_cache
+        self.codegen = None
         self.llvm_mod = None
+        self.classes = []
+        self.evaluations = 0
+
+        # owned by the engine, which lives as long as the session
+        self.target_machine = create_target_machine(cpu, features)
+        self.engine = llvm.create_mcjit_compiler(get_runtime(), self.target_machine)
+
+    def __enter__(self):
+        return self
 
-    def _get_external_modules(self):
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
-        clib_files_pattern = path.abspath(path.join(path.dirname(path.realpath(opal.__file__)), '../llvm_ir', '*.ll'))
+    def close(self):
+        self.engine.close()
 
-        all_ir_files = glob.glob(clib_files_pattern)
-        mods = []
-        for file in all_ir_files:
-            with open(file, 'r') as f:
-                module_ref = llvm.parse_assembly(f.read())
-                module_ref.verify()
-                mods.append(module_ref)
-        return mods
+    def evaluate(self, code, print_ir=False, run=True, report=False):
+        """
+        :param report: when true, returns an opal.report.CompileReport with the time spent in each phase
+        """
+        compile_report = report and CompileReport() or NULL_REPORT
+        compile_report.count('source_bytes', len(code))
 
-    def evaluate(self, code, print_ir=False, run=True):
-        self.codegen.generate_code(code)
+        self.evaluations += 1
+        entry = f'main.{self.evaluations}'
 
-        module = self.codegen.module
+        self.codegen = CodeGenerator(entry=entry, shared_classes=self.classes)
+        self.codegen.generate_code(code, compile_report, self.ast_cache)
 
-        llvm_ir = str(module)
+        with compile_report.phase('print_module'):
+            llvm_ir = str(self.codegen.module)
 
-        self.llvm_mod = llvm.parse_assembly(llvm_ir)
+        compile_report.count('ir_bytes', len(llvm_ir))
 
-        external_modules = self._get_external_modules()
-        for mod in external_modules:
-            self.llvm_mod.link_in(mod)
+        with compile_report.phase('parse_assembly'):
+            self.llvm_mod = llvm.parse_assembly(llvm_ir)
+            set_target(self.llvm_mod, self.target_machine)
 
-        self.llvm_mod.verify()
+        with compile_report.phase('verify'):
+            self.llvm_mod.verify()
+
+        with compile_report.phase('optimize'):
+            optimize(self.llvm_mod, self.opt_level, self.size_level, self.target_machine)
 
         if print_ir:  # pragma: no cover
             print(self.llvm_mod)  # pragma: no cover
 
-        target_machine = llvm.Target.from_default_triple().create_target_machine()
+        self.engine.add_module(self.llvm_mod)
+        self.classes = self.codegen.classes
 
         if not run:
-            return
+            return report and compile_report or None
 
-        with llvm.create_mcjit_compiler(self.llvm_mod, target_machine) as ee:
+        with compile_report.phase('emit_machine_code'):
+            self.engine.finalize_object()
 
-            ee.finalize_object()
-            ee.run_static_constructors()
-            fptr = CFUNCTYPE(c_void_p)(ee.get_function_address('main'))
+        fptr = CFUNCTYPE(c_void_p)(self.engine.get_function_address(entry))
 
+        with compile_report.phase('execute'):
             fptr()
+
+        return report and compile_report or None
+
+
+class CompiledProgram:
+    """
+    A program compiled into an execution engine of its own, kept to be run as many times as needed
+    """
+
+    def __init__(self, program, classes=(), opt_level=0, size_level=0, cpu=None, features=None):
+        """
+        :param program: opal.ast.program.Program
+        :param classes: the classes defined in it, as collected by the ASTVisitor
+        """
+        initialize_llvm()
+
+        codegen = CodeGenerator()
+        codegen.generate(program, classes)
+
+        target_machine = get_target_machine(cpu, features)
+
+        llvm_mod = llvm.parse_assembly(str(codegen.module))
+        set_target(llvm_mod, target_machine)
+        llvm_mod.link_in(get_runtime())
+        llvm_mod.verify()
+        optimize(llvm_mod, opt_level, size_level, target_machine)
+
+        self.engine = llvm.create_mcjit_compiler(llvm_mod, create_target_machine(cpu, features))
+        self.engine.finalize_object()
+        self.engine.run_static_constructors()
+
+        self.fptr = CFUNCTYPE(c_void_p)(self.engine.get_function_address('main'))
+
+    def __call__(self):
+        self.fptr()
+
+    def close(self):
+        self.engine.close()
+
+
+class TieredEvaluator:
+    """
+    Starts programs in the interpreter (see opal.interpreter) and moves them to the JIT once they get hot:
+    a source evaluated more than `threshold` times is compiled, and so is the rest of a run whose loops went
+    through `loop_threshold` iterations. Programs the interpreter can't run are compiled right away.
+
+    The last `max_programs` compiled sources are kept and run again without compiling, and so are the run counts of
+    the last `max_programs` interpreted ones. `tier` tells how the last program ran: INTERPRETED, PROMOTED
+    (interpreted, then compiled from a hot loop on) or COMPILED.
+    """
+
+    INTERPRETED = 'interpreted'
+    PROMOTED = 'promoted'
+    COMPILED = 'compiled'
+
+    def __init__(self, threshold=2, loop_threshold=10000, max_programs=64, opt_level=0, size_level=0, cpu=None,
+                 features=None):
+        self.threshold = threshold
+        self.loop_threshold = loop_threshold
+        self.max_programs = max_programs
+        self.options = dict(opt_level=opt_level, size_level=size_level, cpu=cpu, features=features)
+
+        # runs of the interpreted sources, least recently run first
+        self.runs = OrderedDict()
+        self.programs = OrderedDict()
+        self.output = []
+        self.tier = None
+
+    def close(self):
+        while self.programs:
+            self.programs.popitem()[1].close()
+
+    def evaluate(self, code):
+        program = self.programs.get(code)
+        if program:
+            self.programs.move_to_end(code)
+            self.tier = self.COMPILED
+            return self.execute(program)
+
+        # deferred like in CodeGenerator.generate_code, importing the evaluator doesn't import lark
+        from opal.ast.visitor import ASTVisitor
+        from opal.parser import parse_program
+
+        visitor = ASTVisitor()
+        ast = parse_program(code, visitor)
+
+        runs = self.runs.pop(code, 0) + 1
+
+        try:
+            top_level = check(ast)
+        except Uninterpretable:
+            top_level = None
+
+        if top_level is None or runs > self.threshold:
+            self.tier = self.COMPILED
+            return self.execute(self.compile(code, ast, visitor.classes))
+
+        self.runs[code] = runs
+        if len(self.runs) > self.max_programs:
+            self.runs.popitem(last=False)
+
+        self.tier = self.INTERPRETED
+        interpreter = Interpreter(self.output.append, self.loop_threshold)
+
+        try:
+            rest = interpreter.run(ast, top_level)
+        finally:
+            self.flush()
+
+        if rest is not None:
+            self.tier = self.PROMOTED
+            program = CompiledProgram(rest, **self.options)
+            try:
+                self.execute(program)
+            finally:
+                program.close()
+
+    def compile(self, code, ast, classes):
+        program = CompiledProgram(ast, classes, **self.options)
+
+        self.programs[code] = program
+        if len(self.programs) > self.max_programs:
+            self.programs.popitem(last=False)[1].close()
+
+        return program
+
+    def flush(self):
+        """
+        Writes what the interpreter printed straight to stdout's file descriptor, where compiled programs print
+        """
+        if self.output:
+            sys.stdout.flush()
+            os.write(1, ''.join(self.output).encode('utf-8'))
+            self.output = []
+
+    # noinspection PyMethodMayBeStatic
+    def execute(self, program):
+        program()
+        # so whatever gets interpreted next doesn't overtake what C's stdio has buffered
+        _libc.fflush(None)
@@ -0,0 +1,255 @@
+"""
+Constant folding: evaluates the operations on literals at compile time, propagates the variables assigned a literal
+once and prunes the branches of conditions known at compile time, before types are inferred, so the code generator
+emits neither the instructions nor the blocks of what is already known.
+
+Operations are folded with the semantics of the code they replace, which the interpreter reproduces (see
+opal.interpreter): ints are 32 bits wrapping around, floats are compared by LLVM's ordered comparisons. The ones the
+generated code doesn't define, as divisions by zero, mixing ints and floats or dividing floats, are left to it.
+
+A variable assigned once in the whole program, loop variables and parameters included, is propagated into the reads
+following its assignment. The assignment is kept for the reads before it.
+
+Branches are only pruned when none of them holds a break, continue, return or class, which the code generator ties
+to the blocks they're in. They are folded first to find out.
+"""
+from collections import Counter
+
+from opal.ast import ASTNode, trampoline, walk
+from opal.ast.binop import Arithmetic, Assign, Comparison, Div
+from opal.ast.compact import NodeView
+from opal.ast.conditionals import If
+from opal.ast.iterators import For, While
+from opal.ast.program import Block
+from opal.ast.terminals import Break, Continue, Return
+from opal.ast.types import Bool, Float, Funktion, Integer, Klass, Param
+from opal.ast.vars import VarValue
+from opal.interpreter import FLOAT_OPS, INT_MAX, INT_MIN, INT_OPS
+
+CONSTANTS = (Integer, Float, Bool)
+
+# nodes the code generator ties to the blocks they're in
+ANCHORED = (Break, Continue, Return, Klass)
+
+
+def constant_of(node):
+    """
+    :return: the value of a literal int, float or bool, None for any other node
+    """
+    return node.val if node.__class__ in CONSTANTS else None
+
+
+def truth_of(node):
+    """
+    :return: whether a literal condition holds, None when the node isn't a literal
+    """
+    val = constant_of(node)
+    if val is None:
+        return None
+    # as CodeGenerator.cast, NaN is false
+    return val == val and val != 0
+
+
+def evaluate(op, left, right):
+    """
+    :return: the literal node of the result of the operation on literals, None when it's left to the generated code
+    """
+    if left.__class__ is not right.__class__:
+        return None
+
+    if left.__class__ is Integer:
+        if not all(INT_MIN <= val <= INT_MAX for val in (left.val, right.val)):
+            return None
+        # undefined, the division traps
+        if op.__class__ is Div and (right.val == 0 or (left.val, right.val) == (INT_MIN, -1)):
+            return None
+        operation = INT_OPS.get(op.__class__)
+    elif left.__class__ is Float:
+        operation = FLOAT_OPS.get(op.__class__)
+    else:
+        return None
+
+    if operation is None:
+        return None
+
+    result = operation(left.val, right.val)
+    return isinstance(result, bool) and Bool(result) or left.__class__(result)
+
+
+def count_assignments(program):
+    """
+    :return: Counter of the assignments of each variable, loops and parameters included
+    """
+    counts = Counter()
+    seen = set()
+    # the functions of classes are walked twice, as their body and as their functions
+    for node in walk(program):
+        if isinstance(node, Assign):
+            name = node.lhs.val
+        elif isinstance(node, For):
+            name = node.var.val
+        elif isinstance(node, Param):
+            name = node.name
+        else:
+            continue
+
+        if id(node) not in seen:
+            seen.add(id(node))
+            counts[name] += 1
+    return counts
+
+
+class ConstantFolder:
+
+    def __init__(self, assignments=None):
+        """
+        :param assignments: the counts of count_assignments for the whole program. Without them, as when it's
+        streamed a statement at a time, variables aren't propagated
+        """
+        self.assignments = assignments
+        self.constants = {}
+        self.folded = 0
+        # ANCHORED nodes seen so far, the branches holding some can't be pruned
+        self.anchors = 0
+
+        self.handlers = {
+            Block: self.fold_block,
+            Arithmetic: self.fold_operation,
+            Comparison: self.fold_operation,
+            Assign: self.fold_assign,
+            VarValue: self.fold_var,
+            If: self.fold_if,
+            While: self.fold_while,
+            Klass: self.fold_klass,
+            Funktion: self.fold_funktion,
+        }
+
+    def fold(self, node):
+        """
+        Folds the node and its children in place
+        :return: the node replacing it, a Block for a pruned If, None when it's removed
+        """
+        return trampoline(node, self.step)
+
+    def step(self, node):
+        if isinstance(node, ANCHORED):
+            self.anchors += 1
+        for cls in node.__class__.__mro__:
+            handler = self.handlers.get(cls)
+            if handler:
+                return handler(node)
+        return self.fold_children(node)
+
+    @staticmethod
+    def fold_children(node):
+        for name, value in list(node.fields()):
+            if isinstance(value, ASTNode):
+                folded = yield value
+                if folded is not value:
+                    setattr(node, name, folded)
+            elif isinstance(value, (list, tuple)) and any(isinstance(item, ASTNode) for item in value):
+                items = []
+                for item in value:
+                    items.append((yield item) if isinstance(item, ASTNode) else item)
+                setattr(node, name, value.__class__(items))
+        return node
+
+    def fold_block(self, block):
+        statements = []
+        for i, stmt in enumerate(block.statements):
+            # as Block.code, nothing after it is generated
+            if isinstance(stmt, Continue):
+                self.anchors += 1
+                statements += block.statements[i:]
+                break
+
+            folded = yield stmt
+            if isinstance(folded, Block) and not isinstance(stmt, Block):
+                # the branch kept of an If
+                statements += folded.statements
+            elif folded is not None:
+                statements.append(folded)
+
+        block._statements = statements
+        return block
+
+    def fold_operation(self, op):
+        op.lhs = yield op.lhs
+        op.rhs = yield op.rhs
+
+        result = evaluate(op, op.lhs, op.rhs)
+        if result is None:
+            return op
+
+        self.folded += 1
+        return result
+
+    def fold_assign(self, assign):
+        assign.rhs = yield assign.rhs
+
+        name = assign.lhs.val
+        if constant_of(assign.rhs) is not None and self.assignments and self.assignments[name] == 1:
+            self.constants[name] = assign.rhs
+        return assign
+
+    def fold_var(self, var):
+        constant = self.constants.get(var.val)
+        if constant is None:
+            return var
+
+        self.folded += 1
+        return constant.__class__(constant.val)
+
+    def fold_if(self, if_):
+        if_.cond = yield if_.cond
+
+        anchors = self.anchors
+        if_.then_ = yield if_.then_
+        if if_.else_:
+            if_.else_ = yield if_.else_
+
+        truth = truth_of(if_.cond)
+        if truth is None or self.anchors != anchors:
+            return if_
+
+        self.folded += 1
+        return truth and if_.then_ or if_.else_
+
+    def fold_while(self, while_):
+        while_.cond = yield while_.cond
+
+        anchors = self.anchors
+        while_.body = yield while_.body
+
+        if truth_of(while_.cond) is False and self.anchors == anchors:
+            self.folded += 1
+            return None
+        return while_
+
+    def fold_klass(self, klass):
+        # methods don't see the variables of the program
+        constants = self.constants
+        self.constants = {}
+        klass.body = yield klass.body
+        self.constants = constants
+        return klass
+
+    def fold_funktion(self, funktion):
+        # the Return of its ret_type is one of the statements of the body
+        if funktion.body:
+            funktion.body = yield funktion.body
+        return funktion
+
+
+def fold_constants(program):
+    """
+    Folds the program in place, see ConstantFolder
+    :return: the number of nodes folded
+    """
+    if isinstance(program, NodeView):
+        # read only, generated as it is
+        return 0
+
+    folder = ConstantFolder(count_assignments(program))
+    folder.fold(program)
+    return folder.folded
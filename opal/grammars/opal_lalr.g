@@ -0,0 +1,126 @@
+// LALR(1) version of opal.g, for the contextual lexer. It gives the same trees:
+// - comparisons share the precedence of "+" and "-" and are left associative, as the Earley parser resolves them
+// - break and continue are statements of their own instead of alternatives of both while_ and for_
+// - the lines opening a block end with their newline, instead of leaving it to an empty first statement
+// - names are told apart by what follows them (assignee, receiver, ...), all of them still build `name` nodes
+
+program: block
+
+block:  (_stmt _NEWLINE)*
+
+_stmt: _comp_statement
+    | test
+
+_comp_statement:
+    | assign
+    | print
+    | if_
+    | while_
+    | for_
+    | class_
+    | def_
+    | method_call
+    | ctor_
+    | ret_
+    | break_
+    | continue_
+    | import_
+
+?assign: (assignee "=" test)
+    | (assignee "=" instance)
+    | (assignee "=" method_call)
+
+instance: (class_name "(" args?  ")")
+
+method_call: (receiver "." name "(" args?  ")")
+
+!args: arg ("," arg)*
+
+arg: test
+
+print: "print" "(" test ")"
+
+?if_: (_IF test _NEWLINE) block [_ELSE _NEWLINE block] _END
+
+while_: "while" test _NEWLINE block _END
+
+break_: "break"
+continue_: "continue"
+
+?def_: "def" function_name "(" params? ")" _NEWLINE block _END
+    | "def" return_type function_name "(" params? ")" _NEWLINE block _END -> typed_def
+
+?ctor_: "def" ":" function_name "(" params? ")" _NEWLINE block _END
+
+!params: param ("," param)*
+
+param: name ["::" type]
+
+?type: CNAME
+?return_type: CNAME
+
+ret_: "return" test
+
+import_: "import" CNAME ("." CNAME)*
+
+?class_: "class" name _NEWLINE block _END
+    | "class" name "<" name _NEWLINE block _END -> inherits
+
+for_: "for" name "in" (var|list) _NEWLINE block _END
+
+?test: product
+    | test _comp_op product -> comp
+    | test "+" product   -> add
+    | test "-" product   -> sub
+
+?product: atom
+    | product "*" atom  -> mul
+    | product "/" atom  -> div
+
+?atom: const
+    | list
+    | "(" test ")"
+
+!_comp_op: ">"|"<"|">="|"<="|"=="|"!="
+
+?const: selector | number | string | boolean
+
+?selector: selector "[" index "]" -> list_access
+    | var
+
+?number: float | int
+
+list: list "[" index "]" -> list_access
+    | "[" [test ("," test)*] "]"
+
+index: int
+
+float: FLOAT
+int: INT
+string: STRING
+boolean: BOOLEAN
+
+name: CNAME
+assignee: CNAME -> name
+class_name: CNAME -> name
+receiver: CNAME -> name
+function_name: CNAME -> name
+var: CNAME
+
+BOOLEAN.2: /true|false/
+
+_IF.10: /if/
+_ELSE.10: /else/
+_END.10: /end/
+
+INT: ["+"|"-"] DIGIT+
+FLOAT   : ["+"|"-"] INT "." INT
+STRING  : /("(?!"").*?(?<!\\)(\\\\)*?"|'(?!'').*?(?<!\\)(\\\\)*?')/i
+
+_NEWLINE: /\n\s*/
+
+%import common.WS_INLINE
+%import common.DIGIT
+%import common.CNAME
+
+%ignore WS_INLINE
@@ -0,0 +1,252 @@
+"""
+Type inference: annotates every node of a program with its static type (see opal.static_types) before the code
+generator runs, so it emits the code of each node knowing the types of its operands instead of guessing them from
+the LLVM values it gets back.
+
+Variables get the type of their first assignment, in textual order, as the code generator allocates them. Methods
+are typed first, each in a scope of its own, so calls are typed wherever they are. Nodes whose type can't be told
+statically get UNKNOWN, the code generator falls back to the LLVM values for them.
+"""
+from types import GeneratorType
+
+from opal.ast import trampoline
+from opal.ast.binop import Arithmetic, Assign, Comparison
+from opal.ast.conditionals import If
+from opal.ast.iterators import For, IndexOf, While
+from opal.ast.program import Block, Program
+from opal.ast.statements import Import, Print
+from opal.ast.terminals import Break, Continue, Return
+from opal.ast.types import Bool, Call, Float, Funktion, Integer, Klass, List, MethodCall, Param, String
+from opal.ast.vars import Var, VarValue
+from opal.static_types import BOOL, FLOAT, INT, STRING, TYPE_NAMES, UNKNOWN, VOID, ClassType, ListType
+
+
+def annotate(node, typ):
+    try:
+        node.static_type = typ
+    except AttributeError:  # read only views of opal.ast.compact, typed by their values
+        pass
+    return typ
+
+
+def common_type(types):
+    """
+    :return: the type all of them have, UNKNOWN if they differ or there are none
+    """
+    types = set(types)
+    return len(types) == 1 and types.pop() or UNKNOWN
+
+
+def variable(node, name):
+    """
+    :return: the key of a variable, its slot when opal.resolver bound it, as names can be reused by other scopes
+    """
+    slot = getattr(node, 'slot', None)
+    return name if slot is None else slot
+
+
+def element_type(typ):
+    """
+    :param typ: type of a list
+    :return: the type of its elements, INT for the boxed ones, as the runtime vectors give them back
+    """
+    return isinstance(typ, ListType) and typ.unboxed and typ.element or INT
+
+
+# noinspection PyMethodMayBeStatic
+class TypeInference:
+
+    def __init__(self, classes=()):
+        """
+        :param classes: the classes the program can use, its own and the shared ones, see CodeGenerator
+        """
+        self.classes = {}
+        self.variables = {}
+
+        self.handlers = {
+            Program: self.infer_program,
+            Block: self.infer_block,
+            Assign: self.infer_assign,
+            Arithmetic: self.infer_arithmetic,
+            Comparison: self.infer_comparison,
+            Print: self.infer_print,
+            If: self.infer_if,
+            While: self.infer_while,
+            For: self.infer_for,
+            IndexOf: self.infer_index_of,
+            Integer: lambda node: INT,
+            Float: lambda node: FLOAT,
+            Bool: lambda node: BOOL,
+            String: lambda node: STRING,
+            List: self.infer_list,
+            Var: self.infer_var,
+            VarValue: self.infer_var,
+            Klass: self.infer_klass,
+            Funktion: self.infer_funktion,
+            Param: self.infer_param,
+            Return: self.infer_return,
+            Call: self.infer_call,
+            MethodCall: self.infer_method_call,
+            Break: lambda node: VOID,
+            Continue: lambda node: VOID,
+            Import: lambda node: VOID,
+        }
+
+        for klass in classes:
+            self.add_class(klass)
+
+    def add_class(self, klass):
+        """
+        Types the methods of the class, so calls to them are typed
+        """
+        self.classes[klass.name] = klass
+        self.infer(klass)
+
+    def infer(self, node):
+        """
+        Annotates the node and its children
+        :return: the type of the node
+        """
+        return trampoline(node, self.step)
+
+    def step(self, node):
+        handler = None
+        for cls in node.__class__.__mro__:
+            handler = self.handlers.get(cls)
+            if handler:
+                break
+
+        result = handler and handler(node) or UNKNOWN
+        if isinstance(result, GeneratorType):
+            return self._annotate_after(node, result)
+        return annotate(node, result)
+
+    @staticmethod
+    def _annotate_after(node, steps):
+        typ = yield from steps
+        return annotate(node, typ)
+
+    def infer_program(self, program):
+        yield program.block
+        return VOID
+
+    def infer_block(self, block):
+        for stmt in block.statements:
+            # as Block.code, nothing after it is generated
+            if isinstance(stmt, Continue):
+                break
+            yield stmt
+        return VOID
+
+    def infer_assign(self, assign):
+        typ = yield assign.rhs
+        name = variable(assign.lhs, assign.lhs.val)
+        # later assignments store into the variable of the first one
+        typ = self.variables.setdefault(name, typ)
+        annotate(assign.lhs, typ)
+        return typ
+
+    def infer_arithmetic(self, op):
+        left = yield op.lhs
+        right = yield op.rhs
+        return left is right and left in (INT, FLOAT) and left or UNKNOWN
+
+    def infer_comparison(self, op):
+        yield op.lhs
+        yield op.rhs
+        return BOOL
+
+    def infer_print(self, print_):
+        yield print_.val
+        return VOID
+
+    def infer_if(self, if_):
+        yield if_.cond
+        yield if_.then_
+        if if_.else_:
+            yield if_.else_
+        return VOID
+
+    def infer_while(self, while_):
+        yield while_.cond
+        yield while_.body
+        return VOID
+
+    def infer_for(self, for_):
+        typ = yield for_.iterable
+        self.variables.setdefault(variable(for_.var, for_.var.val), element_type(typ))
+        yield for_.var
+        yield for_.body
+        return VOID
+
+    def infer_index_of(self, index_of):
+        yield index_of.index
+        return element_type((yield index_of.lst))
+
+    def infer_list(self, list_):
+        types = []
+        for item in list_.items:
+            types.append((yield item))
+        return ListType(common_type(types))
+
+    def infer_var(self, var):
+        return self.variables.get(variable(var, var.val), UNKNOWN)
+
+    def infer_klass(self, klass):
+        if getattr(klass, 'static_type', None) is not None:
+            return klass.static_type
+
+        # methods don't see the variables of the program
+        variables = self.variables
+        self.variables = {}
+        yield klass.body
+        self.variables = variables
+        return ClassType(klass.name)
+
+    def infer_funktion(self, funktion):
+        # each method has variables of its own
+        variables = self.variables
+        self.variables = {}
+        for param in funktion.params:
+            yield param
+        if funktion.body:
+            yield funktion.body
+        self.variables = variables
+
+        ret_type = funktion.ret_type
+        if ret_type is None:
+            return VOID
+        if isinstance(ret_type, Return):
+            return getattr(ret_type, 'static_type', UNKNOWN)
+        return TYPE_NAMES.get(ret_type, UNKNOWN)
+
+    def infer_param(self, param):
+        typ = TYPE_NAMES.get(param.type, UNKNOWN)
+        self.variables[variable(param, param.name)] = typ
+        return typ
+
+    def infer_return(self, return_):
+        return (yield return_.val)
+
+    def infer_call(self, call):
+        for arg in call.args:
+            yield arg
+        return ClassType(call.func)
+
+    def infer_method_call(self, call):
+        for arg in call.args:
+            yield arg
+
+        typ = self.variables.get(variable(call, call.instance))
+        klass = isinstance(typ, ClassType) and self.classes.get(typ.name)
+        for funktion in klass and klass.functions or ():
+            if funktion.name == call.method:
+                return getattr(funktion, 'static_type', UNKNOWN)
+        return UNKNOWN
+
+
+def infer_types(program, classes=()):
+    """
+    Annotates the program, see TypeInference
+    """
+    return TypeInference(classes).infer(program)
@@ -0,0 +1,420 @@
+"""
+Interpreter tier: runs a program straight from its AST, with no LLVM involved, so short scripts don't pay for
+initializing LLVM, printing the IR and compiling it.
+
+Only programs whose compiled behaviour it reproduces exactly are interpreted, `check` tells them apart. It
+follows the code generator statement by statement: variables live from their first assignment to the end of
+the block holding it, `continue` ends the innermost block, `break` has to be a statement of the loop body and
+ints are 32 bits, wrapping around on overflow. Ints are only divided by literals other than 0 and -1, the
+compiled division traps when dividing by zero or overflowing. Anything else (classes, function calls, mixing
+ints and floats, ...) is left to the JIT.
+"""
+from math import copysign
+
+from opal.ast.binop import Add, Assign, Div, Equals, GreaterThan, GreaterThanEqual, LessThan, LessThanEqual, \
+    Mul, Sub, Unequals
+from opal.ast.conditionals import If
+from opal.ast.iterators import For, IndexOf, While
+from opal.ast.program import Block, Program
+from opal.ast.statements import Print
+from opal.ast.terminals import Break, Continue
+from opal.ast.types import Bool, Float, Integer, List, String
+from opal.ast.vars import Var, VarValue
+
+INT = 'int'
+FLOAT = 'float'
+BOOL = 'bool'
+LIST = 'list'
+
+INT_MIN = -2 ** 31
+INT_MAX = 2 ** 31 - 1
+
+ARITHMETIC = (Add, Sub, Mul, Div)
+COMPARISONS = (GreaterThan, GreaterThanEqual, LessThan, LessThanEqual, Equals, Unequals)
+
+BREAK = object()
+
+# the checker and the interpreter recurse, deeper programs are compiled
+MAX_DEPTH = 100
+
+
+class Uninterpretable(Exception):
+    pass
+
+
+def string_type(val):
+    # strings are typed by their length, as the [n x i8] constants the code generator makes of them
+    return 'string', len(val) + 1
+
+
+# noinspection PyMethodMayBeStatic
+class Checker:
+    """
+    Types a program the way the code generator does, in textual order, raising Uninterpretable on anything the
+    interpreter can't run exactly like the compiled code would.
+    """
+
+    def __init__(self):
+        self.scopes = []
+        self.dead = set()
+        self.top_level = []
+
+    def check(self, program: Program):
+        if not isinstance(program, Program):
+            raise Uninterpretable(program.__class__.__name__)
+
+        self.check_block(program.block)
+        return self.top_level
+
+    def lookup(self, name):
+        if name in self.dead:
+            raise Uninterpretable(f'{name} used out of the block defining it')
+
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+
+    def define(self, name, typ):
+        current = self.lookup(name)
+        if current is None:
+            self.scopes[-1][name] = typ
+            if len(self.scopes) == 1:
+                self.top_level.append(name)
+        elif current != typ:
+            raise Uninterpretable(f'{name} assigned a different type')
+
+    def check_block(self, block: Block, loop_body=False):
+        self.scopes.append({})
+
+        for stmt in block.statements:
+            if isinstance(stmt, Continue):
+                break
+            if isinstance(stmt, Break):
+                if not loop_body:
+                    raise Uninterpretable('break out of a loop body')
+                break
+            self.check_statement(stmt)
+
+        self.dead.update(self.scopes.pop())
+
+    def check_statement(self, stmt):
+        if isinstance(stmt, Assign):
+            if isinstance(stmt.rhs, VarValue):
+                raise Uninterpretable('assigning a variable')
+            self.define(stmt.lhs.val, self.type_of(stmt.rhs))
+        elif isinstance(stmt, Print):
+            if self.type_of(stmt.val) == LIST:
+                raise Uninterpretable('printing a list')
+        elif isinstance(stmt, If):
+            if self.type_of(stmt.cond) not in (INT, FLOAT, BOOL):
+                raise Uninterpretable('condition')
+            self.check_block(stmt.then_)
+            if stmt.else_:
+                self.check_block(stmt.else_)
+        elif isinstance(stmt, While):
+            if self.type_of(stmt.cond) != BOOL:
+                raise Uninterpretable('loop condition')
+            self.check_block(stmt.body, loop_body=True)
+        elif isinstance(stmt, For):
+            if self.type_of(stmt.iterable) != LIST:
+                raise Uninterpretable('iterating over something else than a list')
+            self.scopes.append({})
+            self.define(stmt.var.val, INT)
+            self.check_block(stmt.body, loop_body=True)
+            self.dead.update(self.scopes.pop())
+        else:
+            self.type_of(stmt)
+
+    def type_of(self, expr):
+        if isinstance(expr, Bool):
+            return BOOL
+        if isinstance(expr, Integer):
+            if not INT_MIN <= expr.val <= INT_MAX:
+                raise Uninterpretable('int literal out of range')
+            return INT
+        if isinstance(expr, Float):
+            return FLOAT
+        if isinstance(expr, String):
+            if any(ord(char) > 127 for char in expr.val):
+                raise Uninterpretable('non ASCII string')
+            return string_type(expr.val)
+        if isinstance(expr, VarValue):
+            typ = self.lookup(expr.val)
+            if typ is None:
+                raise Uninterpretable(f'{expr.val} not defined')
+            return typ
+        if isinstance(expr, List):
+            if any(self.type_of(item) != INT for item in expr.items):
+                raise Uninterpretable('list of something else than ints')
+            return LIST
+        if isinstance(expr, IndexOf):
+            if not isinstance(expr.lst, (VarValue, List)) or self.type_of(expr.lst) != LIST:
+                raise Uninterpretable('indexing something else than a list')
+            return self.type_of(expr.index)
+        if isinstance(expr, ARITHMETIC + COMPARISONS):
+            left = self.type_of(expr.lhs)
+            right = self.type_of(expr.rhs)
+
+            if left != right or left not in (INT, FLOAT):
+                raise Uninterpretable(f'{expr.op} on {left} and {right}')
+            if left == FLOAT and isinstance(expr, Div):
+                raise Uninterpretable('float division')
+            # the compiled division traps on 0, and on -1 when it overflows
+            if isinstance(expr, Div) and not (isinstance(expr.rhs, Integer) and expr.rhs.val not in (0, -1)):
+                raise Uninterpretable('division by a divisor not known to be safe')
+
+            return isinstance(expr, ARITHMETIC) and left or BOOL
+
+        raise Uninterpretable(expr.__class__.__name__)
+
+
+def nesting_depth(node):
+    deepest = 0
+    stack = [(node, 1)]
+    while stack:
+        node, depth = stack.pop()
+        deepest = max(deepest, depth)
+        stack.extend((child, depth + 1) for child in node.children())
+    return deepest
+
+
+def check(program: Program):
+    """
+    :return: the names of the program's top level variables, in order of definition
+    :raise Uninterpretable: when the program has to be compiled
+    """
+    if nesting_depth(program) > MAX_DEPTH:
+        raise Uninterpretable('nested too deeply')
+    return Checker().check(program)
+
+
+def wrap(val):
+    return (val - INT_MIN) % 2 ** 32 + INT_MIN
+
+
+def sdiv(left, right):
+    # rounds towards zero, as C and LLVM's sdiv do
+    quotient = abs(left) // abs(right)
+    return wrap(quotient if (left < 0) == (right < 0) else -quotient)
+
+
+def fcmp(compare):
+    # LLVM's ordered comparisons, false when either side is NaN
+    return lambda left, right: left == left and right == right and compare(left, right)
+
+
+def format_float(val):
+    # C's printf("%g\n") prints NaNs with their sign
+    if val != val:
+        return copysign(1, val) < 0 and '-nan\n' or 'nan\n'
+    return '%g\n' % val
+
+
+INT_OPS = {
+    Add: lambda left, right: wrap(left + right),
+    Sub: lambda left, right: wrap(left - right),
+    Mul: lambda left, right: wrap(left * right),
+    Div: sdiv,
+    GreaterThan: lambda left, right: left > right,
+    GreaterThanEqual: lambda left, right: left >= right,
+    LessThan: lambda left, right: left < right,
+    LessThanEqual: lambda left, right: left <= right,
+    Equals: lambda left, right: left == right,
+    Unequals: lambda left, right: left != right,
+}
+
+FLOAT_OPS = {
+    Add: lambda left, right: left + right,
+    Sub: lambda left, right: left - right,
+    Mul: lambda left, right: left * right,
+    GreaterThan: fcmp(lambda left, right: left > right),
+    GreaterThanEqual: fcmp(lambda left, right: left >= right),
+    LessThan: fcmp(lambda left, right: left < right),
+    LessThanEqual: fcmp(lambda left, right: left <= right),
+    Equals: fcmp(lambda left, right: left == right),
+    Unequals: fcmp(lambda left, right: left != right),
+}
+
+
+class Interpreter:
+    """
+    Runs checked programs. Output goes to `write`, one string per print.
+
+    Every pass through a loop body counts as an iteration. Once `loop_threshold` of them have run, the top
+    level loop being executed is handed over: `run` stops at the start of its next iteration and returns the
+    rest of the program, with the variables set to their current values, for the JIT to compile and run.
+    """
+
+    def __init__(self, write, loop_threshold=None):
+        self.write = write
+        self.loop_threshold = loop_threshold
+        self.iterations = 0
+        self.env = {}
+
+        self.statements = {
+            Assign: self.assign,
+            Print: self.print,
+            If: self.if_,
+            While: self.while_,
+            For: self.for_,
+        }
+
+        self.expressions = {
+            Integer: self.value,
+            Float: self.value,
+            Bool: self.value,
+            String: self.value,
+            VarValue: self.var,
+            List: self.list,
+            IndexOf: self.index_of,
+        }
+        for op in ARITHMETIC + COMPARISONS:
+            self.expressions[op] = self.binary_op
+
+    def run(self, program: Program, top_level=None):
+        """
+        :param top_level: the program's top level variables, as returned by `check`
+        :return: None once the program is done, the rest of it when a loop gets hot
+        """
+        if top_level is None:
+            top_level = check(program)
+
+        statements = program.block.statements
+        for position, stmt in enumerate(statements):
+            if isinstance(stmt, Continue):
+                return None
+
+            if isinstance(stmt, (While, For)) and self.loop_threshold is not None:
+                rest = self.run_top_level_loop(stmt)
+                if rest is not None:
+                    return self.continuation(top_level, [rest] + statements[position + 1:])
+            else:
+                self.execute(stmt)
+
+        return None
+
+    def run_top_level_loop(self, loop):
+        """
+        :return: a loop running the remaining iterations, if the threshold was crossed
+        """
+        body = loop.body
+
+        if isinstance(loop, While):
+            while True:
+                if self.iterations >= self.loop_threshold:
+                    return loop
+                if not self.eval(loop.cond):
+                    return None
+                self.iterations += 1
+                if self.run_block(body) is BREAK:
+                    return None
+
+        items = self.eval(loop.iterable)
+        name = loop.var.val
+        for position, item in enumerate(items):
+            if self.iterations >= self.loop_threshold:
+                return For(loop.var, List([Integer(item) for item in items[position:]]), body)
+            self.env[name] = item
+            self.iterations += 1
+            if self.run_block(body) is BREAK:
+                return None
+
+        return None
+
+    def continuation(self, top_level, statements):
+        assignments = [Assign(Var(name), self.as_literal(self.env[name])) for name in top_level if name in self.env]
+        return Program(Block(assignments + statements))
+
+    def as_literal(self, val):
+        if isinstance(val, bool):
+            return Bool(val)
+        if isinstance(val, int):
+            return Integer(val)
+        if isinstance(val, float):
+            return Float(val)
+        if isinstance(val, str):
+            return String(val)
+        return List([Integer(item) for item in val])
+
+    def run_block(self, block):
+        for stmt in block.statements:
+            kind = stmt.__class__
+            if kind is Continue:
+                return None
+            if kind is Break:
+                return BREAK
+            self.execute(stmt)
+        return None
+
+    def execute(self, stmt):
+        statement = self.statements.get(stmt.__class__)
+        if statement:
+            statement(stmt)
+        else:
+            self.eval(stmt)
+
+    def eval(self, expr):
+        return self.expressions[expr.__class__](expr)
+
+    def assign(self, stmt):
+        self.env[stmt.lhs.val] = self.eval(stmt.rhs)
+
+    def print(self, stmt):
+        val = self.eval(stmt.val)
+
+        if isinstance(val, bool):
+            self.write(val and 'true' or 'false')
+        elif isinstance(val, float):
+            self.write(format_float(val))
+        else:
+            self.write(f'{val}\n')
+
+    def if_(self, stmt):
+        cond = self.eval(stmt.cond)
+        # `cond == cond` is false for NaN, which isn't != 0.0 for an ordered comparison
+        if cond == cond and cond:
+            self.run_block(stmt.then_)
+        elif stmt.else_:
+            self.run_block(stmt.else_)
+
+    def while_(self, stmt):
+        while self.eval(stmt.cond):
+            self.iterations += 1
+            if self.run_block(stmt.body) is BREAK:
+                break
+
+    def for_(self, stmt):
+        name = stmt.var.val
+        for item in self.eval(stmt.iterable):
+            self.env[name] = item
+            self.iterations += 1
+            if self.run_block(stmt.body) is BREAK:
+                break
+
+    # noinspection PyMethodMayBeStatic
+    def value(self, expr):
+        return expr.val
+
+    def var(self, expr):
+        return self.env[expr.val]
+
+    def list(self, expr):
+        return tuple(self.eval(item) for item in expr.items)
+
+    def index_of(self, expr):
+        items = self.eval(expr.lst)
+        index = expr.index.val
+
+        if not 0 <= index < len(items):
+            self.write(f'Index {index} out of bounds for vector of size {len(items)}\n')
+            raise SystemExit(1)
+
+        return items[index]
+
+    def binary_op(self, expr):
+        left = self.eval(expr.lhs)
+        right = self.eval(expr.rhs)
+
+        if isinstance(left, float):
+            return FLOAT_OPS[expr.__class__](left, right)
+        return INT_OPS[expr.__class__](left, right)
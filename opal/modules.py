@@ -0,0 +1,301 @@
+"""
+Programs split into modules: `import shapes` finds shapes.opal (`import geometry.shapes`, geometry/shapes.opal) on the
+search path, compiles it into LLVM bitcode of its own and links it with the program. Importing a module runs its top
+level statements, the first time only, and gives the importer the classes it defines, and the ones of the modules it
+imports in turn.
+
+Each module is compiled once for all the programs importing it: its bitcode is cached by its source, the compiler and
+the keys of its imports, its AST by its source (see opal.cache.ASTCache). Modules that don't import each other are
+compiled in parallel, in worker processes.
+"""
+import os
+import re
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from os import path
+
+# noinspection PyPackageRequirements
+from llvmlite import binding as llvm
+
+from opal.ast import deserialize, serialize
+from opal.cache import cache_key, get_compiler_digest
+from opal.codegen import CodeGenerator, module_entry
+from opal.optimizer import optimize
+from opal.report import NULL_REPORT
+from opal.target import get_target_machine, get_target_options, initialize_llvm, set_target
+
+MODULE_EXTENSION = '.opal'
+
+# directories searched after the one of the program, separated by os.pathsep
+PATH_ENV = 'OPAL_PATH'
+
+# imports are statements of their own, found without parsing
+IMPORT = re.compile(r'\s*import\s+([A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*)\s*$')
+
+
+class ModuleError(Exception):
+    pass
+
+
+def get_search_path(directories=()):
+    """
+    :return: the directories, then the ones of $OPAL_PATH
+    """
+    return list(directories) + [directory for directory in os.environ.get(PATH_ENV, '').split(os.pathsep) if directory]
+
+
+def find_imports(lines):
+    """
+    :param lines: iterable of lines, as a file open for reading
+    :return: the names of the modules imported, in order, once each
+    """
+    imports = []
+    for line in lines:
+        match = IMPORT.match(line)
+        if match and match.group(1) not in imports:
+            imports.append(match.group(1))
+    return imports
+
+
+def find_module(name, search_path):
+    """
+    :return: the path of the module's source
+    """
+    relative = path.join(*name.split('.')) + MODULE_EXTENSION
+    for directory in search_path:
+        file = path.join(directory, relative)
+        if path.isfile(file):
+            return file
+
+    raise ModuleError(f'Module {name} not found in {os.pathsep.join(search_path)}')
+
+
+class Module:
+    """
+    A module to compile. `key`, `bitcode` and `classes` are set by ModuleCompiler
+    """
+
+    def __init__(self, name, file, source):
+        self.name = name
+        self.file = file
+        self.source = source
+        self.imports = find_imports(source.splitlines())
+
+        self.key = None
+        self.bitcode = None
+        self.classes = None
+
+    def __repr__(self):
+        return f'Module({self.name!r}, {self.file!r})'
+
+
+def resolve(imports, search_path):
+    """
+    :param imports: names of the modules imported by a program
+    :return: OrderedDict name: Module of them and of the ones they import, every module after its imports
+    """
+    modules = OrderedDict()
+    loading = []
+
+    def load(name):
+        if name in modules:
+            return
+        if name in loading:
+            raise ModuleError(f'Circular import: {" -> ".join(loading[loading.index(name):] + [name])}')
+
+        loading.append(name)
+        file = find_module(name, search_path)
+        with open(file, 'r') as f:
+            module = Module(name, file, f.read())
+
+        for imported in module.imports:
+            load(imported)
+
+        loading.pop()
+        modules[name] = module
+
+    for name in imports:
+        load(name)
+
+    return modules
+
+
+def compile_unit(name, source, ast, shared_classes, opt_level=0, size_level=0, cpu=None, features=None):
+    """
+    Compiles a module, in a worker process or not: it only takes and returns bytes and strings
+    :param ast: the serialized (Program, classes) of the module, None to parse the source
+    :param shared_classes: the serialized list of the classes the module can use, see opal.ast.serialize
+    :return: (bitcode, serialized (Program, classes))
+    """
+    initialize_llvm()
+
+    if ast is None:
+        from opal.ast.visitor import ASTVisitor
+        from opal.parser import parse_program
+
+        visitor = ASTVisitor()
+        program = parse_program(source, visitor)
+        # before the code generator gets its hands on it
+        ast = serialize(program, visitor.classes)
+        classes = visitor.classes
+    else:
+        program, classes = deserialize(ast)
+
+    codegen = CodeGenerator(entry=module_entry(name), shared_classes=deserialize(shared_classes)[0], once=True)
+    codegen.generate(program, classes)
+
+    target_machine = get_target_machine(cpu, features)
+    try:
+        llvm_mod = llvm.parse_assembly(str(codegen.module))
+        llvm_mod.verify()
+    # llvmlite reports them as RuntimeError, which errors of Python itself derive from too
+    except (RecursionError, NotImplementedError):
+        raise
+    except RuntimeError as e:
+        raise ModuleError(f'Module {name}: {e}') from e
+    set_target(llvm_mod, target_machine)
+    optimize(llvm_mod, opt_level, size_level, target_machine)
+
+    return llvm_mod.as_bitcode(), ast
+
+
+def link_modules(llvm_mod, modules):
+    """
+    Links the bitcode of compiled modules into a llvmlite.binding.ModuleRef
+    """
+    for module in modules:
+        llvm_mod.link_in(llvm.parse_bitcode(module.bitcode))
+    return llvm_mod
+
+
+class ModuleCompiler:
+    """
+    Compiles the modules imported by programs, each one apart from the others, see the module's docstring
+
+        compiler = ModuleCompiler([library_dir], cache=ObjectCache(extension=BITCODE_EXTENSION))
+        modules = compiler.compile(['shapes'])
+        codegen = CodeGenerator(shared_classes=classes_of(modules))
+        ...
+        link_modules(llvm_mod, modules)
+    """
+
+    def __init__(self, search_path=(), cache=None, ast_cache=None, jobs=None, opt_level=0, size_level=0, cpu=None,
+                 features=None):
+        """
+        :param search_path: directories modules are found in, in order, before the ones of $OPAL_PATH
+        :param cache: opal.cache.ObjectCache for the bitcode, see opal.cache.BITCODE_EXTENSION
+        :param ast_cache: opal.cache.ASTCache, modules found in it aren't parsed again
+        :param jobs: worker processes compiling modules, os.cpu_count() by default. With 1 they are compiled in this
+        process
+        """
+        self.search_path = get_search_path(search_path)
+        self.cache = cache
+        self.ast_cache = ast_cache
+        self.jobs = jobs or os.cpu_count() or 1
+        self.options = dict(opt_level=opt_level, size_level=size_level, cpu=cpu, features=features)
+
+    def key(self, module, modules):
+        cpu, features = get_target_options(self.options['cpu'], self.options['features'])
+        target_machine = get_target_machine(cpu, features)
+        return cache_key(module.source, get_compiler_digest(), self.options['opt_level'], self.options['size_level'],
+                         target_machine.triple, cpu, features, *(modules[name].key for name in module.imports))
+
+    def compile(self, imports, report=NULL_REPORT, search_path=()):
+        """
+        :param imports: names of the modules imported by a program, see find_imports
+        :param search_path: directories searched first, as the one of the program
+        :return: list of the modules compiled, every one after its imports
+        """
+        with report.phase('resolve_modules'):
+            modules = resolve(imports, list(search_path) + self.search_path)
+
+        # the classes each module can use: the ones of the modules it imports, directly or not
+        visible = {}
+        for module in modules.values():
+            visible[module.name] = set(module.imports).union(*(visible[name] for name in module.imports))
+
+        compiled = 0
+        executor = None
+        pending = list(modules.values())
+
+        try:
+            with report.phase('compile_modules'):
+                while pending:
+                    ready = [module for module in pending if all(modules[name].classes is not None
+                                                                 for name in module.imports)]
+                    pending = [module for module in pending if module not in ready]
+
+                    units = []
+                    for module in ready:
+                        module.key = self.key(module, modules)
+                        ast = self.load(module)
+                        if module.bitcode is None:
+                            classes = [klass for name in modules if name in visible[module.name]
+                                       for klass in modules[name].classes]
+                            units.append((module, ast, serialize(classes)))
+
+                    if len(units) > 1 and self.jobs > 1 and executor is None:
+                        executor = ProcessPoolExecutor(min(self.jobs, len(modules)))
+
+                    if executor:
+                        futures = [executor.submit(compile_unit, module.name, module.source, ast, classes,
+                                                   **self.options) for module, ast, classes in units]
+                        results = (future.result() for future in futures)
+                    else:
+                        results = (compile_unit(module.name, module.source, ast, classes, **self.options)
+                                   for module, ast, classes in units)
+
+                    for (module, _, _), (bitcode, ast) in zip(units, results):
+                        self.store(module, bitcode, ast)
+                        compiled += 1
+        finally:
+            if executor:
+                executor.shutdown()
+
+        report.count('modules', len(modules))
+        report.count('modules_compiled', compiled)
+        return list(modules.values())
+
+    def load(self, module):
+        """
+        Sets the bitcode of the module, when cached, and its classes
+        :return: its serialized AST when cached
+        """
+        if self.cache:
+            module.bitcode = self.cache.load(module.key)
+
+        cached = self.ast_cache and self.ast_cache.load(module.source)
+        if cached:
+            program, module.classes = cached
+            return serialize(program, module.classes)
+
+        if module.bitcode is not None:
+            # only the classes are needed
+            from opal.ast.visitor import ASTVisitor
+            from opal.parser import parse_program
+
+            visitor = ASTVisitor()
+            parse_program(module.source, visitor)
+            module.classes = visitor.classes
+
+        return None
+
+    def store(self, module, bitcode, ast):
+        """
+        :param ast: serialized (Program, classes) of the module, as compile_unit returns it
+        """
+        module.bitcode = bitcode
+        if self.cache:
+            self.cache.store(module.key, bitcode)
+
+        if module.classes is None:
+            program, module.classes = deserialize(ast)
+            if self.ast_cache:
+                self.ast_cache.store(module.source, program, module.classes)
+
+
+def classes_of(modules):
+    """
+    :return: the classes defined by the modules, to give to the CodeGenerator of the program importing them
+    """
+    return [klass for module in modules for klass in module.classes]
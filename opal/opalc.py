@@ -0,0 +1,254 @@
+"""
+Ahead of time compiler: turns an Opal file into an object file, a native executable or a shared library,
+all of them with the CLib runtime linked in.
+
+    python -m opal.opalc program.opal -o program
+    python -m opal.opalc program.opal --emit shared -O3
+    python -m opal.opalc program.opal -I lib -j 4
+
+Modules imported by the program are found next to it, then in the -I directories and $OPAL_PATH, and cached in
+--cache-dir (see opal.modules).
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from os import path
+
+# noinspection PyPackageRequirements
+from lark.common import ParseError
+from lark.lexer import LexError
+from llvmlite import binding as llvm
+from llvmlite import ir
+
+from opal.ast.types import Integer
+from opal.cache import BITCODE_EXTENSION, DEFAULT_CACHE_DIR, ASTCache, ObjectCache
+from opal.codegen import CodegenError, CodeGenerator
+from opal.modules import ModuleCompiler, ModuleError, classes_of, find_imports, link_modules
+from opal.optimizer import optimize
+from opal.report import CompileReport, NULL_REPORT
+from opal.resolver import ResolveError
+from opal.runtime import get_runtime
+from opal.target import AOT, get_target_machine, initialize_llvm, set_target
+
+OPAL_ENTRY = 'opal_main'
+
+EMIT_OBJECT = 'obj'
+EMIT_EXECUTABLE = 'exe'
+EMIT_SHARED = 'shared'
+EMIT_ASSEMBLY = 'asm'
+EMIT_IR = 'ir'
+
+EXTENSIONS = {
+    EMIT_OBJECT: '.o',
+    EMIT_EXECUTABLE: '',
+    EMIT_SHARED: '.so',
+    EMIT_ASSEMBLY: '.s',
+    EMIT_IR: '.ll',
+}
+
+# -O0 to -O3, -Os and -Oz as (opt_level, size_level)
+OPT_LEVELS = {
+    '0': (0, 0),
+    '1': (1, 0),
+    '2': (2, 0),
+    '3': (3, 0),
+    's': (2, 1),
+    'z': (2, 2),
+}
+
+
+class LinkError(Exception):
+    pass
+
+
+class InvalidModuleError(Exception):
+    """
+    LLVM failed to parse or verify the IR of the program
+    """
+
+
+def _add_c_main(codegen):
+    """
+    Wraps the program in a C compatible `int main()`, returning 0
+    """
+    main_ty = ir.FunctionType(Integer.as_llvm(), [])
+    main = ir.Function(codegen.module, main_ty, 'main')
+    builder = ir.IRBuilder(main.append_basic_block('entry'))
+    builder.call(codegen.module.get_global(OPAL_ENTRY), [])
+    builder.ret(ir.Constant(Integer.as_llvm(), 0))
+
+
+def create_target_machine(opt_level=2, cpu=None, features=None):
+    initialize_llvm()
+
+    return get_target_machine(cpu, features, opt=min(opt_level, 3), kind=AOT)
+
+
+def compile_module(code, target_machine, opt_level=2, size_level=0, report=NULL_REPORT, modules=()):
+    """
+    :param code: the source, or a file open for reading to stream it from (see CodeGenerator.generate_stream)
+    :param modules: the opal.modules.Module it imports, compiled
+    :return: llvmlite.binding.ModuleRef with the program, its `main`, its modules and the runtime
+    """
+    codegen = CodeGenerator(entry=OPAL_ENTRY, shared_classes=modules and classes_of(modules) or None)
+    if isinstance(code, str):
+        codegen.generate_code(code, report)
+    else:
+        codegen.generate_file(code, report)
+    _add_c_main(codegen)
+
+    with report.phase('print_module'):
+        llvm_ir = str(codegen.module)
+
+    with report.phase('parse_assembly'):
+        try:
+            llvm_mod = llvm.parse_assembly(llvm_ir)
+        # llvmlite reports them as RuntimeError, which errors of Python itself derive from too
+        except (RecursionError, NotImplementedError):
+            raise
+        except RuntimeError as e:
+            raise InvalidModuleError(str(e)) from e
+        set_target(llvm_mod, target_machine)
+
+    with report.phase('link_runtime'):
+        llvm_mod.link_in(get_runtime())
+
+    if modules:
+        with report.phase('link_modules'):
+            link_modules(llvm_mod, modules)
+
+    with report.phase('verify'):
+        try:
+            llvm_mod.verify()
+        except (RecursionError, NotImplementedError):
+            raise
+        except RuntimeError as e:
+            raise InvalidModuleError(str(e)) from e
+
+    with report.phase('optimize'):
+        return optimize(llvm_mod, opt_level, size_level, target_machine)
+
+
+def link(objects, output, shared=False, cc=None, link_args=None):
+    cc = cc or os.environ.get('CC', 'cc')
+    command = [cc] + (shared and ['-shared'] or []) + ['-o', output] + list(objects) + list(link_args or [])
+
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    if result.returncode:
+        raise LinkError(result.stdout.decode('utf-8', 'replace'))
+
+
+def compile_imports(source, imports, opt_level=2, size_level=0, cpu=None, features=None, search_path=(), jobs=None,
+                    cache_dir=None, report=NULL_REPORT):
+    """
+    :return: the modules imported by the source file, see opal.modules.ModuleCompiler
+    """
+    cache = cache_dir and ObjectCache(cache_dir, extension=BITCODE_EXTENSION) or None
+    ast_cache = cache_dir and ASTCache(directory=cache_dir) or None
+
+    compiler = ModuleCompiler(search_path, cache, ast_cache, jobs, opt_level, size_level, cpu, features)
+    return compiler.compile(imports, report, [path.dirname(path.abspath(source))])
+
+
+def compile_file(source, output=None, emit=EMIT_EXECUTABLE, opt_level=2, size_level=0, cc=None, link_args=None,
+                 cpu=None, features=None, report=NULL_REPORT, search_path=(), jobs=None, cache_dir=None):
+    """
+    :param search_path: directories imported modules are found in, after the one of the source
+    :param jobs: processes compiling the imported modules, see opal.modules.ModuleCompiler
+    :param cache_dir: where the compiled modules are cached, None to compile them every time
+    :return: the path of the generated file
+    """
+    if output is None:
+        output = path.splitext(source)[0] + EXTENSIONS[emit]
+
+    target_machine = create_target_machine(opt_level, cpu, features)
+    with open(source, 'r') as f:
+        imports = find_imports(f)
+        modules = imports and compile_imports(source, imports, opt_level, size_level, cpu, features, search_path,
+                                              jobs, cache_dir, report) or []
+
+        f.seek(0)
+        llvm_mod = compile_module(f, target_machine, opt_level, size_level, report, modules)
+
+    if emit == EMIT_IR:
+        with open(output, 'w') as f:
+            f.write(str(llvm_mod))
+        return output
+
+    if emit == EMIT_ASSEMBLY:
+        with open(output, 'w') as f:
+            f.write(target_machine.emit_assembly(llvm_mod))
+        return output
+
+    with report.phase('emit_machine_code'):
+        obj = target_machine.emit_object(llvm_mod)
+
+    report.count('object_bytes', len(obj))
+
+    if emit == EMIT_OBJECT:
+        with open(output, 'wb') as f:
+            f.write(obj)
+        return output
+
+    with tempfile.TemporaryDirectory() as tmp:
+        obj_file = path.join(tmp, path.basename(path.splitext(source)[0]) + '.o')
+        with open(obj_file, 'wb') as f:
+            f.write(obj)
+
+        with report.phase('link'):
+            link([obj_file], output, shared=emit == EMIT_SHARED, cc=cc, link_args=link_args)
+
+    return output
+
+
+def get_arg_parser():
+    arg_parser = argparse.ArgumentParser(prog='opalc', description='Opal ahead of time compiler')
+    arg_parser.add_argument('source', help='Opal source file')
+    arg_parser.add_argument('-o', '--output', help='output file, named after the source by default')
+    arg_parser.add_argument('--emit', choices=sorted(EXTENSIONS), default=EMIT_EXECUTABLE,
+                            help='kind of output (default: %(default)s)')
+    arg_parser.add_argument('-O', dest='opt', choices=sorted(OPT_LEVELS), default='2',
+                            help='optimization level, as in -O0 to -O3, -Os and -Oz (default: %(default)s)')
+    arg_parser.add_argument('--cpu', help='CPU to generate code for (default: $OPAL_TARGET_CPU or the host)')
+    arg_parser.add_argument('--features', help='CPU features, as in +avx2,-fma '
+                                               '(default: $OPAL_TARGET_FEATURES or the host)')
+    arg_parser.add_argument('--cc', help='C compiler used as linker (default: $CC or cc)')
+    arg_parser.add_argument('--link-arg', dest='link_args', action='append', default=[],
+                            help='extra argument passed to the linker, can be repeated')
+    arg_parser.add_argument('-I', dest='search_path', action='append', default=[],
+                            help='directory imported modules are found in, after the one of the source, '
+                                 'can be repeated')
+    arg_parser.add_argument('-j', '--jobs', type=int, help='processes compiling the imported modules '
+                                                           '(default: the number of CPUs)')
+    arg_parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                            help='where compiled modules are kept (default: %(default)s)')
+    arg_parser.add_argument('--no-cache', action='store_true', help='compiles the imported modules every time')
+    arg_parser.add_argument('--trace', help='writes the time spent in each phase as a Chrome trace to this file')
+    return arg_parser
+
+
+def main(argv=None):
+    args = get_arg_parser().parse_args(argv)
+    opt_level, size_level = OPT_LEVELS[args.opt]
+    report = args.trace and CompileReport() or NULL_REPORT
+
+    cache_dir = not args.no_cache and args.cache_dir or None
+
+    try:
+        compile_file(args.source, args.output, args.emit, opt_level, size_level, cc=args.cc,
+                     link_args=args.link_args, cpu=args.cpu, features=args.features, report=report,
+                     search_path=args.search_path, jobs=args.jobs, cache_dir=cache_dir)
+    except (LinkError, InvalidModuleError, ModuleError, ResolveError, CodegenError, LexError, ParseError) as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    if args.trace:
+        report.write_chrome_trace(args.trace)
+
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,70 @@
+# noinspection PyPackageRequirements
+from llvmlite import binding as llvm
+
+
+def get_inlining_threshold(opt_level, size_level):
+    """
+    The same thresholds clang uses for -O2, -O3, -Os and -Oz
+    """
+    if opt_level < 2:
+        return None
+    if size_level == 1:
+        return 75
+    if size_level >= 2:
+        return 25
+    if opt_level >= 3:
+        return 275
+    return 225
+
+
+def create_pass_manager_builder(opt_level, size_level=0):
+    """
+    The standard LLVM pipeline for the given levels: mem2reg (through SROA), instcombine, GVN, the inliner
+    and, unless optimizing for size, the loop and SLP vectorizers.
+    """
+    pmb = llvm.create_pass_manager_builder()
+    pmb.opt_level = opt_level
+    pmb.size_level = size_level
+
+    inlining_threshold = get_inlining_threshold(opt_level, size_level)
+    if inlining_threshold:
+        pmb.inlining_threshold = inlining_threshold
+
+    vectorize = opt_level >= 2 and size_level == 0
+    pmb.loop_vectorize = vectorize
+    pmb.slp_vectorize = vectorize
+
+    return pmb
+
+
+def optimize(module, opt_level=0, size_level=0, target_machine=None):
+    """
+    Runs the optimization pipeline in place
+    :param module: llvmlite.binding.ModuleRef
+    :param opt_level: 0 to 3, as in -O0 to -O3. 0 leaves the module untouched
+    :param size_level: 0 to 2, with opt_level 2 they are -Os and -Oz
+    :param target_machine: lets the passes use the target's cost model and data layout
+    """
+    if not opt_level:
+        return module
+
+    pmb = create_pass_manager_builder(opt_level, size_level)
+
+    fpm = llvm.create_function_pass_manager(module)
+    pm = llvm.create_module_pass_manager()
+
+    if target_machine:
+        target_machine.add_analysis_passes(fpm)
+        target_machine.add_analysis_passes(pm)
+
+    pmb.populate(fpm)
+    pmb.populate(pm)
+
+    fpm.initialize()
+    for func in module.functions:
+        fpm.run(func)
+    fpm.finalize()
+
+    pm.run(module)
+
+    return module
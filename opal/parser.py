@@ -1,30 +1,269 @@
+import copyreg
 import os
+import pickle
+import re
+import tempfile
+import threading
+from hashlib import sha3_256
+from os import path
 
+import lark
 from lark import Lark
+from lark.parsers import lalr_analysis
 
 import opal
+from opal.ast.visitor import ASTVisitor
 
+# LALR(1) with the contextual lexer parses in linear time, opal.g is the original, ambiguous, grammar for Earley
+LALR = 'lalr'
+EARLEY = 'earley'
 
-def _get_grammar():
+GRAMMARS = {
+    LALR: 'opal_lalr.g',
+    EARLEY: 'opal.g',
+}
+
+LEXERS = {
+    LALR: 'contextual',
+    EARLEY: 'standard',
+}
+
+DEFAULT_CACHE_DIR = path.join(path.expanduser('~'), '.cache', 'opal', 'parsers')
+PARSER_EXTENSION = '.pickle'
+
+# blocks open and end on lines of their own
+BLOCK_START = re.compile(r'\s*(if|while|for|class|def)\b')
+BLOCK_END = re.compile(r'\s*end\b')
+
+
+def _get_action(name):
+    return getattr(lalr_analysis, name)
+
+
+# the LALR tables tell shifts from reductions by identity, keep the singletons when unpickling them
+copyreg.pickle(lalr_analysis.Action, lambda action: (_get_action, (action.name,)))
+
+
+def _get_grammar(file_name=GRAMMARS[EARLEY]):
     opal_path = os.path.dirname(opal.__file__)
-    grammar_file_path = os.path.join(opal_path, 'grammars', 'opal.g')
+    grammar_file_path = os.path.join(opal_path, 'grammars', file_name)
 
     with open(grammar_file_path, 'r') as f:
         grammar = f.read()
     return grammar
 
 
-class Parser:
+def get_grammar_digest(grammar, algorithm, inline=False):
+    m = sha3_256()
+    for part in (grammar, algorithm, LEXERS[algorithm], inline, lark.__version__, pickle.HIGHEST_PROTOCOL):
+        m.update(str(part).encode('utf-8'))
+        m.update(b'\0')
+    return m.hexdigest()
+
+
+class InlineCallback:
+    """
+    Reduces a rule by calling the method of the same name of the ASTBuilder's current visitor
+    """
+
+    def __init__(self, builder, name):
+        self.builder = builder
+        self.name = name
+
+    def __call__(self, children):
+        return getattr(self.builder.visitor, self.name)(*children)
+
+
+class ASTBuilder:
+    """
+    Transformer embedded in the LALR parser: AST nodes are built by the ASTVisitor as the rules get reduced, instead
+    of a lark Tree to be transformed afterwards. Rules the visitor doesn't handle (the ones inlined, starting with _)
+    still build trees for lark to splice into their parent.
+    """
 
     def __init__(self):
-        self.lark = Lark(_get_grammar(), start="program", lexer="standard")
+        self.visitor = None
+
+    def _get_func(self, name):
+        if name.startswith('_') or not callable(getattr(ASTVisitor, name, None)):
+            raise AttributeError(name)
+        return InlineCallback(self, name)
+
+
+class Parser:
+
+    def __init__(self, algorithm=LALR, cache_dir=DEFAULT_CACHE_DIR, inline=False):
+        """
+        :param algorithm: LALR or EARLEY, both build the same trees
+        :param cache_dir: where the compiled parser tables are kept, one file per grammar version. None builds them
+        every time
+        :param inline: builds the AST while parsing, see ASTBuilder. LALR only
+        """
+        if inline and algorithm != LALR:
+            raise ValueError('Only the LALR parser can build the AST while parsing')
+
+        self.algorithm = algorithm
+        self.cache_dir = cache_dir
+        self.inline = inline
+        self._lock = threading.Lock()
+
+        grammar = _get_grammar(GRAMMARS[algorithm])
+        digest = get_grammar_digest(grammar, algorithm, inline)
+        self.cache_file = cache_dir and path.join(cache_dir, f'{digest}{PARSER_EXTENSION}')
+
+        self.lark = self._load()
+        if self.lark is None:
+            self.lark = Lark(grammar, start="program", parser=algorithm, lexer=LEXERS[algorithm],
+                             transformer=inline and ASTBuilder() or None)
+            self._save()
+
+        # the one the callbacks were bound to, including when unpickled
+        self.builder = self.lark.options.transformer
+
+    def _load(self):
+        if not self.cache_file:
+            return None
+        try:
+            with open(self.cache_file, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            # missing, truncated or written by an incompatible lark: rebuilt and overwritten
+            return None
+
+    def _save(self):
+        if not self.cache_file:
+            return
+
+        # the item sets are only needed to build the tables
+        tables = getattr(self.lark.parser, 'parser', None)
+        if hasattr(tables, 'analysis'):
+            del tables.analysis
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, temp_file = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(self.lark, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temp_file, self.cache_file)
+            except BaseException:
+                os.unlink(temp_file)
+                raise
+        except OSError:
+            # a read only home only costs building the tables again
+            pass
+
+    def parse(self, string, visitor=None):
+        """
+        :param visitor: inline parsers only, the ASTVisitor building the nodes and collecting the classes. A new one
+        by default
+        :return: the lark Tree of the program, or its Program node for inline parsers
+        """
+        if not self.inline:
+            return self.lark.parse(f'{string}\n')
+
+        with self._lock:
+            self.builder.visitor = visitor or ASTVisitor()
+            try:
+                return self.lark.parse(f'{string}\n')
+            finally:
+                self.builder.visitor = None
+
+
+_parsers = {}
+
+
+def get_parser(algorithm=LALR, inline=False):
+    """
+    :return: the parser shared by the process, built or loaded from the cache on first use
+    """
+    key = (algorithm, inline)
+    if key not in _parsers:
+        _parsers[key] = Parser(algorithm, inline=inline)
+    return _parsers[key]
+
+
+def parse_program(code, visitor):
+    """
+    Parses the code with the LALR parser building the AST inline, no lark Tree is ever built
+    :param visitor: ASTVisitor, collects the classes defined by the program
+    :return: opal.ast.program.Program
+    """
+    return get_parser(LALR, inline=True).parse(code, visitor)
+
+
+class LazyParser:
+    """
+    Stands for get_parser(algorithm) until first used, importing this module doesn't load any parser
+    """
+
+    def __init__(self, algorithm=LALR):
+        self.algorithm = algorithm
+
+    def __getattr__(self, item):
+        return getattr(get_parser(self.algorithm), item)
+
+
+parser = LazyParser()
+
+
+def iter_statements(lines, min_lines=1, offsets=False):
+    """
+    Splits source code into chunks of whole top level statements, reading it a line at a time
+    :param lines: iterable of lines, as a file open for reading
+    :param min_lines: statements are grouped until their chunk has that many lines, parsing them one by one costs
+    more than their memory
+    :param offsets: yields (offset of the chunk in the source, chunk) instead
+    :return: generator of the source of each chunk, blocks included. Blank lines between statements are skipped, an
+    unterminated block is yielded as is for the parser to report
+    """
+    chunk = []
+    depth = 0
+    offset = start = 0
+
+    for line in lines:
+        if not chunk:
+            start = offset
+        offset += len(line)
+
+        if not depth and not line.strip():
+            continue
+
+        chunk.append(line)
+        if BLOCK_START.match(line):
+            depth += 1
+        elif BLOCK_END.match(line):
+            depth -= 1
+
+        if depth <= 0:
+            depth = 0
+            if len(chunk) >= min_lines:
+                yield (start, ''.join(chunk)) if offsets else ''.join(chunk)
+                chunk = []
+
+    if chunk:
+        yield (start, ''.join(chunk)) if offsets else ''.join(chunk)
 
-    def parse(self, string):
-        return self.lark.parse(f'{string}\n')
 
+def parse_compact(lines, min_lines=200):
+    """
+    Parses a program into an opal.ast.compact.CompactTree a chunk of statements at a time, only the AST of the
+    current chunk is ever built as objects
+    :param lines: iterable of lines, see iter_statements
+    :return: CompactTree, the offsets of its nodes are the ones of the chunks they were parsed in
+    """
+    from opal.ast.compact import CompactTree
+    from opal.ast.program import Block, Program
 
-def get_parser():
-    return Parser()
+    tree = CompactTree()
+    tree.append(Program(Block([])))
+    statements = tree.first_child[tree.first_child[0]]
 
+    for offset, chunk in iter_statements(lines, min_lines, offsets=True):
+        visitor = ASTVisitor()
+        indices = {}
+        for statement in parse_program(chunk, visitor).block.statements:
+            tree.append(statement, statements, offset, indices)
+        tree.classes.extend(indices[id(klass)] for klass in visitor.classes)
 
-parser = get_parser()
+    return tree
@@ -2,18 +2,49 @@ from collections import defaultdict
 
 
 class Plugin(type):
+    """
+    Registers the classes using it. Subclasses whose namespace sets `plugin = False` aren't registered, as the
+    views of opal.ast.compact, which stand for their base.
+
+    The registered classes are indexed by their `op` and `alias` as they're defined, for by and by_aka.
+    """
+
     def __init__(cls, name, bases, nmspc):
         super(Plugin, cls).__init__(name, bases, nmspc)
+        if nmspc.get('plugin') is False:
+            return
+
         if not hasattr(cls, 'registry'):
             cls.registry = set()
+            cls.registry_by_op = {}
+            cls.registry_by_alias = {}
 
         cls.registry.add(cls)
         cls.registry -= set(bases)  # Remove base classes
 
+        for base in bases:
+            Plugin._unindex(base)
+        Plugin._index(cls)
+
+    def _index(cls):
+        for index, key in ((cls.registry_by_op, getattr(cls, 'op', None)),
+                           (cls.registry_by_alias, getattr(cls, 'alias', None))):
+            if key is not None:
+                index[key] = cls
+
+    def _unindex(cls):
+        for index, key in ((getattr(cls, 'registry_by_op', {}), getattr(cls, 'op', None)),
+                           (getattr(cls, 'registry_by_alias', {}), getattr(cls, 'alias', None))):
+            if index.get(key) is cls:
+                del index[key]
+
     __inheritors__ = defaultdict(list)
 
     def __new__(mcs, name, bases, dct):
         klass = type.__new__(mcs, name, bases, dct)
+        if dct.get('plugin') is False:
+            return klass
+
         for base in klass.mro()[1:-1]:
             mcs.__inheritors__[base].append(klass)
         return klass
@@ -22,12 +53,8 @@ class Plugin(type):
         return iter(cls.__inheritors__[cls])
 
     def by(cls, op):
-        for klass in cls.registry:
-            if klass.op == op:
-                return klass
+        return cls.registry_by_op.get(op)
 
     def by_aka(cls, alias):
-        for klass in cls.registry:
-            if klass.alias == alias:
-                return klass
+        return cls.registry_by_alias.get(alias)
 
@@ -0,0 +1,127 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+
+from opal.ast import walk
+
+Phase = namedtuple('Phase', ['name', 'start', 'duration'])
+
+
+class CompileReport:
+    """
+    Time spent in each phase of a compilation, plus sizes of what they produced. Timing is a couple of
+    `perf_counter` calls per phase, cheap enough to leave on.
+
+        report = OpalEvaluator().evaluate(code, report=True)
+        report.write_chrome_trace('opal.trace.json')  # open it in chrome://tracing
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.phases = []
+        self.counters = OrderedDict()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append(Phase(name, start - self.origin, time.perf_counter() - start))
+
+    def count(self, name, value):
+        self.counters[name] = value
+
+    def count_ast(self, ast):
+        self.count('ast_nodes', sum(1 for _ in walk(ast)))
+
+    def count_ir(self, module):
+        """
+        :param module: llvmlite.ir.Module
+        """
+        functions = [f for f in module.functions if f.blocks]
+        blocks = [block for f in functions for block in f.blocks]
+        # the ones opal.codegen.StreamedFunction turned into text
+        spooled_blocks = sum(getattr(f, 'spooled_blocks', 0) for f in functions)
+        spooled_instructions = sum(getattr(f, 'spooled_instructions', 0) for f in functions)
+
+        self.count('ir_functions', len(functions))
+        self.count('ir_blocks', len(blocks) + spooled_blocks)
+        self.count('ir_instructions', sum(len(block.instructions) for block in blocks) + spooled_instructions)
+
+    def duration(self, name):
+        return sum(phase.duration for phase in self.phases if phase.name == name)
+
+    @property
+    def total(self):
+        return sum(phase.duration for phase in self.phases)
+
+    def as_dict(self):
+        durations = OrderedDict()
+        for phase in self.phases:
+            durations[phase.name] = durations.get(phase.name, 0) + phase.duration
+
+        return OrderedDict([
+            ('phases', durations),
+            ('total', self.total),
+            ('counters', self.counters),
+        ])
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.as_dict(), **kwargs)
+
+    def as_chrome_trace(self):
+        """
+        :return: the report in the Trace Event Format, as read by chrome://tracing and Perfetto
+        """
+        pid = os.getpid()
+        tid = threading.get_ident()
+
+        events = [{
+            'name': phase.name,
+            'cat': 'opal',
+            'ph': 'X',
+            'ts': phase.start * 1e6,
+            'dur': phase.duration * 1e6,
+            'pid': pid,
+            'tid': tid,
+        } for phase in self.phases]
+
+        if self.counters:
+            events.append({'name': 'sizes', 'cat': 'opal', 'ph': 'C', 'ts': 0, 'pid': pid, 'tid': tid,
+                           'args': self.counters})
+
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_json(self, file_name):
+        with open(file_name, 'w') as f:
+            f.write(self.to_json(indent=2))
+
+    def write_chrome_trace(self, file_name):
+        with open(file_name, 'w') as f:
+            json.dump(self.as_chrome_trace(), f)
+
+
+class NullReport:
+    """
+    Stands in for a CompileReport when none was asked for
+    """
+
+    @contextmanager
+    def phase(self, name):
+        yield
+
+    def count(self, name, value):
+        pass
+
+    def count_ast(self, ast):
+        pass
+
+    def count_ir(self, module):
+        pass
+
+
+NULL_REPORT = NullReport()
@@ -0,0 +1,203 @@
+"""
+Name resolution: binds every variable of a program to a slot of the frame of the function it lives in, before the
+code generator runs, so it stores and loads variables by their precomputed index instead of looking their names up
+in a table shared by the whole module.
+
+Scopes nest as the program does: the module, whose frame is the entry function's, then classes, methods, each with a
+frame of its own, and loops. A variable belongs to the innermost scope it's first assigned in, later assignments and
+reads from the scopes nested in it find it there. Methods don't see the variables of the module, and those of a loop,
+its loop variable included, end with it.
+
+Reading a variable before any assignment to it and declaring a loop variable or parameter that shadows a variable
+already visible are reported at compile time. Nodes get the slot they refer to in their `slot`, read only views of
+opal.ast.compact aren't annotated, the code generator resolves them by name.
+"""
+from opal.ast import trampoline
+from opal.ast.binop import Assign
+from opal.ast.iterators import For, While
+from opal.ast.types import Funktion, Klass, MethodCall
+from opal.ast.vars import VarValue
+
+MODULE = 'module'
+CLASS = 'class'
+METHOD = 'method'
+LOOP = 'loop'
+
+# the scopes owning a frame, variables of the scopes around them aren't visible
+FRAME_SCOPES = (MODULE, METHOD)
+
+
+class ResolveError(Exception):
+    pass
+
+
+class Frame:
+    """
+    The slots of the variables of a function
+    """
+    __slots__ = ('name', 'size')
+
+    def __init__(self, name):
+        self.name = name
+        self.size = 0
+
+    def allocate(self):
+        slot = self.size
+        self.size += 1
+        return slot
+
+
+class Scope:
+    __slots__ = ('kind', 'parent', 'frame', 'names')
+
+    def __init__(self, kind, parent=None, frame=None):
+        """
+        :param frame: the Frame of the function, the one of the parent for scopes not owning one
+        """
+        self.kind = kind
+        self.parent = parent
+        self.frame = frame or parent.frame
+        self.names = {}
+
+    def lookup(self, name):
+        """
+        :return: the slot of the variable, None when it isn't visible from the scope
+        """
+        scope = self
+        while scope:
+            slot = scope.names.get(name)
+            if slot is not None or scope.kind in FRAME_SCOPES:
+                return slot
+            scope = scope.parent
+        return None
+
+    def declare(self, name):
+        slot = self.frame.allocate()
+        self.names[name] = slot
+        return slot
+
+
+def _bind(node, slot, annotated):
+    try:
+        node.slot = slot
+    except AttributeError:  # read only views of opal.ast.compact
+        pass
+    return annotated
+
+
+class Resolver:
+
+    def __init__(self, entry='main'):
+        """
+        :param entry: name of the function running the top level statements, see CodeGenerator
+        """
+        self.scope = Scope(MODULE, frame=Frame(entry))
+        self.class_name = None
+
+        self.handlers = {
+            Assign: self.resolve_assign,
+            VarValue: self.resolve_var_value,
+            MethodCall: self.resolve_method_call,
+            For: self.resolve_for,
+            While: self.resolve_while,
+            Klass: self.resolve_klass,
+            Funktion: self.resolve_funktion,
+        }
+
+    def resolve(self, node):
+        """
+        Binds the variables of the node and its children, in the scope the previous nodes left
+        """
+        return trampoline(node, self.step)
+
+    def step(self, node):
+        for cls in node.__class__.__mro__:
+            handler = self.handlers.get(cls)
+            if handler:
+                return handler(node)
+        return self.resolve_children(node)
+
+    @staticmethod
+    def resolve_children(node):
+        for child in node.children():
+            yield child
+
+    def push(self, kind, frame=None):
+        self.scope = Scope(kind, self.scope, frame)
+
+    def pop(self):
+        self.scope = self.scope.parent
+
+    def where(self):
+        return self.scope.frame.name
+
+    def lookup(self, name):
+        slot = self.scope.lookup(name)
+        if slot is None:
+            raise ResolveError(f'Undefined variable {name} in {self.where()}')
+        return slot
+
+    def declare(self, name, what):
+        if self.scope.lookup(name) is not None:
+            raise ResolveError(f'{what} {name} shadows a variable of the same name in {self.where()}')
+        return self.scope.declare(name)
+
+    def resolve_assign(self, assign):
+        yield assign.rhs
+
+        name = assign.lhs.val
+        slot = self.scope.lookup(name)
+        if slot is None:
+            slot = self.scope.declare(name)
+        return _bind(assign.lhs, slot, assign)
+
+    def resolve_var_value(self, var):
+        return _bind(var, self.lookup(var.val), var)
+
+    def resolve_method_call(self, call):
+        for arg in call.args:
+            yield arg
+        return _bind(call, self.lookup(call.instance), call)
+
+    def resolve_for(self, for_):
+        yield for_.iterable
+
+        self.push(LOOP)
+        _bind(for_.var, self.declare(for_.var.val, 'Loop variable'), for_)
+        yield for_.body
+        self.pop()
+        return for_
+
+    def resolve_while(self, while_):
+        yield while_.cond
+
+        self.push(LOOP)
+        yield while_.body
+        self.pop()
+        return while_
+
+    def resolve_klass(self, klass):
+        self.push(CLASS)
+        self.class_name = klass.name
+        yield klass.body
+        self.class_name = None
+        self.pop()
+        return klass
+
+    def resolve_funktion(self, funktion):
+        self.push(METHOD, Frame(f'{self.class_name}::{funktion.name}'))
+        for param in funktion.params:
+            _bind(param, self.declare(param.name, 'Parameter'), param)
+
+        if funktion.body:
+            yield funktion.body
+        self.pop()
+        return funktion
+
+
+def resolve_names(program, entry='main'):
+    """
+    Binds the variables of the program, see Resolver
+    :raise ResolveError: when a variable is read undefined or shadows another one
+    """
+    return Resolver(entry).resolve(program)
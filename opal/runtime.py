@@ -0,0 +1,117 @@
+import glob
+import os
+import threading
+from hashlib import sha3_256
+from os import path
+
+# noinspection PyPackageRequirements
+from llvmlite import binding as llvm
+
+import opal
+
+RUNTIME_DIR = path.abspath(path.join(path.dirname(path.realpath(opal.__file__)), '../llvm_ir'))
+
+# pre-linked and pre-optimized runtime produced by `make convert_c_to_ir`, it supersedes the individual files
+RUNTIME_BITCODE = 'opal_runtime.bc'
+
+
+class RuntimeCache:
+    """
+    Keeps the CLib runtime (the IR files generated by `make convert_c_to_ir`) parsed, verified and linked
+    into a single module once per process. Every program gets a clone of it, which is much cheaper than
+    parsing the text again. The cached module is reloaded whenever the files on disk change.
+
+    Bitcode is preferred over textual IR: `opal_runtime.bc` alone when present, otherwise the `.bc` of
+    each CLib file, falling back to its `.ll`.
+    """
+
+    def __init__(self, directory=RUNTIME_DIR):
+        self.directory = directory
+        self._module = None
+        self._signature = None
+        self._digest = None
+        self._digest_signature = None
+        self._lock = threading.Lock()
+
+    def _files(self):
+        blob = path.join(self.directory, RUNTIME_BITCODE)
+        if path.exists(blob):
+            return [blob]
+
+        files = {}
+        for file in sorted(glob.glob(path.join(self.directory, '*.ll'))):
+            files[path.splitext(file)[0]] = file
+        for file in sorted(glob.glob(path.join(self.directory, '*.bc'))):
+            files[path.splitext(file)[0]] = file
+
+        return [files[stem] for stem in sorted(files)]
+
+    def _signature_of(self, files):
+        signature = []
+        for file in files:
+            stat = os.stat(file)
+            signature.append((file, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def _load(self, files):
+        runtime = llvm.parse_assembly('')
+        for file in files:
+            module_ref = _parse_file(file)
+            module_ref.verify()
+            runtime.link_in(module_ref)
+        return runtime
+
+    def get(self):
+        """
+        :return: a copy of the runtime module, owned by the caller (it can be linked in or added to an engine)
+        """
+        with self._lock:
+            files = self._files()
+            signature = self._signature_of(files)
+
+            if signature != self._signature:
+                self._module = self._load(files)
+                self._signature = signature
+
+            return self._module.clone()
+
+    def digest(self):
+        """
+        :return: a hash of the contents of the runtime files, without parsing them
+        """
+        with self._lock:
+            files = self._files()
+            signature = self._signature_of(files)
+
+            if signature != self._digest_signature:
+                m = sha3_256()
+                for file in files:
+                    with open(file, 'rb') as f:
+                        m.update(f.read())
+                self._digest = m.hexdigest()
+                self._digest_signature = signature
+
+            return self._digest
+
+    def invalidate(self):
+        with self._lock:
+            self._module = None
+            self._signature = None
+            self._digest = None
+            self._digest_signature = None
+
+
+def _parse_file(file):
+    if file.endswith('.bc'):
+        with open(file, 'rb') as f:
+            return llvm.parse_bitcode(f.read())
+
+    with open(file, 'r') as f:
+        return llvm.parse_assembly(f.read())
+
+
+runtime_cache = RuntimeCache()
+
+
+def get_runtime():
+    return runtime_cache.get()
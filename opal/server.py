@@ -0,0 +1,204 @@
+"""
+Compile server: a daemon keeping the parser, LLVM, the runtime and the target machine warm, that compiles and runs
+programs sent to it over a Unix domain socket. Clients skip importing and initializing all of it.
+
+    python -m opal.server &
+    python -m opal.client program.opal
+
+Each connection is served by a fork of the daemon, which inherits everything it has warmed up, and each program
+runs in a fork of its own, so one exiting or crashing takes nothing else down and its output can be captured.
+Compiled objects are shared through the on disk opal.cache.ObjectCache. See opal.client for the protocol.
+"""
+import argparse
+import json
+import os
+import socketserver
+import sys
+import tempfile
+import time
+import traceback
+from ctypes import CDLL
+from os import path
+
+from opal.cache import DEFAULT_CACHE_DIR, ObjectCache, get_compiler_digest
+from opal.client import Client, get_socket_path, receive_message, send_message
+from opal.evaluator import OpalEvaluator
+from opal.runtime import runtime_cache
+
+_libc = CDLL(None)
+
+
+class ServerError(Exception):
+    pass
+
+
+def _evaluate_in_child(code, opt_level, size_level, cache, stdout, stderr, report_file):
+    """
+    Runs in the forked process, never returns
+    """
+    status = 0
+    try:
+        os.dup2(stdout.fileno(), 1)
+        os.dup2(stderr.fileno(), 2)
+        # they may have been replaced, by pytest for one
+        sys.stdout = open(1, 'w', closefd=False)
+        sys.stderr = open(2, 'w', closefd=False)
+
+        report = OpalEvaluator(opt_level, size_level, cache=cache).evaluate(code, report=True)
+        report_file.write(report.to_json().encode('utf-8'))
+        report_file.flush()
+    except SystemExit as e:
+        status = e.code if isinstance(e.code, int) else 1
+    except BaseException:
+        traceback.print_exc()
+        status = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            _libc.fflush(None)
+        finally:
+            os._exit(status)
+
+
+def evaluate_isolated(code, opt_level=0, size_level=0, cache=None):
+    """
+    Compiles and runs the program in a child process
+    :return: (exit status, stdout, stderr, report as a dict or None). The status is minus the signal number
+    when the program got killed by one, as with subprocess
+    """
+    with tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr, \
+            tempfile.TemporaryFile() as report_file:
+        pid = os.fork()
+        if not pid:  # pragma: no cover
+            _evaluate_in_child(code, opt_level, size_level, cache, stdout, stderr, report_file)
+
+        _, status = os.waitpid(pid, 0)
+        status = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+
+        outputs = []
+        for file in (stdout, stderr, report_file):
+            file.seek(0)
+            outputs.append(file.read().decode('utf-8', 'replace'))
+
+    out, err, report = outputs
+    return status, out, err, report and json.loads(report) or None
+
+
+def check_request(request):
+    """
+    :return: what's wrong with a request for a program, None when it's valid
+    """
+    if not isinstance(request, dict):
+        return 'a request is a JSON object'
+    if not isinstance(request.get('code'), str):
+        return 'code is missing or not a string'
+    for level in ('opt_level', 'size_level'):
+        if not isinstance(request.get(level, 0), int):
+            return f'{level} is not an integer'
+    return None
+
+
+class RequestHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        start = time.perf_counter()
+        request = receive_message(self.request)
+
+        if isinstance(request, dict) and request.get('command') == 'ping':
+            return send_message(self.request, {'status': 0})
+
+        error = check_request(request)
+        if error:
+            return send_message(self.request, {
+                'status': 1,
+                'stdout': '',
+                'stderr': f'Invalid request: {error}\n',
+                'report': None,
+                'time': time.perf_counter() - start,
+            })
+
+        status, out, err, report = evaluate_isolated(request['code'], request.get('opt_level', 0),
+                                                     request.get('size_level', 0), self.server.cache)
+
+        send_message(self.request, {
+            'status': status,
+            'stdout': out,
+            'stderr': err,
+            'report': report,
+            'time': time.perf_counter() - start,
+        })
+
+
+class OpalServer(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+    """
+        with OpalServer(socket_path) as server:
+            server.serve_forever()
+    """
+
+    def __init__(self, socket_path=None, cache=None):
+        """
+        :param cache: opal.cache.ObjectCache shared by the programs, none by default
+        """
+        self.socket_path = get_socket_path(socket_path)
+        self.cache = cache
+
+        self.warm_up()
+
+        os.makedirs(path.dirname(path.abspath(self.socket_path)), exist_ok=True)
+        self._remove_stale_socket()
+
+        super().__init__(self.socket_path, RequestHandler)
+        os.chmod(self.socket_path, 0o600)
+
+    def warm_up(self):
+        """
+        Does once, in the daemon, what every program would otherwise pay for
+        """
+        # initializes LLVM, builds the target machine and loads the runtime
+        OpalEvaluator().evaluate('print(0)', run=False)
+
+        if self.cache:
+            get_compiler_digest()
+            runtime_cache.digest()
+
+    def _remove_stale_socket(self):
+        if not path.exists(self.socket_path):
+            return
+
+        if Client(self.socket_path, timeout=5).ping():
+            raise ServerError(f'A server is already listening on {self.socket_path}')
+
+        os.unlink(self.socket_path)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+
+def get_arg_parser():
+    arg_parser = argparse.ArgumentParser(prog='opal serve', description='Opal compile server')
+    arg_parser.add_argument('--socket', help='Unix socket (default: $OPAL_SOCKET or ~/.cache/opal/opal.sock)')
+    arg_parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='object cache (default: %(default)s)')
+    arg_parser.add_argument('--no-cache', action='store_true', help='compiles every program')
+    return arg_parser
+
+
+def main(argv=None):
+    args = get_arg_parser().parse_args(argv)
+    cache = not args.no_cache and ObjectCache(args.cache_dir) or None
+
+    with OpalServer(args.socket, cache) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Static types of Opal expressions, inferred ahead of code generation by opal.inference and kept by every node in its
+`static_type`. The scalar ones are singletons, compared by identity.
+"""
+# noinspection PyPackageRequirements
+from llvmlite import ir
+
+from opal.ast.types import Bool, Float, Integer, List
+
+
+class StaticType:
+    __slots__ = ()
+
+    def as_llvm(self, context):
+        """
+        :param context: llvmlite.ir.Context of the module, where classes are identified types
+        :return: the LLVM type of the values of the type, None when it's told by the values themselves
+        """
+        raise NotImplementedError
+
+
+class ScalarType(StaticType):
+    __slots__ = ('name', '_llvm_type')
+
+    def __init__(self, name, llvm_type=None):
+        self.name = name
+        self._llvm_type = llvm_type
+
+    def __repr__(self):
+        return self.name
+
+    def __reduce__(self):
+        # the singleton of the module, also once unpickled
+        return self.name
+
+    def as_llvm(self, context=None):
+        return self._llvm_type
+
+
+INT = ScalarType('INT', Integer.as_llvm())
+FLOAT = ScalarType('FLOAT', Float.as_llvm())
+BOOL = ScalarType('BOOL', Bool.as_llvm())
+# constant strings are arrays of their own length
+STRING = ScalarType('STRING')
+VOID = ScalarType('VOID', ir.VoidType())
+UNKNOWN = ScalarType('UNKNOWN')
+
+# elements of the lists stored unboxed, see opal.ast.types.List
+UNBOXED_TYPES = (INT, FLOAT, BOOL)
+
+# type names of parameters and return types
+TYPE_NAMES = {
+    'int': INT,
+    'Cint32': INT,
+    'float': FLOAT,
+    'bool': BOOL,
+    'string': STRING,
+}
+
+
+class ListType(StaticType):
+    __slots__ = ('element',)
+
+    def __init__(self, element=UNKNOWN):
+        self.element = element
+
+    def __eq__(self, o):
+        return isinstance(o, ListType) and self.element == o.element
+
+    def __hash__(self):
+        return hash((ListType, self.element))
+
+    def __repr__(self):
+        return f'[{self.element!r}]'
+
+    def __reduce__(self):
+        return ListType, (self.element,)
+
+    @property
+    def unboxed(self):
+        return self.element in UNBOXED_TYPES
+
+    def as_llvm(self, context=None):
+        return List.as_llvm_of(self.unboxed and self.element.as_llvm() or None).as_pointer()
+
+
+class ClassType(StaticType):
+    """
+    Instances of the class of that name
+    """
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __eq__(self, o):
+        return isinstance(o, ClassType) and self.name == o.name
+
+    def __hash__(self):
+        return hash((ClassType, self.name))
+
+    def __repr__(self):
+        return self.name
+
+    def __reduce__(self):
+        return ClassType, (self.name,)
+
+    def as_llvm(self, context):
+        return context.get_identified_type(self.name).as_pointer()
+
+
+LIST_TYPES = {List.as_llvm_of(typ.as_llvm()): ListType(typ) for typ in UNBOXED_TYPES}
+LIST_TYPES[List.as_llvm()] = ListType()
+
+
+def type_of_value(value):
+    """
+    :param value: llvmlite.ir.Value
+    :return: the static type told by the LLVM type of a value, for the nodes that weren't inferred
+    """
+    typ = value.type
+    if typ == Integer.as_llvm():
+        return INT
+    if typ == Float.as_llvm():
+        return FLOAT
+    if typ == Bool.as_llvm():
+        return BOOL
+    if isinstance(typ, ir.PointerType):
+        if typ.pointee in LIST_TYPES:
+            return LIST_TYPES[typ.pointee]
+        if isinstance(typ.pointee, ir.IdentifiedStructType):
+            return ClassType(typ.pointee.name)
+        if isinstance(typ.pointee, ir.ArrayType) or typ.pointee == ir.IntType(8):
+            return STRING
+    return UNKNOWN
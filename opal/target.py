@@ -0,0 +1,105 @@
+import os
+import threading
+
+# noinspection PyPackageRequirements
+from llvmlite import binding as llvm
+
+# set them (e.g. OPAL_TARGET_CPU=generic and OPAL_TARGET_FEATURES='') for builds reproducible on other hosts
+CPU_ENV = 'OPAL_TARGET_CPU'
+FEATURES_ENV = 'OPAL_TARGET_FEATURES'
+
+JIT = ('default', 'jitdefault')
+AOT = ('pic', 'default')
+
+_initialized = False
+_host = None
+_target_machines = {}
+_lock = threading.Lock()
+_initialize_lock = threading.Lock()
+
+
+def initialize_llvm():
+    """
+    Initializes LLVM, the native target and its asm printer, once per process
+    """
+    global _initialized
+
+    if _initialized:
+        return
+
+    with _initialize_lock:
+        if not _initialized:
+            llvm.initialize()
+            llvm.initialize_native_target()
+            llvm.initialize_native_asmprinter()
+            _initialized = True
+
+
+def get_host():
+    """
+    :return: (cpu, features) of the host, detected once per process
+    """
+    global _host
+
+    if _host is None:
+        try:
+            features = llvm.get_host_cpu_features().flatten()
+        except RuntimeError:  # pragma: no cover
+            features = ''
+        _host = (llvm.get_host_cpu_name(), features)
+
+    return _host
+
+
+def get_target_options(cpu=None, features=None):
+    """
+    :return: (cpu, features) to generate code for: the arguments if given, then the environment, then the host
+    """
+    host_cpu, host_features = get_host()
+
+    if cpu is None:
+        cpu = os.environ.get(CPU_ENV, host_cpu)
+
+    if features is None:
+        features = os.environ.get(FEATURES_ENV, host_features)
+
+    return cpu, features
+
+
+def create_target_machine(cpu=None, features=None, opt=2, kind=JIT):
+    """
+    Builds a new target machine. Execution engines take ownership of (and dispose) the one they are created with,
+    so they must be given their own
+    :param kind: JIT or AOT, the relocation and code models to use
+    """
+    initialize_llvm()
+    cpu, features = get_target_options(cpu, features)
+    reloc, codemodel = kind
+
+    target = llvm.Target.from_default_triple()
+    return target.create_target_machine(cpu=cpu, features=features, opt=opt, reloc=reloc, codemodel=codemodel)
+
+
+def get_target_machine(cpu=None, features=None, opt=2, kind=JIT):
+    """
+    Target machines built once per process for each set of options and shared by the JIT and the AOT compiler to
+    optimize modules, set their data layout and emit object code. Don't give them to an execution engine.
+    """
+    key = get_target_options(cpu, features) + (opt, kind)
+
+    with _lock:
+        target_machine = _target_machines.get(key)
+        if target_machine is None:
+            target_machine = create_target_machine(cpu, features, opt, kind)
+            _target_machines[key] = target_machine
+
+    return target_machine
+
+
+def set_target(module, target_machine):
+    """
+    Sets the triple and data layout of a llvmlite.binding.ModuleRef, so the optimizer can reason about the target
+    """
+    module.triple = target_machine.triple
+    module.data_layout = str(target_machine.target_data)
+    return module
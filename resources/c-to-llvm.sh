@@ -4,4 +4,5 @@
 origin=$1
 
 clang -emit-llvm -S "$origin" -o ${origin/.c/.ll}
+clang -emit-llvm -c "$origin" -o ${origin/.c/.bc}
 #opt -fsanitize=undefined -mem2reg -S "$fname".ll -O3 -o "$fname"-opt.ll
@@ -1,6 +1,5 @@
-from opal.codegen import CodeGenerator
+from opal.codegen import CodeGenerator, CodegenError
 from opal.evaluator import OpalEvaluator
-from resources.llvmex import CodegenError
 from tests.helpers import get_representation, parse
 
 
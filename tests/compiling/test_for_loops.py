@@ -170,3 +170,17 @@ class TestForLoopsExecution:
         out.should.contain('5')
         out.should.contain('out')
         out.should_not.contain('never here')
+
+    def test_iterates_over_floats(self, evaluator):
+        expr = f"""
+        total = 0.0
+        for item in [0.5, 1.25, 2.0]
+            total = total + item
+        end
+        print(total)
+        """
+
+        with pipes() as (out, _):
+            evaluator.evaluate(expr)
+
+        out.read().should.equal('3.75\n')
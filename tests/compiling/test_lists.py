@@ -1,7 +1,18 @@
 from wurlitzer import pipes
 
+from opal.server import evaluate_isolated
 from tests.helpers import get_representation, parse
 
+# an unnamed value of the generated IR, whatever its number
+VALUE = r'%"\.\d+"'
+
+
+def main_of(evaluator):
+    """
+    :return: the IR of the entry function only, the runtime linked with it has calls of its own
+    """
+    return str(evaluator.codegen.module.get_global('main'))
+
 
 class TestListSyntax:
     def test_assigns_lists(self):
@@ -86,10 +97,20 @@ class TestListExecution:
 
         evaluator.evaluate(expr, run=False)
 
-        str(evaluator.llvm_mod).should.contain('call void @vector_init({ i32, i32, i8** }* %.2)')
-        str(evaluator.llvm_mod).should.contain('call void @vector_append({ i32, i32, i8** }* %.2, i8* %.4)')
-        str(evaluator.llvm_mod).should.contain('call void @vector_append({ i32, i32, i8** }* %.2, i8* %.6)')
-        str(evaluator.llvm_mod).should.contain('call void @vector_append({ i32, i32, i8** }* %.2, i8* %.8)')
+        main = main_of(evaluator)
+        main.should.match(rf'{VALUE} = alloca {{i32, i32, i32\*}}')
+        main.should.match(rf'{VALUE} = bitcast i8\* {VALUE} to i32\*')
+        main.should.match(rf'store i32 3, i32\* {VALUE}')
+        main.should_not.contain('@"vector_append"')
+
+    def test_boxes_items_of_unknown_types_into_vectors(self, evaluator):
+        expr = f"""
+        []
+        """
+
+        evaluator.evaluate(expr, run=False)
+
+        main_of(evaluator).should.match(rf'call void @"vector_init"\({{i32, i32, i8\*\*}}\* {VALUE}\)')
 
     def test_supports_access_by_index(self, evaluator):
         expr = f"""
@@ -98,7 +119,9 @@ class TestListExecution:
 
         evaluator.evaluate(expr, run=False)
 
-        str(evaluator.llvm_mod).should.contain('call i8* @vector_get({ i32, i32, i8** }* %.2, i32 4)')
+        main = main_of(evaluator)
+        main.should.match(rf'{VALUE} = getelementptr inbounds i32, i32\* {VALUE}, i32 4\n  {VALUE} = load i32, i32\* ')
+        main.should_not.contain('@"vector_get"')
 
     def test_items_can_be_printed(self, evaluator):
         expr = f"""
@@ -125,6 +148,27 @@ class TestListExecution:
 
         out.should.contain('234')
 
+    def test_holds_floats_and_bools(self, evaluator):
+        expr = f"""
+        floats = [1.5, 2.25]
+        bools = [false, true]
+        print(floats[1])
+        if bools[1]
+            print(1)
+        end
+        """
+
+        with pipes() as (out, _):
+            evaluator.evaluate(expr)
+
+        out.read().should.equal('2.25\n1\n')
+
+    def test_checks_indices_are_in_bounds(self):
+        status, out, _, _ = evaluate_isolated('l = [1.5]\nprint(l[3])')
+
+        status.should.equal(1)
+        out.should.equal('Index 3 out of bounds for vector of size 1\n')
+
     # def test_supports_items_of_different_types(self, evaluator):
     #     expr = f"""
     #     h_list = ["aba", 200, true]
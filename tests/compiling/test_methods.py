@@ -341,3 +341,25 @@ class TestTypeMethodExecution:
 
         out.should.contain('42')
 
+
+class TestClassRegistries:
+    def test_index_classes_methods_and_vtables_by_name(self):
+        codegen = CodeGenerator()
+        codegen.generate_code("""
+class Object
+end
+
+class Answer < Object
+    def forty_two()
+        return 42
+    end
+end
+""")
+        answer = codegen.get_klass_by_name('Answer')
+
+        answer.name.should.equal('Answer')
+        codegen.get_klass_by_name('Bogus').should.be.none
+        codegen.get_method('Answer::forty_two').should.be(codegen.module.get_global('Answer::forty_two'))
+        codegen.get_vtable('Answer').should.be(codegen.module.get_global('Answer_vtable'))
+        codegen.get_vtable('Answer').initializer.constant[0].constant.should.equal(
+            codegen.get_vtable('Object').get_reference())
@@ -3,9 +3,12 @@ from llvmlite import ir
 from opal.ast.binop import BinaryOp, GreaterThan, GreaterThanEqual, \
     LessThan, LessThanEqual, Equals, Unequals, Comparison, Arithmetic, Mul, Div, Add, Sub
 from opal.ast.statements import Print
-from opal.ast.types import Integer, Float, String, Int8
-from opal.ast import LogicError
+from opal.ast.types import Integer, Float, String, Int8, Klass
+from opal.ast import LogicError, deserialize, node_bytes, serialize, slot_names, walk
 from opal.ast.program import Program, Block
+from opal.ast.visitor import ASTVisitor
+from opal.parser import parse_program
+from opal.plugin import Plugin
 from tests.helpers import parse
 
 
@@ -269,6 +272,24 @@ class TestComparisonNodes:
     def test_handles_unsupported_aliases(self):
         BinaryOp.by_aka('foo').should.be.equal(None)
 
+    def test_are_found_as_the_subclasses_replacing_them(self):
+        class Operation(metaclass=Plugin):
+            op = None
+            alias = None
+
+        class Plus(Operation):
+            op = '+'
+            alias = 'add'
+
+        Operation.by('+').should.be(Plus)
+
+        class CheckedPlus(Plus):
+            pass
+
+        Operation.by('+').should.be(CheckedPlus)
+        Operation.by_aka('add').should.be(CheckedPlus)
+        BinaryOp.by('+').should.be(Add)
+
 
 class TestArithmeticNodes:
     # noinspection PyStatementEffect
@@ -291,4 +312,55 @@ class TestBinaryOperationNodes:
         add.__eq__.when.called_with(v1).should.throw(LogicError, expected_message)
 
 
+class TestSerializing:
+    def test_rebuilds_the_tree(self):
+        prog = parse('x = [1, 2.5]\nif x[0] > 1\n  print("a")\nelse\n  print(true)\nend')
+
+        (loaded,) = deserialize(serialize(prog))
+
+        loaded.should_not.be(prog)
+        loaded.dump().should.equal(prog.dump())
+
+    def test_keeps_nodes_shared_by_the_trees(self):
+        visitor = ASTVisitor()
+        prog = parse_program('class Object\nend\nclass Foo\n  def bar()\n    return 1\n  end\nend', visitor)
+
+        loaded, classes = deserialize(serialize(prog, visitor.classes))
+
+        classes[1].should.be(loaded.block.statements[1])
+        classes[1].functions[0].should.be(classes[1].body.statements[0])
+
+    def test_works_for_trees_deeper_than_the_recursion_limit(self):
+        prog = parse('x = ' + ' + '.join(['1'] * 5000))
+
+        (loaded,) = deserialize(serialize(prog))
+
+        sum(1 for _ in walk(loaded)).should.equal(sum(1 for _ in walk(prog)))
+
+
+class TestSlots:
+    CODE = 'class Object\nend\nclass Foo\n  def int bar(a)\n    return 1\n  end\nend\nfoo = Foo()\nx = foo.bar()\n' \
+           'for i in [1, 2.5, "s", true]\n  while i < 2\n    print(i * 2)\n  end\nend\nif x > 1\n  print(l[0])\nend'
+
+    def test_nodes_have_no_dict(self):
+        nodes = list(walk(parse_program(self.CODE, ASTVisitor())))
+
+        [node for node in nodes if hasattr(node, '__dict__')].should.be.empty
+        len({node.__class__ for node in nodes}).should.be.greater_than(15)
+
+    def test_fields_include_the_slots_of_the_bases(self):
+        slot_names(Add).should.equal(('static_type', 'lhs', 'rhs'))
+        dict(Integer(3).fields()).should.equal({'val': 3})
+
+    def test_children_come_from_the_slots(self):
+        klass = Klass('Foo', Block(Integer(1)))
+
+        list(klass.children()).should.equal([klass.body])
+        list(Add(Integer(1), Integer(2)).children()).should.equal([Integer(1), Integer(2)])
+
+    def test_take_less_than_half_the_memory_of_nodes_with_a_dict(self):
+        program = parse_program('i = 0\nwhile i < 10\n    i = i + 1 * 2\nend\nprint(i)\n' * 100, ASTVisitor())
+        sizes = [node_bytes(node) for node in walk(program)]
 
+        # 184 bytes per node with a __dict__
+        (sum(sizes) / len(sizes)).should.be.lower_than(92)
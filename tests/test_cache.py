@@ -0,0 +1,168 @@
+import os
+from os import path
+
+from wurlitzer import pipes
+
+from opal.ast.visitor import ASTVisitor
+from opal.cache import ASTCache, ObjectCache, cache_key
+from opal.evaluator import OpalEvaluator
+from opal.parser import parse_program
+
+PROGRAM = """
+total = 0
+for i in [1, 2, 3]
+    total = total + i
+end
+print(total)
+"""
+
+
+def touch(file, mtime):
+    os.utime(file, (mtime, mtime))
+
+
+class TestCacheKey:
+    def test_is_stable(self):
+        cache_key('print(1)', 2).should.equal(cache_key('print(1)', 2))
+
+    def test_depends_on_every_part(self):
+        cache_key('print(1)', 2).should_not.equal(cache_key('print(1)', 3))
+        cache_key('print(1)', 2).should_not.equal(cache_key('print(12)'))
+
+
+class TestObjectCache:
+    def test_stores_and_loads_objects(self, tmpdir):
+        cache = ObjectCache(str(tmpdir))
+
+        cache.store('key', b'object code')
+
+        cache.load('key').should.equal(b'object code')
+        ('key' in cache).should.be.true
+
+    def test_misses_return_none(self, tmpdir):
+        cache = ObjectCache(str(tmpdir))
+
+        cache.load('key').should.be.none
+        ('key' in cache).should.be.false
+
+    def test_evicts_the_least_recently_used_entries(self, tmpdir):
+        cache = ObjectCache(str(tmpdir), max_size=20)
+
+        cache.store('first', b'0123456789')
+        touch(str(tmpdir.join('first.o')), 1000)
+        cache.store('second', b'0123456789')
+        touch(str(tmpdir.join('second.o')), 2000)
+
+        cache.load('first')
+        cache.store('third', b'0123456789')
+
+        ('first' in cache).should.be.true
+        ('second' in cache).should.be.false
+        ('third' in cache).should.be.true
+        cache.size().should.equal(20)
+
+    def test_leaves_no_temporary_files_behind(self, tmpdir):
+        cache = ObjectCache(str(tmpdir))
+
+        cache.store('key', b'object code')
+
+        sorted(os.listdir(str(tmpdir))).should.equal(['.lock', 'key.o'])
+
+
+class TestEvaluatorCache:
+    def test_stores_compiled_programs(self, tmpdir):
+        cache = ObjectCache(str(tmpdir))
+
+        ev = OpalEvaluator(cache=cache)
+        with pipes() as (out, _):
+            ev.evaluate(PROGRAM)
+
+        out.read().should.equal('6\n')
+        len(cache.entries()).should.equal(1)
+
+    def test_runs_cached_programs_without_compiling_them(self, tmpdir, mocker):
+        cache = ObjectCache(str(tmpdir))
+        OpalEvaluator(cache=cache).evaluate(PROGRAM)
+
+        ev = OpalEvaluator(cache=cache)
+        generate_code = mocker.spy(ev.codegen, 'generate_code')
+        with pipes() as (out, _):
+            ev.evaluate(PROGRAM)
+
+        out.read().should.equal('6\n')
+        generate_code.call_count.should.equal(0)
+
+    def test_keys_depend_on_the_opt_level(self, tmpdir):
+        cache = ObjectCache(str(tmpdir))
+
+        OpalEvaluator(cache=cache).evaluate(PROGRAM)
+        OpalEvaluator(cache=cache, opt_level=2).evaluate(PROGRAM)
+
+        len(cache.entries()).should.equal(2)
+
+    def test_does_not_store_programs_that_are_not_run(self, tmpdir):
+        cache = ObjectCache(str(tmpdir))
+
+        OpalEvaluator(cache=cache).evaluate(PROGRAM, run=False)
+
+        cache.entries().should.be.empty
+
+
+def store_program(cache, code=PROGRAM):
+    visitor = ASTVisitor()
+    program = parse_program(code, visitor)
+    cache.store(code, program, visitor.classes)
+    return program
+
+
+class TestASTCache:
+    def test_stores_and_loads_programs(self):
+        cache = ASTCache()
+        program = store_program(cache)
+
+        loaded, classes = cache.load(PROGRAM)
+
+        loaded.dump().should.equal(program.dump())
+        classes.should.equal([])
+        cache.load('print(1)').should.be.none
+
+    def test_gives_every_hit_its_own_tree(self):
+        cache = ASTCache()
+        store_program(cache)
+
+        cache.load(PROGRAM)[0].should_not.be(cache.load(PROGRAM)[0])
+
+    def test_evicts_the_least_recently_used_programs(self):
+        cache = ASTCache(max_entries=2)
+        store_program(cache, 'print(1)')
+        store_program(cache, 'print(2)')
+        cache.load('print(1)')
+
+        store_program(cache, 'print(3)')
+
+        len(cache.entries).should.equal(2)
+        cache.load('print(2)').should.be.none
+        cache.load('print(1)').should_not.be.none
+
+    def test_shares_programs_through_the_disk(self, tmpdir):
+        store_program(ASTCache(directory=str(tmpdir)))
+
+        cache = ASTCache(directory=str(tmpdir))
+
+        cache.load(PROGRAM).should_not.be.none
+        len(cache.entries).should.equal(1)
+        [path.basename(file) for _, _, file in cache.disk.entries()].should.equal([f'{cache.key(PROGRAM)}.ast'])
+
+
+class TestEvaluatorASTCache:
+    def test_compiles_programs_again_without_parsing_them(self, mocker):
+        cache = ASTCache()
+        OpalEvaluator(ast_cache=cache).evaluate(PROGRAM, run=False)
+
+        parse = mocker.patch('opal.parser.parse_program')
+        with pipes() as (out, _):
+            report = OpalEvaluator(opt_level=2, ast_cache=cache).evaluate(PROGRAM, report=True)
+
+        out.read().should.equal('6\n')
+        parse.call_count.should.equal(0)
+        [phase.name for phase in report.phases].should.contain('ast_cache_lookup')
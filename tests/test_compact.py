@@ -0,0 +1,111 @@
+import io
+
+import pytest
+
+from opal.ast.binop import Add, BinaryOp
+from opal.ast.types import Integer
+from opal.ast.compact import REF_KIND, CompactTree, view_class
+from opal.ast.program import Program
+from opal.ast.visitor import ASTVisitor
+from opal.codegen import CodeGenerator
+from opal.interpreter import Interpreter
+from opal.parser import parse_compact, parse_program
+from tests.test_stream import PROGRAM
+
+
+def parse(code):
+    visitor = ASTVisitor()
+    program = parse_program(code, visitor)
+    return program, visitor.classes
+
+
+def generate(program, classes):
+    codegen = CodeGenerator()
+    codegen.generate(program, classes)
+    return str(codegen.module)
+
+
+class TestCompactTree:
+    def test_views_are_instances_of_the_node_classes(self):
+        program, classes = parse('a = 1 + 2\nprint(a)')
+        view, _ = CompactTree.from_ast(program, classes).program()
+
+        view.__class__.should.equal(Program)
+        isinstance(view, Program).should.be.true
+        isinstance(view.block.statements[0].rhs, Add).should.be.true
+        view.block.statements[0].rhs.rhs.val.should.equal(2)
+
+    def test_dumps_like_the_nodes(self):
+        program, classes = parse('a = 1 + 2\nwhile a < 10\n    a = a * 2\nend\nprint(a)')
+        view, _ = CompactTree.from_ast(program, classes).program()
+        view.dump().should.equal(program.dump())
+
+    def test_generates_the_same_code_as_the_nodes(self):
+        program, classes = parse(PROGRAM)
+        view, view_classes = CompactTree.from_ast(program, classes).program()
+        generate(view, view_classes).should.equal(generate(*parse(PROGRAM)))
+
+    def test_runs_in_the_interpreter(self):
+        program, classes = parse('total = 0\nfor x in [1, 2, 3]\n    total = total + x\nend\nprint(total)')
+        view, _ = CompactTree.from_ast(program, classes).program()
+
+        output = []
+        Interpreter(output.append).run(view)
+        ''.join(output).should.equal('6\n')
+
+    def test_stores_nodes_held_twice_once(self):
+        program, classes = parse(PROGRAM)
+        tree = CompactTree.from_ast(program, classes)
+        _, (_, answer) = tree.program()
+
+        REF_KIND.should.be.within(tree.kinds)
+        answer.functions[0].index.should.equal(answer.body.statements[0].index)
+
+    def test_shares_the_attributes_of_equal_nodes(self):
+        program, classes = parse('a = 1\nb = 1\nc = a + b\nd = a + b')
+        tree = CompactTree.from_ast(program, classes)
+
+        len(tree.pool).should.be.lower_than(len(tree) / 2)
+        tree.nbytes().should.equal(len(tree) * 17)
+
+    def test_materializes_equal_nodes(self):
+        program, classes = parse('a = 1\nb = [a, 2]\nprint(b)')
+        tree = CompactTree.from_ast(program, classes)
+
+        tree.materialize().should.equal(program)
+        tree.node(0).should.equal(program)
+        tree.materialize().dump().should.equal(program.dump())
+
+    def test_views_are_read_only(self):
+        program, classes = parse('a = 1')
+        view, _ = CompactTree.from_ast(program, classes).program()
+        setattr.when.called_with(view, 'block', None).should.throw(AttributeError)
+
+    def test_leaves_the_operators_registry_alone(self):
+        view_class(Add)
+        view_class(Integer)
+        BinaryOp.by('+').should.be(Add)
+
+
+class TestParseCompact:
+    @pytest.mark.parametrize('min_lines', [1, 7, 200])
+    def test_generates_the_same_code_as_parse_program(self, min_lines):
+        program, classes = parse_compact(io.StringIO(PROGRAM), min_lines).program()
+        generate(program, classes).should.equal(generate(*parse(PROGRAM)))
+
+    def test_keeps_the_offset_of_the_statements(self):
+        tree = parse_compact(io.StringIO(PROGRAM), 1)
+        statements = tree.node(0).block.statements
+
+        for statement in statements:
+            start = tree.offsets[statement.index]
+            PROGRAM[start:].startswith(('class', 'total', 'i =', 'while', 'print', 'answer', 'n =', 'for')) \
+                .should.be.true
+        tree.offsets[0].should.equal(-1)
+        PROGRAM[tree.offsets[statements[-1].index]:].should.equal('for x in [1, 2, 3]\n    print(x)\nend\n')
+
+    def test_appends_the_statements_of_each_chunk_to_the_program(self):
+        tree = parse_compact(['a = 1\n', 'b = 2\n', 'print(a + b)\n'], 1)
+
+        len(tree.node(0).block.statements).should.equal(3)
+        tree.node(0).dump().should.equal(parse('a = 1\nb = 2\nprint(a + b)')[0].dump())
@@ -2,8 +2,8 @@ import re
 
 from wurlitzer import pipes
 
-from opal.codegen import CodeGenerator
-from opal.evaluator import OpalEvaluator
+from opal.codegen import CodeGenerator, CodegenError
+from opal.evaluator import OpalEvaluator, OpalSession
 
 
 def get_string_name(string):
@@ -425,3 +425,121 @@ class TestRegression:
         ev = OpalEvaluator()
 
         ev.evaluate(expr)
+
+
+class TestSession:
+    def test_runs_consecutive_programs(self):
+        with OpalSession() as session:
+            with pipes() as (out, _):
+                session.evaluate('print(4)')
+                session.evaluate('print(2)')
+
+            out = out.read()
+
+        out.should.equal('4\n2\n')
+
+    def test_reuses_classes_from_previous_programs(self):
+        classes = """
+        class Object
+        end
+
+        class MyClass
+            def say_42()
+                return 42
+            end
+        end
+        """
+
+        expr = """
+        mc = MyClass()
+        forty_two = mc.say_42()
+        print(forty_two)
+        """
+
+        with OpalSession() as session:
+            session.evaluate(classes, run=False)
+
+            with pipes() as (out, _):
+                session.evaluate(expr)
+
+            out = out.read()
+
+            str(session.codegen).should.contain('declare i32 @"MyClass::say_42"(%"MyClass"* %".1")')
+            str(session.codegen).should_not.contain('define i32 @"MyClass::say_42"')
+
+        out.should.contain('42')
+
+    def test_supports_inheriting_from_previous_programs(self):
+        with OpalSession() as session:
+            session.evaluate("""
+            class Object
+            end
+            """, run=False)
+
+            session.evaluate("""
+            class Foo
+            end
+            foo = Foo()
+            """)
+
+            str(session.codegen).should.contain('@"Object_vtable" = external constant %"Object_vtable_type"')
+
+    def test_does_not_allow_redefining_classes(self):
+        with OpalSession() as session:
+            session.evaluate("""
+            class Object
+            end
+            """, run=False)
+
+            session.evaluate.when.called_with("""
+            class Object
+            end
+            """).should.throw(CodegenError, 'Class Object already defined')
+
+
+class TestOptimization:
+    def test_leaves_the_ir_untouched_by_default(self):
+        ev = OpalEvaluator()
+        ev.evaluate('alpha = 1', run=False)
+        str(ev.llvm_mod).should.contain('%alpha = alloca i32')
+
+    def test_promotes_variables_to_registers(self):
+        ev = OpalEvaluator(opt_level=2)
+        ev.evaluate("""
+        alpha = 1
+        beta = alpha + 41
+        print(beta)
+        """, run=False)
+        str(ev.llvm_mod).should_not.contain('alloca i32')
+
+    def test_keeps_the_program_output(self):
+        expr = """
+        total = 0
+        for i in [1, 2, 3, 4]
+            total = total + i
+        end
+        print(total)
+        while total > 0
+            total = total - 3
+        end
+        print(total)
+        """
+
+        for opt_level, size_level in [(0, 0), (1, 0), (2, 0), (3, 0), (2, 1), (2, 2)]:
+            ev = OpalEvaluator(opt_level=opt_level, size_level=size_level)
+
+            with pipes() as (out, _):
+                ev.evaluate(expr)
+
+            out.read().should.equal('10\n-2\n')
+
+    def test_works_for_sessions(self):
+        with OpalSession(opt_level=3) as session:
+            with pipes() as (out, _):
+                session.evaluate('alpha = 4\nprint(alpha * 10 + 2)')
+
+            out = out.read()
+
+            str(session.llvm_mod).should_not.contain('alloca i32')
+
+        out.should.equal('42\n')
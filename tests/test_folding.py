@@ -0,0 +1,92 @@
+from wurlitzer import pipes
+
+from opal.ast.visitor import ASTVisitor
+from opal.codegen import CodeGenerator
+from opal.evaluator import OpalEvaluator
+from opal.folding import fold_constants
+from opal.parser import parse_program
+
+CLASSES = """
+class Object
+end
+
+class Answer < Object
+    def forty_two()
+        x = a
+        return x
+    end
+end
+"""
+
+
+def fold(code):
+    program = parse_program(code, ASTVisitor())
+    folded = fold_constants(program)
+    return [stmt.dump() for stmt in program.block.statements], folded
+
+
+def folded(code):
+    return fold(code)[0]
+
+
+def run(code):
+    with pipes() as (out, _):
+        OpalEvaluator().evaluate(code)
+    return out.read()
+
+
+class TestConstantFolding:
+    def test_folds_arithmetic(self):
+        fold('3 + 4 * 6 + (4 / 2)').should.equal((['(Integer 29)'], 4))
+        folded('1.5 * 2.0\n2.5 - 0.5').should.equal(['(Float 3.0)', '(Float 2.0)'])
+
+    def test_folds_as_the_generated_code_computes(self):
+        folded('2147483647 + 1\n(0 - 7) / 2').should.equal(['(Integer -2147483648)', '(Integer -3)'])
+
+    def test_leaves_what_the_generated_code_does_not_define(self):
+        folded('1 / 0\n3.0 / 2.0\n1 + 2.5').should.equal(['(/ 1 0)', '(/ 3.0 2.0)', '(+ 1 2.5)'])
+
+    def test_folds_comparisons(self):
+        folded('1 < 2\n2.5 >= 3.0\n4 == (2 + 2)').should.equal(['(Bool true)', '(Bool false)', '(Bool true)'])
+
+    def test_propagates_variables_assigned_once(self):
+        folded('a = 2\nb = a * 3\nprint(b)').should.equal(['(= a 2)', '(= b 6)', '(Print (Integer 6))'])
+
+    def test_does_not_propagate_variables_assigned_again(self):
+        folded('i = 0\ni = i + 1\nprint(i)').should.equal(['(= i 0)', '(= i (+ i 1))', '(Print (VarValue i))'])
+        folded('for i in [1, 2]\n    print(i)\nend\ni = 3\nprint(i)')[-1].should.equal('(Print (VarValue i))')
+
+    def test_does_not_propagate_into_reads_before_the_assignment(self):
+        folded('while true\n    print(a)\n    a = 1\n    print(a)\nend').should.equal(
+            ['While((Bool true)) (Block\n  (Print (VarValue a))\n(= a 1)\n(Print (Integer 1)))'])
+
+    def test_does_not_propagate_into_methods(self):
+        program = parse_program('a = 1\n' + CLASSES, ASTVisitor())
+        fold_constants(program)
+
+        program.block.statements[-1].dump().should.contain('(= x a)')
+
+    def test_prunes_branches_known_at_compile_time(self):
+        folded('if 1 > 2\n    print(1)\nelse\n    print(2)\n    print(3)\nend').should.equal(
+            ['(Print (Integer 2))', '(Print (Integer 3))'])
+        folded('if false\n    print(1)\nend\nwhile 0\n    print(2)\nend\nprint(3)').should.equal(
+            ['(Print (Integer 3))'])
+
+    def test_keeps_branches_tied_to_their_blocks(self):
+        folded('while true\n    if true\n        break\n    end\nend').should.equal(
+            ['While((Bool true)) (Block\n  If((Bool true)) Then((Block\n  Break))))'])
+
+
+class TestFoldedCodegen:
+    def test_generates_no_code_for_constants(self):
+        codegen = CodeGenerator()
+        codegen.generate_code('a = 3 + 4 * 6\nif a > 20\n    print(a - 1)\nend')
+
+        main = str(codegen.module.get_global('main'))
+        main.should_not.contain('add i32')
+        main.should_not.contain('icmp')
+        main.should_not.contain('if.start')
+
+    def test_folded_programs_run_as_before(self):
+        run('x = 2147483647\nprint(x + 1)\nprint((0 - 7) / 2)\nprint(1.5 * 2.0)\nif 2.5 < 1.0\n    print(1)\n'
+            'else\n    print(0)\nend').should.equal('-2147483648\n-3\n3\n0\n')
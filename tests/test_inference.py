@@ -0,0 +1,111 @@
+from wurlitzer import pipes
+
+from opal.ast import deserialize, serialize, walk
+from opal.ast.compact import CompactTree
+from opal.ast.visitor import ASTVisitor
+from opal.codegen import CodeGenerator
+from opal.evaluator import OpalEvaluator
+from opal.inference import infer_types
+from opal.parser import parse_program
+from opal.static_types import BOOL, FLOAT, INT, STRING, UNKNOWN, VOID, ClassType, ListType
+
+CLASSES = """
+class Object
+end
+
+class Answer < Object
+    def forty_two()
+        x = 42
+        return x
+    end
+end
+"""
+
+
+def infer(code):
+    visitor = ASTVisitor()
+    program = parse_program(code, visitor)
+    infer_types(program, visitor.classes)
+    return program, visitor.classes
+
+
+def types_of(code):
+    program, _ = infer(code)
+    return [stmt.static_type for stmt in program.block.statements]
+
+
+class TestTypeInference:
+    def test_types_literals_and_operations(self):
+        types_of('1\n2.5\ntrue\n"s"\n1 + 2\n1.5 * 2.0\n1 < 2\n1 + 2.5') \
+            .should.equal([INT, FLOAT, BOOL, STRING, INT, FLOAT, BOOL, UNKNOWN])
+
+    def test_variables_have_the_type_of_their_first_assignment(self):
+        program, _ = infer('a = 1\nb = a * 2\nprint(b)\nc = 2.5')
+        assign, other, print_, _ = program.block.statements
+
+        assign.lhs.static_type.should.be(INT)
+        other.rhs.lhs.static_type.should.be(INT)
+        print_.val.static_type.should.be(INT)
+        types_of('a = 1\nb = a * 2\nprint(b)\nc = 2.5').should.equal([INT, INT, VOID, FLOAT])
+
+    def test_types_lists_by_their_elements(self):
+        types_of('[1, 2]\n[1, 2.5]\n[]\nl = [1, 2]\nl[0]').should.equal(
+            [ListType(INT), ListType(UNKNOWN), ListType(UNKNOWN), ListType(INT), INT])
+
+    def test_types_loop_variables(self):
+        program, _ = infer('for x in [1, 2]\n    y = x + 1\nend')
+        loop = program.block.statements[0]
+
+        loop.var.static_type.should.be(INT)
+        loop.body.statements[0].static_type.should.be(INT)
+
+        program, _ = infer('for x in [1.5, 2.5]\n    y = x\nend\nl = [true]\nb = l[0]')
+        program.block.statements[0].var.static_type.should.be(FLOAT)
+        program.block.statements[2].static_type.should.be(BOOL)
+
+    def test_types_instances_and_method_calls(self):
+        program, classes = infer(CLASSES + 'answer = Answer()\nn = answer.forty_two()')
+        *_, instance, call = program.block.statements
+
+        instance.static_type.should.equal(ClassType('Answer'))
+        call.static_type.should.be(INT)
+        classes[1].functions[0].static_type.should.be(INT)
+
+    def test_types_calls_to_classes_defined_later(self):
+        program, _ = infer('answer = Answer()\nn = answer.forty_two()' + CLASSES)
+        program.block.statements[1].static_type.should.be(INT)
+
+    def test_annotates_every_node(self):
+        program, _ = infer(CLASSES + 'l = [1, 2]\nfor i in l\n    if i > 1\n        print(i * 2)\n    end\nend\n'
+                                     'while false\n    break\nend\nanswer = Answer()\nn = answer.forty_two()\nprint(n)')
+
+        [node for node in walk(program) if getattr(node, 'static_type', None) is None].should.be.empty
+
+    def test_types_are_serialized_with_the_nodes(self):
+        program, classes = infer('a = [1]\nb = a[0] + 2')
+        copy, _ = deserialize(serialize(program, classes))
+
+        [stmt.static_type for stmt in copy.block.statements].should.equal([ListType(INT), INT])
+        copy.block.statements[1].static_type.should.be(INT)
+
+    def test_views_keep_the_types_of_the_nodes(self):
+        program, classes = infer('a = 1.5')
+        view, _ = CompactTree.from_ast(program, classes).program()
+
+        view.block.statements[0].static_type.should.be(FLOAT)
+
+
+class TestTypedCodegen:
+    def test_generates_assigned_expressions_once(self):
+        codegen = CodeGenerator()
+        codegen.generate_code(CLASSES + 'answer = Answer()\nn = answer.forty_two()\nm = n * 2')
+
+        main = str(codegen.module.get_global('main'))
+        main.count('call i32 @"Answer::forty_two"').should.equal(1)
+        main.count('mul i32').should.equal(1)
+
+    def test_methods_return_the_type_of_their_returned_value(self):
+        with pipes() as (out, _):
+            OpalEvaluator().evaluate(CLASSES + 'answer = Answer()\nn = answer.forty_two()\nprint(n)')
+
+        out.read().should.equal('42\n')
@@ -0,0 +1,192 @@
+import pytest
+from wurlitzer import pipes
+
+from opal.evaluator import OpalEvaluator, TieredEvaluator
+from opal.interpreter import Interpreter, Uninterpretable, check, sdiv, wrap
+from tests.helpers import parse
+
+PROGRAMS = [
+    """
+    print(1 + 2)
+    print(2147483647 + 1)
+    print(-7 / 2)
+    print(3 * -4)
+    print(1.5 + 2.25)
+    print(2.0 >= 3.0)
+    print("hello")
+    print(true)
+    """,
+    """
+    i = 0
+    total = 0
+    while i < 100
+        total = total + i * i
+        i = i + 1
+    end
+    print(total)
+    print(i)
+    """,
+    """
+    l = [1, 2, 3, 4]
+    for x in l
+        if x > 2
+            print(x)
+        else
+            print(0 - x)
+        end
+    end
+    print(l[2])
+    """,
+    """
+    i = 0
+    while i < 10
+        i = i + 1
+        if i == 3
+            continue
+        end
+        print(i)
+    end
+    """,
+    """
+    n = 0
+    for x in [5, 6, 7]
+        j = 0
+        while j < x
+            n = n + j
+            j = j + 1
+        end
+        break
+    end
+    print(n)
+    s = "abc"
+    s = "xyz"
+    print(s)
+    """,
+]
+
+
+def compiled_output(code):
+    with pipes() as (out, _):
+        OpalEvaluator().evaluate(code)
+    return out.read()
+
+
+def tiered_output(code, **kwargs):
+    evaluator = TieredEvaluator(**kwargs)
+    with pipes() as (out, _):
+        evaluator.evaluate(code)
+    evaluator.close()
+    return out.read(), evaluator.tier
+
+
+class TestInterpreter:
+    @pytest.mark.parametrize('code', PROGRAMS)
+    def test_prints_what_the_compiled_program_prints(self, code):
+        output, tier = tiered_output(code)
+
+        tier.should.equal(TieredEvaluator.INTERPRETED)
+        output.should.equal(compiled_output(code))
+
+    def test_ints_wrap_around_and_divisions_round_towards_zero(self):
+        wrap(2147483647 + 1).should.equal(-2147483648)
+        wrap(-2147483648 - 1).should.equal(2147483647)
+        sdiv(-7, 2).should.equal(-3)
+        sdiv(7, -2).should.equal(-3)
+
+    def test_exits_when_indexing_out_of_bounds(self):
+        output = []
+        interpreter = Interpreter(output.append)
+
+        interpreter.run.when.called_with(parse('l = [1]\nprint(l[3])\n')).should.throw(SystemExit)
+        output.should.equal(['Index 3 out of bounds for vector of size 1\n'])
+
+    def test_returns_the_rest_of_the_program_when_a_loop_gets_hot(self):
+        program = parse('i = 0\nwhile i < 10\ni = i + 1\nend\nprint(i)\n')
+
+        rest = Interpreter([].append, loop_threshold=4).run(program)
+
+        rest.dump().should.equal(parse('i = 4\nwhile i < 10\ni = i + 1\nend\nprint(i)\n').dump())
+
+
+class TestChecker:
+    def test_lists_top_level_variables(self):
+        check(parse('a = 1\nif a > 0\nb = 2\nend\nc = 3.0\n')).should.equal(['a', 'c'])
+
+    @pytest.mark.parametrize('code', [
+        'class Foo\nend\n',
+        'a = 1\nb = a\n',
+        'print(1 + 1.0)\n',
+        'print(1.0 / 2.0)\n',
+        'a = 1\na = 1.0\n',
+        'if true\na = 1\nend\nprint(a)\n',
+        'i = 0\nwhile i < 1\nif true\nbreak\nend\nend\n',
+        'while 1\nend\n',
+        'print([1, 2])\n',
+        'z = 0\nz = 0\nprint(5 / z)\n',
+        'print(5 / 0)\n',
+    ])
+    def test_leaves_to_the_jit_what_it_cant_interpret_exactly(self, code):
+        check.when.called_with(parse(code)).should.throw(Uninterpretable)
+
+
+class TestTieredEvaluator:
+    def test_promotes_hot_loops(self):
+        code = PROGRAMS[1]
+        output, tier = tiered_output(code, loop_threshold=10)
+
+        tier.should.equal(TieredEvaluator.PROMOTED)
+        output.should.equal(compiled_output(code))
+
+    def test_promotes_hot_for_loops(self):
+        code = PROGRAMS[2]
+        output, tier = tiered_output(code, loop_threshold=2)
+
+        tier.should.equal(TieredEvaluator.PROMOTED)
+        output.should.equal(compiled_output(code))
+
+    def test_compiles_programs_run_more_than_threshold_times(self):
+        evaluator = TieredEvaluator(threshold=1)
+        tiers = []
+
+        with pipes() as (out, _):
+            for _ in range(3):
+                evaluator.evaluate('print(42)')
+                tiers.append(evaluator.tier)
+        evaluator.close()
+
+        tiers.should.equal([TieredEvaluator.INTERPRETED, TieredEvaluator.COMPILED, TieredEvaluator.COMPILED])
+        out.read().should.equal('42\n' * 3)
+        len(evaluator.programs).should.equal(0)
+
+    def test_compiles_what_it_cant_interpret(self):
+        code = 'class Object\nend\nclass Foo\nend\nfoo = Foo()\nprint("done")\n'
+        output, tier = tiered_output(code)
+
+        tier.should.equal(TieredEvaluator.COMPILED)
+        output.should.equal('done\n')
+
+    def test_compiles_divisions_the_compiled_code_may_trap_on(self):
+        _, tier = tiered_output('z = 1\nz = 2\nprint(5 / z)\n')
+
+        tier.should.equal(TieredEvaluator.COMPILED)
+
+    def test_keeps_counting_runs_of_the_last_max_programs_sources(self):
+        evaluator = TieredEvaluator(max_programs=2)
+
+        with pipes():
+            for code in ['print(1)', 'print(2)', 'print(3)', 'print(3)', 'print(3)']:
+                evaluator.evaluate(code)
+
+        list(evaluator.runs).should.equal(['print(2)'])
+        list(evaluator.programs).should.equal(['print(3)'])
+        evaluator.close()
+
+    def test_keeps_output_in_order_across_tiers(self):
+        evaluator = TieredEvaluator(threshold=1)
+
+        with pipes() as (out, _):
+            for code in ['print(1)', 'print(1)', 'print(2)', 'print(1)']:
+                evaluator.evaluate(code)
+        evaluator.close()
+
+        out.read().should.equal('1\n1\n2\n1\n')
@@ -1,5 +1,9 @@
 # from lark.tree import pydot__tree_to_png  # Just a neat utility function
 # pydot__tree_to_png(self.get_parser().parse(expr), "opal-grammar.png")
+import pytest
+
+from opal import parser as parser_module
+from opal.parser import EARLEY, LALR, LazyParser, Parser
 from tests.helpers import get_representation
 
 
@@ -240,3 +244,63 @@ class TestSpecialCases:
         repres = get_representation(expr)
 
         repres.should.equal('program block boolean false')
+
+
+class TestLALRGrammar:
+    earley = Parser(EARLEY)
+    lalr = Parser(LALR)
+
+    @pytest.mark.parametrize('expr', [
+        '1 < 2 + 3',
+        '1 - 2 < 3 - 4 == 5',
+        'x = (1 + 2) * 3 / -4',
+        'if a > 1\n  print(a)\nelse\n  print("no")\nend',
+        'if a\nend',
+        'while i < 10\n  i = i + 1\n  if i == 5\n    break\n  end\n  continue\nend',
+        'for x in [1, 2]\n  print(x)\nend',
+        'for x in l\n  print(l[0][1])\nend',
+        'class Foo < Bar\n  def :init(a::int, b)\n  end\n  def int get()\n    return 42\n  end\nend',
+        'foo = Foo(1, a)\nfoo.bar()\nx = foo.get()',
+        '\n\n  x = [1, y]  \n\n  print([1][0])\n',
+    ])
+    def test_builds_the_same_trees_as_earley(self, expr):
+        self.lalr.parse(expr).should.equal(self.earley.parse(expr))
+
+
+class TestParserCache:
+    @pytest.mark.parametrize('algorithm', [LALR, EARLEY])
+    def test_loads_the_tables_it_saved(self, tmpdir, algorithm):
+        expr = 'while i < 10\n  i = i + 1\n  if i == 5\n    break\n  end\nend'
+        built = Parser(algorithm, cache_dir=str(tmpdir))
+
+        tmpdir.listdir().should.have.length_of(1)
+
+        loaded = Parser(algorithm, cache_dir=str(tmpdir))
+        loaded.lark.should_not.be(built.lark)
+        loaded.parse(expr).should.equal(Parser(algorithm, cache_dir=None).parse(expr))
+
+    def test_regenerates_the_tables_when_the_grammar_changes(self, tmpdir, monkeypatch):
+        Parser(LALR, cache_dir=str(tmpdir))
+        grammar = parser_module._get_grammar(parser_module.GRAMMARS[LALR])
+        monkeypatch.setattr(parser_module, '_get_grammar', lambda file_name: f'{grammar}\n// changed\n')
+
+        Parser(LALR, cache_dir=str(tmpdir)).parse('print(1)')
+
+        tmpdir.listdir().should.have.length_of(2)
+
+    def test_rebuilds_corrupt_tables(self, tmpdir):
+        cache_file = Parser(LALR, cache_dir=str(tmpdir)).cache_file
+        with open(cache_file, 'wb') as f:
+            f.write(b'garbage')
+
+        Parser(LALR, cache_dir=str(tmpdir)).parse('print(1)').data.should.equal('program')
+        with open(cache_file, 'rb') as f:
+            f.read().should_not.equal(b'garbage')
+
+    def test_module_parser_is_created_on_first_use(self, monkeypatch):
+        monkeypatch.setattr(parser_module, '_parsers', {})
+        lazy = LazyParser()
+
+        parser_module._parsers.should.be.empty
+        lazy.parse('print(1)').data.should.equal('program')
+        parser_module._parsers.should.have.key((LALR, False))
@@ -0,0 +1,116 @@
+import ctypes
+
+import pytest
+from wurlitzer import pipes
+
+from opal.ast.statements import Import
+from opal.cache import BITCODE_EXTENSION, ASTCache, ObjectCache
+from opal.codegen import CodegenError
+from opal.evaluator import OpalEvaluator
+from opal.modules import ModuleCompiler, ModuleError, find_imports, resolve
+from opal.opalc import EMIT_SHARED, compile_file
+from opal.report import CompileReport
+from tests.test_parser import parse
+
+MODULES = {
+    'base.opal': 'class Object\nend\nprint(1)\n',
+    'geometry/shapes.opal': 'import base\n\nclass Square < Object\n    def area()\n        return 16\n    end\nend\n'
+                            'print(2)\n',
+    'util.opal': 'import base\nprint(3)\n',
+}
+
+PROGRAM = """import geometry.shapes
+import util
+
+square = Square()
+area = square.area()
+print(area)
+"""
+
+
+@pytest.fixture
+def library(tmpdir):
+    for name, source in MODULES.items():
+        tmpdir.join('lib', name).write(source, ensure=True)
+    return str(tmpdir.join('lib'))
+
+
+def run(library_path):
+    with pipes() as (out, _):
+        ctypes.CDLL(library_path).main().should.equal(0)
+    return out.read()
+
+
+class TestImports:
+    def test_parses_module_names(self):
+        parse('import util\nimport geometry.shapes').should.equal([Import('util'), Import('geometry.shapes')])
+
+    def test_finds_the_imports_of_a_source(self):
+        find_imports(PROGRAM.splitlines()).should.equal(['geometry.shapes', 'util'])
+        find_imports(['important = 1\n', 'import util\n', '  import util\n']).should.equal(['util'])
+
+    def test_resolves_modules_after_their_imports(self, library):
+        modules = resolve(['geometry.shapes', 'util'], [library])
+
+        list(modules).should.equal(['base', 'geometry.shapes', 'util'])
+        modules['geometry.shapes'].imports.should.equal(['base'])
+
+    def test_reports_missing_modules(self, library):
+        resolve.when.called_with(['missing'], [library]).should.throw(ModuleError, 'Module missing not found')
+
+    def test_reports_circular_imports(self, tmpdir):
+        tmpdir.join('a.opal').write('import b\n')
+        tmpdir.join('b.opal').write('import a\n')
+
+        resolve.when.called_with(['a'], [str(tmpdir)]).should.throw(ModuleError, 'Circular import: a -> b -> a')
+
+
+class TestModuleCompiler:
+    @pytest.mark.parametrize('jobs', [1, 2])
+    def test_compiles_programs_with_their_modules(self, tmpdir, library, jobs):
+        source = tmpdir.join('program.opal')
+        source.write(PROGRAM)
+
+        output = compile_file(str(source), emit=EMIT_SHARED, search_path=[library], jobs=jobs)
+
+        # base runs once, for the first module importing it
+        run(output).should.equal('1\n2\n3\n16\n')
+
+    def test_compiles_cached_modules_once(self, tmpdir, library):
+        cache = ObjectCache(str(tmpdir.join('cache')), extension=BITCODE_EXTENSION)
+        ast_cache = ASTCache()
+
+        report = CompileReport()
+        ModuleCompiler([library], cache, ast_cache, jobs=1).compile(['util', 'geometry.shapes'], report)
+        report.counters['modules'].should.equal(3)
+        report.counters['modules_compiled'].should.equal(3)
+
+        report = CompileReport()
+        modules = ModuleCompiler([library], cache, ASTCache(), jobs=1).compile(['geometry.shapes'], report)
+        report.counters['modules_compiled'].should.equal(0)
+        [klass.name for module in modules for klass in module.classes].should.equal(['Object', 'Square'])
+
+    def test_compiles_modules_again_when_their_imports_change(self, tmpdir, library):
+        cache = ObjectCache(str(tmpdir.join('cache')), extension=BITCODE_EXTENSION)
+        ModuleCompiler([library], cache, jobs=1).compile(['util'])
+
+        tmpdir.join('lib', 'base.opal').write('class Object\nend\nprint(4)\n')
+
+        report = CompileReport()
+        ModuleCompiler([library], cache, jobs=1).compile(['util'], report)
+        report.counters['modules_compiled'].should.equal(2)
+
+    def test_evaluates_programs_importing_modules(self, library):
+        evaluator = OpalEvaluator(modules=ModuleCompiler([library], jobs=1))
+
+        with pipes() as (out, _):
+            evaluator.evaluate(PROGRAM)
+
+        out.read().should.equal('1\n2\n3\n16\n')
+
+    def test_reports_classes_of_modules_defined_again(self, library):
+        evaluator = OpalEvaluator(modules=ModuleCompiler([library], jobs=1))
+
+        evaluator.evaluate.when.called_with(
+            'import geometry.shapes\nclass Square < Object\n    def area()\n        return 4\n    end\nend\n') \
+            .should.throw(CodegenError, 'Class Square already defined')
@@ -0,0 +1,92 @@
+import sys
+
+from wurlitzer import pipes
+
+from opal.ast.visitor import ASTVisitor
+from opal.codegen import CodeGenerator
+from opal.evaluator import OpalEvaluator, TieredEvaluator
+from opal.parser import parse_program, parser
+
+# assigned twice, its value isn't known at compile time and every operation on it is generated
+ONE = 'one = 0\none = 1\n'
+
+
+def chain(terms):
+    return ONE + 'x = one' + ' + 1' * (terms - 1) + '\nprint(x)'
+
+
+def nested_ifs(depth):
+    return ONE + 'if one > 0\n' * depth + 'print(one)\n' + 'end\n' * depth
+
+
+def evaluate(code):
+    """
+    :return: (the output of the program, the IR of its entry function)
+    """
+    evaluator = OpalEvaluator()
+    with pipes() as (out, _):
+        evaluator.evaluate(code)
+    return out.read(), str(evaluator.codegen.module.get_global('main'))
+
+
+def calls(func, *args):
+    """
+    :return: the number of Python function calls made running func, a measure of its work that doesn't depend on
+    the load of the machine
+    """
+    count = 0
+
+    def trace(frame, event, arg):
+        nonlocal count
+        count += 1
+
+    previous = sys.gettrace()
+    sys.settrace(trace)
+    try:
+        func(*args)
+    finally:
+        sys.settrace(previous)
+    return count
+
+
+class TestDeepNesting:
+    def test_compiles_expressions_100k_terms_deep(self):
+        output, main = evaluate(chain(100000))
+
+        output.should.equal('100000\n')
+        # none folded away
+        main.count('add i32').should.be.greater_than_or_equal_to(100000 - 1)
+
+    def test_generates_and_dumps_expressions_in_linear_work(self):
+        work = []
+        for terms in (10000, 40000):
+            visitor = ASTVisitor()
+            program = parse_program(chain(terms), visitor)
+            work.append(calls(program.dump) + calls(CodeGenerator().generate, program, visitor.classes))
+
+        # four times the terms, linear would be 4
+        (work[1] / work[0]).should.be.lower_than(4.5)
+
+    def test_compiles_deeply_nested_blocks(self):
+        output, main = evaluate(nested_ifs(5 * sys.getrecursionlimit()))
+
+        output.should.equal('1\n')
+        main.count('icmp').should.equal(5 * sys.getrecursionlimit())
+
+    def test_transforms_and_dumps_deep_trees(self):
+        code = chain(5 * sys.getrecursionlimit())
+
+        inline = parse_program(code, ASTVisitor()).dump()
+
+        inline.should.equal(ASTVisitor().transform(parser.parse(code)).dump())
+        inline.count('(+ ').should.equal(5 * sys.getrecursionlimit() - 1)
+
+    def test_tiered_evaluator_compiles_what_is_too_deep_to_interpret(self):
+        evaluator = TieredEvaluator()
+
+        with pipes() as (out, _):
+            evaluator.evaluate(chain(5 * sys.getrecursionlimit()))
+        evaluator.close()
+
+        evaluator.tier.should.equal(TieredEvaluator.COMPILED)
+        out.read().should.equal(f'{5 * sys.getrecursionlimit()}\n')
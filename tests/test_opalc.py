@@ -0,0 +1,80 @@
+import ctypes
+import subprocess
+
+from wurlitzer import pipes
+
+from opal.opalc import main, compile_file, EMIT_OBJECT, EMIT_SHARED, EMIT_IR
+
+PROGRAM = """
+if 3 > 2
+    print("hello from opal")
+end
+"""
+
+
+def write_source(tmpdir, code=PROGRAM):
+    source = tmpdir.join('hello.opal')
+    source.write(code)
+    return str(source)
+
+
+class TestOpalc:
+    def test_emits_object_files(self, tmpdir):
+        output = compile_file(write_source(tmpdir), emit=EMIT_OBJECT)
+
+        output.should.equal(str(tmpdir.join('hello.o')))
+        open(output, 'rb').read(4).should.equal(b'\x7fELF')
+
+    def test_emits_ir_with_a_c_main(self, tmpdir):
+        output = compile_file(write_source(tmpdir), emit=EMIT_IR, opt_level=0)
+
+        ir = open(output).read()
+        ir.should.contain('define i32 @main()')
+        ir.should.contain('call void @opal_main()')
+
+    def test_builds_executables(self, tmpdir):
+        output = str(tmpdir.join('hello'))
+
+        main([write_source(tmpdir), '-o', output, '-O3']).should.equal(0)
+
+        result = subprocess.run([output], stdout=subprocess.PIPE)
+        result.returncode.should.equal(0)
+        result.stdout.should.equal(b'hello from opal\n')
+
+    def test_builds_shared_libraries_exposing_main(self, tmpdir):
+        output = compile_file(write_source(tmpdir), emit=EMIT_SHARED)
+
+        library = ctypes.CDLL(output)
+        with pipes() as (out, _):
+            library.main().should.equal(0)
+
+        out.read().should.equal('hello from opal\n')
+
+    def test_reports_link_errors(self, tmpdir):
+        source = write_source(tmpdir)
+
+        main([source, '--link-arg=-lopal_does_not_exist']).should.equal(1)
+
+    def test_reports_undefined_variables(self, tmpdir, capsys):
+        main([write_source(tmpdir, 'print(x)\n')]).should.equal(1)
+
+        capsys.readouterr().err.should.equal('Undefined variable x in opal_main\n')
+
+    def test_reports_compile_errors(self, tmpdir, capsys):
+        main([write_source(tmpdir, 'class Foo < Bogus\nend\n')]).should.equal(1)
+        capsys.readouterr().err.should.equal('Parent class Bogus not defined\n')
+
+        main([write_source(tmpdir, 'print(1\n')]).should.equal(1)
+        capsys.readouterr().err.should.contain('Unexpected')
+
+    def test_reports_invalid_modules(self, tmpdir, capsys, mocker):
+        mocker.patch('llvmlite.binding.module.ModuleRef.verify',
+                     side_effect=RuntimeError('Instruction does not dominate all uses!'))
+
+        main([write_source(tmpdir)]).should.equal(1)
+        capsys.readouterr().err.should.equal('Instruction does not dominate all uses!\n')
+
+    def test_lets_other_errors_through(self, tmpdir, mocker):
+        mocker.patch('llvmlite.binding.module.ModuleRef.verify', side_effect=RecursionError('too deep'))
+
+        main.when.called_with([write_source(tmpdir)]).should.throw(RecursionError, 'too deep')
@@ -1,8 +1,21 @@
+import pytest
+
 from opal.ast.visitor import ASTVisitor
 from opal.ast.binop import Mul, Div, Add, Sub
+from opal.ast.program import Program
 from opal.ast.statements import Print
 from opal.ast.types import Integer, Float, String
-from opal.parser import parser
+from opal.parser import EARLEY, LALR, Parser, parse_program, parser
+
+PROGRAMS = [
+    '1 - 2 < 3 - 4 == 5\nx = (1 + 2) * 3 / -4.5\nprint("hi")',
+    'if a > 1\n  print(a)\nelse\n  print(false)\nend',
+    'while i < 10\n  i = i + 1\n  if i == 5\n    break\n  end\n  continue\nend',
+    'for x in [1, 2]\n  print(l[0][1])\nend',
+    'class Object\nend\nclass Foo < Object\n  def :init(a::int, b)\n  end\n  def int get(c)\n    return 42\n  end\n'
+    'end\nfoo = Foo(1, a)\nfoo.bar()\nx = foo.get(2)',
+    'import geometry.shapes\nimport util\nprint(1)',
+]
 
 
 def parse(expr, only_statements=True):
@@ -94,3 +107,36 @@ class TestPrint:
     def test_expr_with_parenthesis(self):
         parse(f'print(2 / (3 - 1))').should.contain(Print(Div(Integer(2), Sub(Integer(3), Integer(1)))))
 
+
+
+class TestInlineParser:
+    @pytest.mark.parametrize('code', PROGRAMS)
+    def test_builds_the_same_ast_as_the_visitor(self, code):
+        inline_visitor, visitor = ASTVisitor(), ASTVisitor()
+
+        ast = parse_program(code, inline_visitor)
+
+        ast.should.be.a(Program)
+        ast.dump().should.equal(visitor.transform(parser.parse(code)).dump())
+        [klass.dump() for klass in inline_visitor.classes].should.equal([klass.dump() for klass in visitor.classes])
+
+    def test_gives_every_parse_its_own_visitor(self):
+        first, second = ASTVisitor(), ASTVisitor()
+
+        parse_program('class Object\nend', first)
+        parse_program('class Object\nend\nclass Foo\nend', second)
+
+        [klass.name for klass in first.classes].should.equal(['Object'])
+        [klass.name for klass in second.classes].should.equal(['Object', 'Foo'])
+
+    def test_tables_are_cached_apart_from_the_tree_building_ones(self, tmpdir):
+        Parser(LALR, cache_dir=str(tmpdir))
+        Parser(LALR, cache_dir=str(tmpdir), inline=True)
+
+        loaded = Parser(LALR, cache_dir=str(tmpdir), inline=True)
+
+        tmpdir.listdir().should.have.length_of(2)
+        loaded.parse(PROGRAMS[2]).dump().should.equal(parse_program(PROGRAMS[2], ASTVisitor()).dump())
+
+    def test_needs_lalr(self):
+        Parser.when.called_with(EARLEY, cache_dir=None, inline=True).should.throw(ValueError)
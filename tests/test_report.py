@@ -0,0 +1,127 @@
+import json
+
+from wurlitzer import pipes
+
+from opal.ast import walk
+from opal.evaluator import OpalEvaluator, OpalSession
+from opal.opalc import main
+from opal.report import CompileReport
+from tests.helpers import parse
+
+PROGRAM = """
+alpha = 40
+if alpha > 1
+    print(alpha + 2)
+end
+"""
+
+COMPILE_PHASES = ['parse', 'fold_constants', 'resolve_names', 'infer_types', 'classes_metadata', 'codegen',
+                  'print_module', 'parse_assembly', 'link_runtime', 'verify', 'optimize']
+
+
+def evaluate(expr, **kwargs):
+    with pipes():
+        return OpalEvaluator().evaluate(expr, **kwargs)
+
+
+class TestWalk:
+    def test_yields_every_node(self):
+        nodes = list(walk(parse('1 + 2 * 3')))
+
+        [node.__class__.__name__ for node in nodes].should.equal(
+            ['Program', 'Block', 'Add', 'Integer', 'Mul', 'Integer', 'Integer'])
+
+    def test_counts_class_functions_once(self):
+        prog = parse("""
+        class Foo
+            def bar()
+            end
+        end
+        """)
+
+        [node.__class__.__name__ for node in walk(prog)].count('Funktion').should.equal(2)
+
+
+class TestCompileReport:
+    def test_is_not_returned_by_default(self):
+        evaluate(PROGRAM).should.be.none
+
+    def test_has_every_phase(self):
+        report = evaluate(PROGRAM, report=True)
+
+        phases = [phase.name for phase in report.phases]
+        phases.should.equal(COMPILE_PHASES + ['create_engine', 'emit_machine_code', 'execute'])
+
+    def test_does_not_have_execution_phases_when_not_running(self):
+        report = evaluate(PROGRAM, report=True, run=False)
+
+        [phase.name for phase in report.phases].should.equal(COMPILE_PHASES)
+
+    def test_has_sizes(self):
+        report = evaluate(PROGRAM, report=True)
+
+        report.counters['source_bytes'].should.equal(len(PROGRAM))
+        report.counters['ast_nodes'].should.equal(sum(1 for _ in walk(parse(PROGRAM))))
+        report.counters['ir_functions'].should.equal(1)
+        # the condition is known, its branch is folded into the entry block, which follows the one of the allocas
+        report.counters['constants_folded'].should.equal(5)
+        report.counters['ir_blocks'].should.equal(3)
+        report.counters['ir_instructions'].should.be.greater_than(5)
+        report.counters['ir_bytes'].should.be.greater_than(0)
+        report.counters['object_bytes'].should.be.greater_than(0)
+
+    def test_phases_follow_each_other(self):
+        report = evaluate(PROGRAM, report=True)
+
+        for previous, phase in zip(report.phases, report.phases[1:]):
+            phase.start.should.be.greater_than_or_equal_to(previous.start + previous.duration)
+
+        report.total.should.equal(sum(phase.duration for phase in report.phases))
+
+    def test_exports_json(self):
+        report = evaluate(PROGRAM, report=True)
+
+        exported = json.loads(report.to_json())
+
+        list(exported['phases']).should.equal([phase.name for phase in report.phases])
+        exported['counters']['ast_nodes'].should.equal(report.counters['ast_nodes'])
+
+    def test_exports_chrome_traces(self, tmpdir):
+        report = evaluate(PROGRAM, report=True)
+        trace_file = str(tmpdir.join('trace.json'))
+
+        report.write_chrome_trace(trace_file)
+
+        events = json.load(open(trace_file))['traceEvents']
+        [event['name'] for event in events if event['ph'] == 'X'].should.equal(
+            [phase.name for phase in report.phases])
+        [event['args'] for event in events if event['ph'] == 'C'].should.equal([report.counters])
+
+    def test_works_for_sessions(self):
+        with OpalSession() as session, pipes():
+            report = session.evaluate(PROGRAM, report=True)
+
+        report.duration('execute').should.be.greater_than(0)
+
+    def test_is_written_by_opalc(self, tmpdir):
+        source = tmpdir.join('prog.opal')
+        source.write('print("hi")')
+        trace_file = str(tmpdir.join('trace.json'))
+
+        main([str(source), '--emit', 'obj', '--trace', trace_file]).should.equal(0)
+
+        events = json.load(open(trace_file))['traceEvents']
+        [event['name'] for event in events].should.contain('emit_machine_code')
+
+
+class TestPhase:
+    def test_is_recorded_even_on_errors(self):
+        report = CompileReport()
+
+        try:
+            with report.phase('failing'):
+                raise ValueError()
+        except ValueError:
+            pass
+
+        [phase.name for phase in report.phases].should.equal(['failing'])
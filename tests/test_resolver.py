@@ -0,0 +1,91 @@
+from wurlitzer import pipes
+
+from opal.ast.visitor import ASTVisitor
+from opal.codegen import CodeGenerator
+from opal.evaluator import OpalEvaluator
+from opal.parser import parse_program
+from opal.resolver import ResolveError, resolve_names
+
+CLASSES = """
+class Object
+end
+
+class Answer < Object
+    def forty_two()
+        x = 42
+        return x
+    end
+end
+"""
+
+
+def resolve(code):
+    program = parse_program(code, ASTVisitor())
+    resolve_names(program)
+    return program.block.statements
+
+
+def run(code):
+    with pipes() as (out, _):
+        OpalEvaluator().evaluate(code)
+    return out.read()
+
+
+class TestResolver:
+    def test_gives_variables_slots_in_order(self):
+        first, second, again, print_ = resolve('a = 1\nb = a\na = 3\nprint(b)')
+
+        [first.lhs.slot, second.lhs.slot, again.lhs.slot].should.equal([0, 1, 0])
+        second.rhs.slot.should.equal(0)
+        print_.val.slot.should.equal(1)
+
+    def test_gives_loop_variables_slots_of_their_own(self):
+        first, second = resolve('for x in [1]\n    y = x\nend\nfor x in [2]\n    y = x\nend')
+
+        [first.var.slot, first.body.statements[0].lhs.slot].should.equal([0, 1])
+        [second.var.slot, second.body.statements[0].lhs.slot].should.equal([2, 3])
+
+    def test_gives_methods_frames_of_their_own(self):
+        statements = resolve('a = 1\n' + CLASSES)
+        method = statements[-1].functions[0]
+
+        method.body.statements[0].lhs.slot.should.equal(0)
+
+    def test_reports_undefined_variables(self):
+        resolve.when.called_with('print(a)\na = 1').should.throw(ResolveError, 'Undefined variable a in main')
+        resolve.when.called_with('n = answer.forty_two()').should.throw(ResolveError, 'Undefined variable answer')
+
+    def test_reports_variables_read_after_their_loop(self):
+        resolve.when.called_with('for x in [1]\n    y = x\nend\nprint(y)').should.throw(
+            ResolveError, 'Undefined variable y in main')
+        resolve.when.called_with('while true\n    y = 1\nend\nprint(y)').should.throw(
+            ResolveError, 'Undefined variable y in main')
+
+    def test_reports_module_variables_read_by_methods(self):
+        resolve.when.called_with(CLASSES.replace('x = 42', 'x = a') + 'a = 1').should.throw(
+            ResolveError, 'Undefined variable a in Answer::forty_two')
+
+    def test_reports_shadowing(self):
+        resolve.when.called_with('x = 1\nfor x in [1]\nend').should.throw(
+            ResolveError, 'Loop variable x shadows a variable of the same name in main')
+        resolve.when.called_with('for x in [1]\n    for x in [2]\n    end\nend').should.throw(
+            ResolveError, 'Loop variable x shadows')
+
+
+class TestScopedCodegen:
+    def test_allocates_variables_in_the_entry_block(self):
+        codegen = CodeGenerator()
+        codegen.generate_code('i = 0\nwhile i < 3\n    y = i\n    i = i + 1\nend')
+
+        entry = codegen.module.get_global('main').blocks[0]
+        [instr.name for instr in entry.instructions if instr.opname == 'alloca'].should.equal(['y', 'i'])
+
+    def test_methods_and_the_program_have_variables_of_their_own(self):
+        run(CLASSES + 'x = 2.5\nanswer = Answer()\nn = answer.forty_two()\nprint(n)\nprint(x)').should.equal(
+            '42\n2.5\n')
+
+    def test_loops_have_variables_of_their_own(self):
+        run('for x in [1]\n    print(x)\nend\nfor x in [2.5]\n    print(x)\nend').should.equal('1\n2.5\n')
+
+    def test_variables_assigned_in_both_branches_are_read_after_them(self):
+        run('c = 0\nc = c + 1\nif c > 0\n    x = 1\nelse\n    x = 2\nend\nprint(x)').should.equal('1\n')
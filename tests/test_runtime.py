@@ -0,0 +1,100 @@
+import os
+
+from llvmlite import binding as llvm
+
+from opal.runtime import RuntimeCache, RUNTIME_BITCODE
+
+ANSWER_IR = """
+define i32 @answer() {
+  ret i32 42
+}
+"""
+
+QUESTION_IR = """
+define i32 @question() {
+  ret i32 6
+}
+"""
+
+
+def write(directory, name, content):
+    file = directory.join(name)
+    file.write(content)
+    return file
+
+
+def write_bitcode(directory, name, content):
+    file = directory.join(name)
+    file.write_binary(llvm.parse_assembly(content).as_bitcode())
+    return file
+
+
+class TestRuntimeCache:
+    def test_links_all_the_ir_files_into_one_module(self, tmpdir):
+        write(tmpdir, 'answer.ll', ANSWER_IR)
+        write(tmpdir, 'question.ll', QUESTION_IR)
+
+        runtime = RuntimeCache(str(tmpdir)).get()
+
+        runtime.get_function('answer').is_declaration.should.be.false
+        runtime.get_function('question').is_declaration.should.be.false
+
+    def test_parses_the_files_only_once(self, tmpdir, mocker):
+        write(tmpdir, 'answer.ll', ANSWER_IR)
+        cache = RuntimeCache(str(tmpdir))
+        parse_assembly = mocker.spy(llvm, 'parse_assembly')
+
+        cache.get()
+        cache.get()
+
+        parse_assembly.call_count.should.equal(2)
+
+    def test_returns_a_new_module_every_time(self, tmpdir):
+        write(tmpdir, 'answer.ll', ANSWER_IR)
+        cache = RuntimeCache(str(tmpdir))
+
+        program = llvm.parse_assembly('')
+        program.link_in(cache.get())
+
+        cache.get().get_function('answer').is_declaration.should.be.false
+
+    def test_reloads_when_a_file_changes(self, tmpdir):
+        file = write(tmpdir, 'answer.ll', ANSWER_IR)
+        cache = RuntimeCache(str(tmpdir))
+        cache.get()
+
+        file.write(ANSWER_IR + QUESTION_IR)
+        stat = os.stat(str(file))
+        os.utime(str(file), ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+        cache.get().get_function('question').is_declaration.should.be.false
+
+    def test_reloads_when_a_file_is_added(self, tmpdir):
+        write(tmpdir, 'answer.ll', ANSWER_IR)
+        cache = RuntimeCache(str(tmpdir))
+        cache.get()
+
+        write(tmpdir, 'question.ll', QUESTION_IR)
+
+        cache.get().get_function('question').is_declaration.should.be.false
+
+    def test_prefers_bitcode_over_ir(self, tmpdir, mocker):
+        write(tmpdir, 'answer.ll', ANSWER_IR)
+        write_bitcode(tmpdir, 'answer.bc', ANSWER_IR)
+        write(tmpdir, 'question.ll', QUESTION_IR)
+        parse_bitcode = mocker.spy(llvm, 'parse_bitcode')
+
+        runtime = RuntimeCache(str(tmpdir)).get()
+
+        parse_bitcode.call_count.should.equal(1)
+        runtime.get_function('answer').is_declaration.should.be.false
+        runtime.get_function('question').is_declaration.should.be.false
+
+    def test_only_loads_the_prelinked_runtime_when_present(self, tmpdir):
+        write(tmpdir, 'answer.ll', ANSWER_IR)
+        write_bitcode(tmpdir, RUNTIME_BITCODE, QUESTION_IR)
+
+        runtime = RuntimeCache(str(tmpdir)).get()
+
+        runtime.get_function('question').is_declaration.should.be.false
+        runtime.get_function.when.called_with('answer').should.throw(NameError)
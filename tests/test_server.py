@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+
+from opal.cache import ObjectCache
+from opal.client import Client, main
+from opal.server import OpalServer, ServerError, evaluate_isolated
+
+
+@pytest.fixture
+def server(tmpdir):
+    server = OpalServer(str(tmpdir.join('opal.sock')), cache=ObjectCache(str(tmpdir.join('cache'))))
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05})
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    thread.join()
+    server.server_close()
+
+
+class TestEvaluateIsolated:
+    def test_captures_the_output(self):
+        status, out, err, report = evaluate_isolated('print(42)\nprint("hello")')
+
+        status.should.equal(0)
+        out.should.equal('42\nhello\n')
+        err.should.equal('')
+        report['phases'].should.contain('execute')
+
+    def test_returns_the_exit_status_of_the_program(self):
+        status, out, _, report = evaluate_isolated('l = [1]\nprint(l[3])')
+
+        status.should.equal(1)
+        out.should.equal('Index 3 out of bounds for vector of size 1\n')
+        report.should.be.none
+
+    def test_reports_compilation_errors(self):
+        status, _, err, _ = evaluate_isolated('print(undefined)')
+
+        status.should.equal(1)
+        err.should.contain('ResolveError: Undefined variable undefined in main')
+
+
+class TestServer:
+    def test_runs_programs(self, server):
+        result = Client(server.socket_path).evaluate('i = 0\nwhile i < 3\nprint(i)\ni = i + 1\nend')
+
+        result['status'].should.equal(0)
+        result['stdout'].should.equal('0\n1\n2\n')
+        result['time'].should.be.greater_than(0)
+
+    def test_serves_compiled_objects_from_the_cache(self, server):
+        client = Client(server.socket_path)
+
+        client.evaluate('print(1)', opt_level=2)['report']['phases'].should.contain('codegen')
+        result = client.evaluate('print(1)', opt_level=2)
+
+        result['stdout'].should.equal('1\n')
+        result['report']['phases'].should_not.contain('codegen')
+
+    def test_answers_pings(self, server, tmpdir):
+        Client(server.socket_path).ping().should.be.true
+        Client(str(tmpdir.join('nobody.sock'))).ping().should.be.false
+
+    def test_replies_to_invalid_requests(self, server):
+        client = Client(server.socket_path)
+
+        for request, error in (({'command': 'stop'}, 'code is missing or not a string'),
+                               ([1], 'a request is a JSON object'),
+                               ({'code': 'print(1)', 'opt_level': '2'}, 'opt_level is not an integer')):
+            result = client.request(request)
+            result['status'].should.equal(1)
+            result['stderr'].should.equal(f'Invalid request: {error}\n')
+
+        client.ping().should.be.true
+
+    def test_refuses_to_start_twice_on_the_same_socket(self, server):
+        OpalServer.when.called_with(server.socket_path).should.throw(ServerError)
+
+    def test_removes_stale_sockets(self, tmpdir):
+        socket_path = str(tmpdir.join('opal.sock'))
+        open(socket_path, 'w').close()
+
+        with OpalServer(socket_path) as server:
+            server.socket_path.should.equal(socket_path)
+
+        tmpdir.join('opal.sock').exists().should.be.false
+
+    def test_client_command_prints_the_output(self, server, tmpdir, capsys):
+        source = tmpdir.join('program.opal')
+        source.write('print("from the server")')
+
+        main([str(source), '--socket', server.socket_path]).should.equal(0)
+
+        capsys.readouterr().out.should.equal('from the server\n')
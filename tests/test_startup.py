@@ -0,0 +1,23 @@
+from benchmarks.startup import imported_modules, time_startup
+
+
+def heavy(modules):
+    return [module for module in modules if module.startswith(('lark', 'llvmlite.llvmpy', 'resources', 'unittest'))]
+
+
+class TestStartup:
+    def test_importing_the_evaluator_leaves_out_the_parser(self):
+        heavy(imported_modules('import opal.evaluator')).should.be.empty
+
+    def test_evaluating_a_program_imports_the_parser(self):
+        modules = imported_modules('from opal.evaluator import OpalEvaluator\n'
+                                   'OpalEvaluator().evaluate("print(1)", run=False)')
+
+        modules.should.contain('lark')
+        modules.should_not.contain('llvmlite.llvmpy')
+
+    def test_the_client_imports_nothing_but_the_standard_library(self):
+        [module for module in imported_modules('import opal.client') if module.startswith('llvmlite')].should.be.empty
+
+    def test_times_statements_in_a_fresh_interpreter(self):
+        time_startup('', 'import opal.client', repeat=1).should.be.greater_than(0)
@@ -0,0 +1,118 @@
+import ctypes
+import io
+
+import pytest
+from wurlitzer import pipes
+
+from opal.codegen import CodeGenerator
+from opal.opalc import EMIT_SHARED, compile_file
+from opal.parser import iter_statements
+from opal.report import CompileReport
+
+PROGRAM = """
+class Object
+end
+
+class Answer < Object
+    def forty_two()
+        return 42
+    end
+end
+
+total = 0
+i = 0
+
+while i < 5
+    if i > 2
+        total = total + i
+    end
+    i = i + 1
+end
+print(total)
+
+answer = Answer()
+n = answer.forty_two()
+print(n)
+
+for x in [1, 2, 3]
+    print(x)
+end
+"""
+
+
+def generate(code, stream, chunk_lines=1):
+    codegen = CodeGenerator()
+    report = CompileReport()
+    if stream:
+        codegen.generate_file(io.StringIO(code), report, chunk_lines)
+    else:
+        codegen.generate_code(code, report)
+    return codegen, report
+
+
+class TestIterStatements:
+    def test_yields_each_top_level_statement(self):
+        list(iter_statements(io.StringIO('a = 1\n\nwhile a < 2\n  if a\n  end\n\n  a = a + 1\nend\nprint(a)\n'))) \
+            .should.equal(['a = 1\n', 'while a < 2\n  if a\n  end\n\n  a = a + 1\nend\n', 'print(a)\n'])
+
+    def test_groups_statements_up_to_a_number_of_lines(self):
+        list(iter_statements(['a = 1\n', 'b = 2\n', 'if a\n', 'end\n', 'c = 3\n'], min_lines=2)) \
+            .should.equal(['a = 1\nb = 2\n', 'if a\nend\n', 'c = 3\n'])
+
+    def test_yields_unterminated_blocks_as_they_are(self):
+        list(iter_statements(['a = 1\n', 'for x in l\n', 'print(x)\n'])).should.equal(['a = 1\n', 'for x in l\nprint(x)\n'])
+
+
+class TestGenerateStream:
+    @pytest.mark.parametrize('chunk_lines', [1, 7, 1000])
+    def test_generates_the_same_code_as_the_whole_program(self, chunk_lines):
+        streamed, stream_report = generate(PROGRAM, True, chunk_lines)
+        whole, whole_report = generate(PROGRAM, False)
+
+        # the same blocks, laid out in the order they were finished in
+        sorted(str(streamed.module).splitlines()).should.equal(sorted(str(whole.module).splitlines()))
+        for counter in ('ir_functions', 'ir_blocks', 'ir_instructions'):
+            stream_report.counters[counter].should.equal(whole_report.counters[counter])
+
+    def test_keeps_the_ir_of_finished_statements_as_text(self):
+        codegen, report = generate(PROGRAM, True)
+
+        main = codegen.module.get_global('main')
+        main.spooled_blocks.should.be.greater_than(0)
+        len(main.blocks).should.be.lower_than(report.counters['ir_blocks'])
+        report.counters['chunks'].should.equal(len(list(iter_statements(io.StringIO(PROGRAM)))))
+        [phase.name for phase in report.phases].should.equal(['stream'])
+
+    def test_needs_classes_defined_before_their_use(self):
+        generate.when.called_with('foo = Foo()\nclass Object\nend\nclass Foo < Object\nend', True) \
+            .should.throw(Exception)
+
+    def test_allocates_variables_of_later_statements_in_the_entry_block(self, tmpdir):
+        code = 'n = 3\nif n > 2\n    y = 1\nend\nif n > 2\n    x = 1\nelse\n    x = 2\nend\nprint(x)\n' \
+               'i = 0\nwhile i < 3\n    z = i\n    i = i + 1\n    print(z)\nend\n'
+        codegen, _ = generate(code, True)
+
+        main = codegen.module.get_global('main')
+        [instr.name for instr in main.blocks[0].instructions if instr.opname == 'alloca'].should.equal(
+            ['z', 'i', 'x', 'y', 'n'])
+        spooled = ''.join(main.spooled)
+        for name in ('n', 'y', 'x', 'i', 'z'):
+            spooled.should_not.contain(f'%"{name}" = alloca')
+
+        source = tmpdir.join('program.opal')
+        source.write(code)
+        library = ctypes.CDLL(compile_file(str(source), emit=EMIT_SHARED))
+        with pipes() as (out, _):
+            library.main().should.equal(0)
+
+        out.read().should.equal('1\n0\n1\n2\n')
+
+    def test_compiles_source_files(self, tmpdir):
+        source = tmpdir.join('program.opal')
+        source.write(PROGRAM)
+
+        library = ctypes.CDLL(compile_file(str(source), emit=EMIT_SHARED))
+        with pipes() as (out, _):
+            library.main().should.equal(0)
+
+        out.read().should.equal('7\n42\n1\n2\n3\n')
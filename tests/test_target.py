@@ -0,0 +1,64 @@
+from llvmlite import binding as llvm
+
+from opal.evaluator import OpalEvaluator
+from opal import target
+from opal.target import AOT, CPU_ENV, FEATURES_ENV, get_target_machine, get_target_options, initialize_llvm, set_target
+
+initialize_llvm()
+
+
+class TestTargetOptions:
+    def test_default_to_the_host(self, monkeypatch):
+        monkeypatch.delenv(CPU_ENV, raising=False)
+        monkeypatch.delenv(FEATURES_ENV, raising=False)
+
+        cpu, features = get_target_options()
+
+        cpu.should.equal(llvm.get_host_cpu_name())
+        features.should.equal(llvm.get_host_cpu_features().flatten())
+
+    def test_can_be_overridden_by_the_environment(self, monkeypatch):
+        monkeypatch.setenv(CPU_ENV, 'generic')
+        monkeypatch.setenv(FEATURES_ENV, '')
+
+        get_target_options().should.equal(('generic', ''))
+
+    def test_arguments_take_precedence(self, monkeypatch):
+        monkeypatch.setenv(CPU_ENV, 'generic')
+
+        get_target_options('x86-64', '+sse2').should.equal(('x86-64', '+sse2'))
+
+
+class TestInitializeLLVM:
+    def test_initializes_once_per_process(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(llvm, 'initialize', lambda: calls.append('initialize'))
+        monkeypatch.setattr(target, '_initialized', False)
+
+        initialize_llvm()
+        initialize_llvm()
+        OpalEvaluator()
+
+        calls.should.equal(['initialize'])
+
+
+class TestTargetMachine:
+    def test_is_built_once(self):
+        get_target_machine().should.be(get_target_machine())
+
+    def test_depends_on_the_options(self):
+        get_target_machine().should_not.be(get_target_machine(kind=AOT))
+        get_target_machine('generic', '').should_not.be(get_target_machine())
+
+    def test_sets_the_module_data_layout(self):
+        target_machine = get_target_machine()
+        module = set_target(llvm.parse_assembly(''), target_machine)
+
+        module.triple.should.equal(target_machine.triple)
+        module.data_layout.should.equal(str(target_machine.target_data))
+
+    def test_is_used_by_the_evaluator(self):
+        ev = OpalEvaluator()
+        ev.evaluate('alpha = 1', run=False)
+
+        ev.llvm_mod.data_layout.should.equal(str(get_target_machine().target_data))